@@ -0,0 +1,99 @@
+from __future__ import annotations
+# === Voice upload prep — trim silence, downmix, resample to 16 kHz mono, encode once as 16-bit WAV ===
+# Speech models work at 16 kHz mono, so a 48 kHz stereo mic recording is ~6x larger than it needs to be,
+# and leading/trailing silence costs upload time and transcription time for nothing.
+# Pure stdlib `wave` + numpy (no ffmpeg); anything that isn't PCM WAV is uploaded as-is.
+
+from typing import Optional, Tuple
+import io, os, wave, hashlib, mimetypes
+
+import numpy as np
+
+TARGET_RATE = 16_000
+FRAME_MS = 20
+SILENCE_FLOOR_DBFS = float(os.environ.get("VOICE_SILENCE_FLOOR_DBFS", "-50"))  # below this is silence, always
+SILENCE_REL_DB = float(os.environ.get("VOICE_SILENCE_REL_DB", "-40"))          # ...or this far below the loudest frame
+KEEP_PAD_MS = 250   # context kept around speech so word edges aren't clipped
+MAX_GAP_MS = 600    # longer internal pauses are cut to this (plus KEEP_PAD_MS on each side)
+
+Upload = Tuple[str, bytes, str]  # (filename, bytes, content type) — the form the OpenAI SDK accepts as `file`
+VOICE_STATS = {"uploads": 0, "source_bytes": 0, "upload_bytes": 0, "passthrough": 0, "silent": 0}
+
+def read_wav(src) -> Tuple[np.ndarray, int]:
+    # path or file object -> float32 samples in [-1, 1], shape (frames, channels);
+    # raises wave.Error / EOFError on non-PCM input
+    with wave.open(src, "rb") as w:
+        ch, width, rate, n = w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()
+        raw = w.readframes(n)
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        x = (np.where(v >= 1 << 23, v - (1 << 24), v)).astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise wave.Error(f"unsupported sample width {width}")
+    return x[: (len(x) // ch) * ch].reshape(-1, ch), rate
+
+def to_mono_16k(x: np.ndarray, rate: int) -> np.ndarray:
+    mono = x.mean(axis=1) if x.ndim == 2 else x
+    if rate == TARGET_RATE or len(mono) == 0: return mono.astype(np.float32)
+    ratio = rate / TARGET_RATE
+    if ratio > 1:  # box low-pass before decimating; crude, but plenty for speech recognition
+        width = int(round(ratio))
+        if width > 1: mono = np.convolve(mono, np.ones(width, dtype=np.float32) / width, mode="same")
+    n_out = int(len(mono) / ratio)
+    t = np.arange(n_out, dtype=np.float64) * ratio
+    return np.interp(t, np.arange(len(mono)), mono).astype(np.float32)
+
+def trim_silence(x: np.ndarray, rate: int = TARGET_RATE) -> np.ndarray:
+    # frame-RMS voice detection: drop leading/trailing silence, shorten long pauses; empty when all silent
+    frame = rate * FRAME_MS // 1000
+    n = len(x) // frame
+    if n == 0: return x[:0]
+    rms = np.sqrt(np.mean(x[: n * frame].reshape(n, frame) ** 2, axis=1))
+    thresh = max(10 ** (SILENCE_FLOOR_DBFS / 20), float(rms.max()) * 10 ** (SILENCE_REL_DB / 20))
+    voiced = rms >= thresh
+    if not voiced.any(): return x[:0]
+    pad, gap = KEEP_PAD_MS // FRAME_MS, MAX_GAP_MS // FRAME_MS
+    keep = np.convolve(voiced.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0  # dilate by pad
+    idx = np.flatnonzero(voiced)
+    for a, b in zip(idx[:-1], idx[1:]):  # a long pause keeps its padded edges plus `gap` frames from the middle
+        if b - a - 1 > gap + 2 * pad:
+            keep[a + 1 + pad + gap // 2 : b - pad - (gap - gap // 2)] = False
+    return x[: n * frame].reshape(n, frame)[keep].reshape(-1)
+
+def encode_wav(x: np.ndarray, rate: int = TARGET_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(rate)
+        w.writeframes((np.clip(x, -1.0, 1.0) * 32767.0).astype("<i2").tobytes())
+    return buf.getvalue()
+
+def read_source(path: str) -> bytes:
+    with open(path, "rb") as f: return f.read()
+
+def content_hash(src: bytes) -> str:
+    return hashlib.blake2b(src, digest_size=16).hexdigest()
+
+def prepare_upload(path: str, src: Optional[bytes] = None) -> Optional[Upload]:
+    # read + encode once; every model attempt reuses these bytes. None when the recording is silent.
+    if src is None: src = read_source(path)
+    VOICE_STATS["uploads"] += 1; VOICE_STATS["source_bytes"] += len(src)
+    try:
+        x, rate = read_wav(io.BytesIO(src))
+    except (wave.Error, EOFError, ValueError):
+        VOICE_STATS["passthrough"] += 1; VOICE_STATS["upload_bytes"] += len(src)
+        name = os.path.basename(path) or "audio"
+        return name, src, mimetypes.guess_type(name)[0] or "application/octet-stream"
+    speech = trim_silence(to_mono_16k(x, rate))
+    if len(speech) == 0:
+        VOICE_STATS["silent"] += 1
+        return None
+    data = encode_wav(speech)
+    VOICE_STATS["upload_bytes"] += len(data)
+    return "speech.wav", data, "audio/wav"
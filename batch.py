@@ -0,0 +1,105 @@
+from __future__ import annotations
+# === Offline batch search — replay logged messages / PujaRequests without Gradio, ordered results ===
+
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Iterable, Union, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os, sys, json, argparse
+
+import core, llm, roster
+from core import PujaRequest, TOP_K
+
+Query = Union[str, PujaRequest]
+
+@dataclass
+class BatchResult:
+    query: Optional[str]              # raw text, or None when a PujaRequest was given
+    request: Dict[str, Any]           # request actually ranked (after defaults)
+    status: str                       # ok | no_match | needs_time_window | error
+    ids: List[int] = field(default_factory=list)
+    scores: List[Dict[str, Any]] = field(default_factory=list)  # ranking key parts per id, best-first
+    error: Optional[str] = None
+
+def _request_dict(req: PujaRequest) -> Dict[str, Any]:
+    return json.loads(req.model_dump_json(exclude={"notes"}))
+
+def search_one(q: Query, k: Optional[int]=TOP_K, use_llm: bool=False, forced_time: Optional[str]=None) -> BatchResult:
+    text = q if isinstance(q, str) else None
+    try:
+        if text is None: req = q.model_copy(deep=True)
+        elif use_llm: req, _ = llm.extract_request(text)
+        else: req, _ = core.rule_based_extract(text)
+        if forced_time: req.time_window = forced_time
+        if not req.time_window and not req.date_from:  # a date range searches every window
+            return BatchResult(text, _request_dict(req), "needs_time_window")
+        if not req.city: req.city = "Kolkata"
+        if req.date_from: ranked, slots = core.rank_date_range(req, k=k)
+        else: ranked, slots = core.rank_candidates(req, k=k), None
+    except Exception as e:
+        return BatchResult(text, {}, "error", error=f"{type(e).__name__}: {e}")
+    scores = [{"id": p.id, "tier": tier, "dist_km": dist, "time_delta": tdist,
+               "budget_gap": abs(p.base_fee - (req.budget_inr or p.base_fee)),
+               "rating": p.rating, "experience_years": p.experience_years, "fee": p.base_fee}
+              for (p, tier, tdist, dist) in ranked]
+    if slots is not None:
+        for sc in scores: sc["open_slots"] = [[d.isoformat(), w] for d, w in slots.get(sc["id"], ())]
+    return BatchResult(text, _request_dict(req), "ok" if ranked else "no_match", [p.id for (p, _, _, _) in ranked], scores)
+
+def _run_chunk(chunk: List[Query], k: Optional[int], use_llm: bool, forced_time: Optional[str]) -> List[BatchResult]:
+    return [search_one(q, k, use_llm, forced_time) for q in chunk]
+
+def _init_worker():
+    # forked workers inherit the caller's roster; spawned ones start with none and load ROSTER_FILE
+    if not core.ROSTER_VERSION: roster.load_default_roster()
+
+def search_batch(queries: Iterable[Query], k: Optional[int]=TOP_K, use_llm: bool=False,
+                 forced_time: Optional[str]=None, executor: str="process", workers: Optional[int]=None,
+                 chunk_size: int=256) -> List[BatchResult]:
+    # executor: process | thread | inline. Results come back in input order.
+    items = list(queries)
+    chunks = [items[i:i+chunk_size] for i in range(0, len(items), chunk_size)]
+    if executor == "inline" or len(chunks) <= 1 or workers == 1:
+        return [r for c in chunks for r in _run_chunk(c, k, use_llm, forced_time)]
+    pool = (ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker)
+            if executor == "process" else ThreadPoolExecutor(max_workers=workers or os.cpu_count()))
+    with pool:
+        parts = pool.map(_run_chunk, chunks, [k]*len(chunks), [use_llm]*len(chunks), [forced_time]*len(chunks))
+        return [r for part in parts for r in part]
+
+def _read_queries(path: str) -> List[Query]:
+    # one query per line: plain text, {"text": ...}, or PujaRequest fields as JSON
+    out: List[Query] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            if line.startswith("{"):
+                obj = json.loads(line)
+                out.append(obj["text"] if "text" in obj else PujaRequest(**obj))
+            else:
+                out.append(line)
+    return out
+
+def main(argv: Optional[List[str]]=None):
+    ap = argparse.ArgumentParser(description="Replay puja search queries offline and write ranked pandit ids as JSONL.")
+    ap.add_argument("input", help="queries file (text or JSONL), '-' for stdin")
+    ap.add_argument("-o", "--output", default="-", help="output JSONL (default stdout)")
+    ap.add_argument("-k", type=int, default=TOP_K)
+    ap.add_argument("--use-llm", action="store_true", help="extract with the configured EXTRACT_MODE instead of rules only")
+    ap.add_argument("--time-window", choices=list(core.WINDOW_MAP), help="force this window, like the time picker")
+    ap.add_argument("--executor", choices=["process","thread","inline"], default="process")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk-size", type=int, default=256)
+    args = ap.parse_args(argv)
+    roster.load_default_roster()
+    queries = _read_queries("/dev/stdin" if args.input == "-" else args.input)
+    results = search_batch(queries, k=args.k, use_llm=args.use_llm, forced_time=args.time_window,
+                           executor=args.executor, workers=args.workers, chunk_size=args.chunk_size)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for r in results: out.write(json.dumps(asdict(r), ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout: out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+# === Cold-start check: fresh-interpreter import time of the headless modules ===
+# Usage: python benchmarks/bench_import.py [--runs 5] [--budget-ms 600]
+# Exits 1 when a headless module is over budget or drags in Gradio/OpenAI/dateparser at import,
+# so it can gate CI as a startup regression check.
+
+from typing import Dict, List
+import os, sys, json, argparse, statistics, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADLESS = ["core", "llm", "audio", "metrics", "batch", "roster", "shared_roster"]
+HEAVY = ["gradio", "openai", "dateparser"]
+
+PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {mod}
+dt = time.perf_counter() - t
+print(json.dumps({{"ms": dt*1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(mod: str, runs: int) -> Dict[str, object]:
+    samples: List[float] = []
+    heavy: List[str] = []
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}  # import must not need the key
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(mod=mod, heavy=HEAVY)], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(r["ms"]); heavy = r["heavy"]
+    return {"module": mod, "median_ms": statistics.median(samples), "max_ms": max(samples), "heavy_imports": heavy}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Cold-start import time of headless modules.")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=600.0, help="max median import time per headless module")
+    ap.add_argument("--with-app", action="store_true", help="also time the Gradio app module (informational)")
+    args = ap.parse_args(argv)
+    mods = HEADLESS + (["app"] if args.with_app else [])
+    failed = False
+    for mod in mods:
+        r = measure(mod, args.runs)
+        over = mod in HEADLESS and (r["median_ms"] > args.budget_ms or r["heavy_imports"])
+        failed |= bool(over)
+        print(f"{mod:<8} median {r['median_ms']:8.1f} ms  max {r['max_ms']:8.1f} ms  heavy={r['heavy_imports']}"
+              + ("  <-- REGRESSION" if over else ""))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
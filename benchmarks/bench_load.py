@@ -0,0 +1,249 @@
+from __future__ import annotations
+# === End-to-end load test: simulated users through the Gradio queue against a local fake OpenAI (offline) ===
+# Usage: python benchmarks/bench_load.py [--users 10,50,200] [--limits 16,64] [--max-size 0] [--duration 20]
+#        [--latency-ms 600 --jitter-ms 300 --error-rate 0.02 --rate-per-s 8] [--voice-share 0.2] [--json out.json]
+# For every (concurrency limit, queue max size, users) point the real UI from app.build_ui() is launched in
+# its own process on a local port (one replica, OPENAI_BASE_URL pointing at the fake) and closed-loop users
+# replay the browser's queue protocol over HTTP: join an event, read its SSE stream, act on the outputs.
+# A flow is Find Options (or an uploaded recording + Transcribe & Find), Use Selected Time when the search
+# asked for a window, then Confirm Booking on the first offered pandit.
+# Per event: queue wait (join -> process_starts) and latency (join -> process_completed). Per point:
+# completed flows and events per second, rejected joins (queue full), failures, degraded extractions and
+# CPU of the replica and of this process (users + fake OpenAI). When "gen" nears a full core, the harness
+# rather than the replica is the limit. Everything runs on 127.0.0.1; Linux only (CPU is read from /proc).
+
+from typing import List, Dict, Any, Optional
+import os, sys, json, time, uuid, socket, random, asyncio, argparse, tempfile, subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "tiered")  # read before bench_voice's setdefault("rules")
+
+import httpx
+
+import core, roster
+from stub_openai_server import StubOpenAIServer
+from bench_voice import make_recording
+
+EVENTS = {"find": "text_find_wrapper", "voice": "voice_find_async", "set_time": "set_time_wrapper",
+          "confirm": "confirm_booking"}  # harness name -> handler (the dependency's api_name)
+CITIES = ["Kolkata", "Howrah", "Salt Lake", "Durgapur", "Siliguri", "Asansol", "Barasat", "Kalyani"]
+WINDOWS = ["morning", "afternoon", "evening", "night"]
+DAYS = ["tomorrow", "day after tomorrow"] + [f"next {d}" for d in
+        ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")]
+TEMPLATES = [  # English reads confidently by the rules; Hinglish usually goes on to the LLM (tiered mode)
+    "{puja} in {city} on {day} {window}, budget {budget}",
+    "Need a pandit for {puja} at {city}, {day} {window}. Budget around {budget}.",
+    "{puja} karwana hai {city} mein {day} {window}, budget {budget} tak",
+    "humko {day} {window} {city} me {puja} ke liye panditji chahiye, {budget} rupees",
+]
+
+def percentile(xs: List[float], q: float) -> float:
+    if not xs: return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q / 100 * (len(xs) - 1))))]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); return s.getsockname()[1]
+
+def make_text(rng: random.Random, no_window_share: float) -> str:
+    # unique budgets keep every text a fresh LLM cache key, so the load reaches the stub
+    window = "" if rng.random() < no_window_share else rng.choice(WINDOWS)
+    day = rng.choice(DAYS)  # spelled out: digits in the text would read as a clock time
+    return rng.choice(TEMPLATES).format(puja=rng.choice(core.PUJA_CATALOG[:12]), city=rng.choice(CITIES), day=day,
+                                        window=window, budget=rng.randint(600, 1000)).replace(" ,", ",").replace(" .", ".")
+
+class LoadRun:
+    def __init__(self, base: str, fn_index: Dict[str, int], trigger: Dict[str, int], recordings: List[str],
+                 args: argparse.Namespace):
+        self.base, self.fn_index, self.trigger, self.recordings, self.args = base, fn_index, trigger, recordings, args
+        self.events: Dict[str, Dict[str, List[float]]] = {n: {"wait": [], "latency": []} for n in EVENTS}
+        self.flows: List[float] = []
+        self.counts: Dict[str, int] = {k: 0 for k in ("booked", "conflict", "no_match", "retry", "degraded",
+                                                      "rejected", "failed")}
+
+    async def event(self, http: httpx.AsyncClient, session: str, name: str, data: List[Any]) -> Optional[List[Any]]:
+        # one queued event as the browser sends it; None when the queue refused it or the handler failed
+        t0 = time.perf_counter()
+        r = await http.post(f"{self.base}/queue/join", json={
+            "data": data, "fn_index": self.fn_index[name], "session_hash": session,
+            "event_data": None, "trigger_id": self.trigger[name]})
+        if r.status_code != 200 or "event_id" not in r.json():
+            self.counts["rejected"] += 1; return None
+        event_id, started = r.json()["event_id"], None
+        async with http.stream("GET", f"{self.base}/queue/data", params={"session_hash": session}) as resp:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"): continue
+                msg = json.loads(line[5:])
+                if msg.get("event_id") != event_id: continue
+                if msg.get("msg") == "process_starts": started = time.perf_counter()
+                elif msg.get("msg") == "process_completed":
+                    done = time.perf_counter()
+                    self.events[name]["wait"].append((started or done) - t0)
+                    self.events[name]["latency"].append(done - t0)
+                    if not msg.get("success"):
+                        self.counts["failed"] += 1; return None
+                    return msg["output"]["data"]
+        self.counts["failed"] += 1
+        return None
+
+    async def upload(self, http: httpx.AsyncClient, path: str) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            r = await http.post(f"{self.base}/upload", files={"files": (os.path.basename(path), f, "audio/wav")})
+        r.raise_for_status()
+        return {"path": r.json()[0], "orig_name": os.path.basename(path), "meta": {"_type": "gradio.FileData"}}
+
+    async def flow(self, http: httpx.AsyncClient, rng: random.Random):
+        session, t0 = uuid.uuid4().hex, time.perf_counter()  # a fresh browser tab: own gr.State
+        if rng.random() < self.args.voice_share:
+            text = ""
+            out = await self.event(http, session, "voice", [await self.upload(http, rng.choice(self.recordings))])
+        else:
+            text = make_text(rng, self.args.no_window_share)
+            out = await self.event(http, session, "find", [text])
+        if out is None: return
+        if out[0].startswith("🎙️"):
+            self.counts["retry"] += 1; return
+        if "⚡" in out[0]: self.counts["degraded"] += 1
+        if out[0].startswith("⏰") and text:
+            await asyncio.sleep(self.args.think_s * rng.random())
+            out = await self.event(http, session, "set_time", [text, rng.choice(WINDOWS)])
+            if out is None: return
+        if not out[0].startswith("✅"):
+            self.counts["no_match"] += 1; return
+        await asyncio.sleep(self.args.think_s * rng.random())
+        picked = (out[4] or {}).get("value")
+        out = await self.event(http, session, "confirm", [picked, rng.choice(["UPI", "NetBanking", "Cash"]), None])
+        if out is None: return
+        self.counts["booked" if out[0].startswith("✅") else "conflict"] += 1
+        self.flows.append(time.perf_counter() - t0)
+
+    async def user(self, http: httpx.AsyncClient, uid: int, deadline: float):
+        rng = random.Random(uid)
+        await asyncio.sleep(rng.random() * self.args.ramp_s)  # staggered arrivals
+        while time.perf_counter() < deadline:
+            await self.flow(http, rng)
+            await asyncio.sleep(self.args.think_s * rng.random())
+
+    async def run(self, users: int) -> float:
+        limits = httpx.Limits(max_connections=4 * users + 16, max_keepalive_connections=2 * users + 16)
+        async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(120.0)) as http:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(self.user(http, i, t0 + self.args.duration) for i in range(users)))
+            return time.perf_counter() - t0
+
+# the replica: app.py's UI in its own process (own GIL), queue settings from argv, OpenAI from OPENAI_BASE_URL
+REPLICA = """
+import sys, app
+limit, max_size, port = map(int, sys.argv[1:4])
+app.shared_roster.start() or app.roster.start()
+app.build_ui().queue(default_concurrency_limit=limit, max_size=max_size or None).launch(
+    server_name="127.0.0.1", server_port=port, quiet=True)
+"""
+
+def cpu_seconds(pid: int) -> float:
+    # user + system time of a live process (Linux /proc)
+    with open(f"/proc/{pid}/stat") as f: fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def launch(limit: int, max_size: int, env: Dict[str, str]):
+    port = free_port()
+    log = open(os.path.join(os.path.dirname(env["BOOKINGS_DB"]), "replica.log"), "w+b")  # a pipe could fill and block it
+    proc = subprocess.Popen([sys.executable, "-c", REPLICA, str(limit), str(max_size), str(port)], env=env,
+                            cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while True:
+        try: config = httpx.get(base + "/config", timeout=5).json(); break
+        except httpx.HTTPError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill(); log.seek(0)
+                raise RuntimeError("replica did not start:\n" + log.read().decode(errors="replace")[-2000:])
+            time.sleep(0.2)
+    api = {d.get("api_name"): (i, (d.get("targets") or [[None]])[0][0]) for i, d in enumerate(config["dependencies"])}
+    fn_index = {name: api[fn][0] for name, fn in EVENTS.items()}
+    trigger = {name: api[fn][1] for name, fn in EVENTS.items()}
+    return proc, base + config.get("api_prefix", ""), fn_index, trigger
+
+def point(args, server: StubOpenAIServer, recordings: List[str], limit: int, max_size: int, users: int) -> Dict[str, Any]:
+    env = dict(os.environ, OPENAI_BASE_URL=server.url, EXTRACT_MODE=args.extract_mode, METRICS_PORT="0",
+               BOOKINGS_DB=os.path.join(tempfile.mkdtemp(prefix="bench_load_"), "bookings.db"))  # empty diary per point
+    server.log.clear()
+    proc, base, fn_index, trigger = launch(limit, max_size, env)
+    try:
+        load = LoadRun(base, fn_index, trigger, recordings, args)
+        cpu0, gen0 = cpu_seconds(proc.pid), time.process_time()
+        elapsed = asyncio.run(load.run(users))
+        cpu, gen = (cpu_seconds(proc.pid) - cpu0) / elapsed, (time.process_time() - gen0) / elapsed
+    finally:
+        proc.terminate(); proc.wait(30)
+    n_events = sum(len(e["latency"]) for e in load.events.values())
+    out = {"limit": limit, "max_size": max_size, "users": users, "seconds": elapsed, "replica_cpu": cpu,
+           "harness_cpu": gen,
+           "flows_per_s": len(load.flows) / elapsed, "events_per_s": n_events / elapsed,
+           "flow_p50_ms": percentile(load.flows, 50) * 1000, "flow_p95_ms": percentile(load.flows, 95) * 1000,
+           **load.counts, "openai": server.stats(), "events": {}}
+    for name, e in load.events.items():
+        if not e["latency"]: continue
+        out["events"][name] = {"n": len(e["latency"]),
+                               **{f"wait_p{q}_ms": percentile(e["wait"], q) * 1000 for q in (50, 95, 99)},
+                               **{f"p{q}_ms": percentile(e["latency"], q) * 1000 for q in (50, 95, 99)}}
+    return out
+
+def print_point(r: Dict[str, Any]):
+    print(f"{r['limit']:>6}{r['max_size'] or '-':>6}{r['users']:>7}{r['flows_per_s']:>9.1f}{r['events_per_s']:>9.1f}"
+          f"{r['flow_p50_ms']:>9.0f}{r['flow_p95_ms']:>9.0f}{r['booked']:>8}{r['conflict']:>7}{r['degraded']:>7}"
+          f"{r['rejected']:>7}{r['failed']:>6}{r['replica_cpu']:>6.0%}{r['harness_cpu']:>6.0%}")
+    for name, e in r["events"].items():
+        print(f"{'':>19}{name:<9}n={e['n']:<6} wait p50/p95/p99 {e['wait_p50_ms']:>6.0f}/{e['wait_p95_ms']:>6.0f}/"
+              f"{e['wait_p99_ms']:>6.0f} ms   latency {e['p50_ms']:>6.0f}/{e['p95_ms']:>6.0f}/{e['p99_ms']:>6.0f} ms")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Concurrent users through the Gradio queue against a local fake OpenAI.")
+    ap.add_argument("--users", default="10,50", help="comma-separated simulated user counts")
+    ap.add_argument("--limits", default=os.environ.get("UI_CONCURRENCY", "64"),
+                    help="comma-separated default_concurrency_limit values")
+    ap.add_argument("--max-size", default="0", help="comma-separated queue max_size values (0 = unbounded)")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per point")
+    ap.add_argument("--ramp-s", type=float, default=2.0, help="users arrive spread over this many seconds")
+    ap.add_argument("--think-s", type=float, default=0.5, help="max pause between a user's clicks")
+    ap.add_argument("--voice-share", type=float, default=0.1, help="share of flows that upload a recording")
+    ap.add_argument("--no-window-share", type=float, default=0.3, help="share of texts without a time window")
+    ap.add_argument("--extract-mode", choices=["tiered", "llm", "rules"], default=EXTRACT_MODE)
+    ap.add_argument("--latency-ms", type=float, default=600, help="fake OpenAI base latency")
+    ap.add_argument("--jitter-ms", type=float, default=300, help="mean of its exponential latency tail")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of OpenAI calls answered 500")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="share of OpenAI calls answered 429")
+    ap.add_argument("--rate-per-s", type=float, default=0.0, help="fake API quota, 429 above it (0 = unlimited)")
+    ap.add_argument("--json", help="write all points to this file")
+    args = ap.parse_args(argv)
+    roster.load_default_roster()  # the fake OpenAI answers with core.rule_based_extract
+    server = StubOpenAIServer(latency_s=args.latency_ms / 1000, jitter_s=args.jitter_ms / 1000,
+                              error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                              rate_per_s=args.rate_per_s, uplink_bytes_per_s=0).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            recordings = [os.path.join(d, f"mic{i}.wav") for i in range(4)]
+            for i, p in enumerate(recordings): make_recording(p, seed=i)
+            print(f"fake OpenAI {args.latency_ms:.0f}+~{args.jitter_ms:.0f} ms, errors {args.error_rate:.0%}, "
+                  f"429s {args.throttle_rate:.0%}" + (f", quota {args.rate_per_s:g}/s" if args.rate_per_s else "")
+                  + f"; extract={args.extract_mode}, voice {args.voice_share:.0%}, {args.duration:g}s per point")
+            print(f"{'limit':>6}{'qmax':>6}{'users':>7}{'flows/s':>9}{'evts/s':>9}{'flow p50':>9}{'p95':>9}"
+                  f"{'booked':>8}{'clash':>7}{'degr':>7}{'rejct':>7}{'fail':>6}{'cpu':>6}{'gen':>6}")
+            for limit in (int(x) for x in args.limits.split(",")):
+                for max_size in (int(x) for x in args.max_size.split(",")):
+                    for users in (int(x) for x in args.users.split(",")):
+                        r = point(args, server, recordings, limit, max_size, users)
+                        print_point(r); results.append(r)
+    finally:
+        server.stop()
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+# === Search pipeline benchmark: per-stage p50/p95/p99 latency + memory per roster scale ===
+# Usage: python benchmarks/bench_search.py --scales 100,10000,100000 --queries 2000 [--json out.json]
+#        (1M rosters work too: --scales 1000000, needs a few GB of RAM)
+
+from typing import List, Dict, Callable, Any
+import os, sys, time, json, argparse, gc, tracemalloc, resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("EXTRACT_MODE", "llm")  # route extraction through the stub so every stage runs
+
+import synthetic
+import core, llm
+import app
+
+STAGES = ["rule_based_extract","parse_date","detect_city","filter","rank","render","perform_search"]
+
+def percentiles(samples_ns: List[int]) -> Dict[str, float]:
+    xs = sorted(samples_ns)
+    if not xs: return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "n": 0}
+    pick = lambda q: xs[min(len(xs)-1, int(q*len(xs)))] / 1e6
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "n": len(xs)}
+
+def _timed(fn: Callable, *a, **kw):
+    t0 = time.perf_counter_ns(); out = fn(*a, **kw)
+    return out, time.perf_counter_ns() - t0
+
+def build_roster(n: int, seed: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    core.load_roster(synthetic.make_pandits(n, seed))
+    build_s = time.perf_counter() - t0
+    cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"build_s": build_s, "roster_mb": cur/2**20, "build_peak_mb": peak/2**20}
+
+def run_scale(n: int, queries: List[Dict[str, Any]], seed: int) -> Dict[str, Any]:
+    mem = build_roster(n, seed)
+    samples: Dict[str, List[int]] = {s: [] for s in STAGES}
+    llm.LLM_CACHE.clear()
+    core.parse_date("15 November")  # warm-up: dateparser is imported lazily on first free-form date
+    for q in queries:
+        text = q["text"]
+        (req, _), dt = _timed(core.rule_based_extract, text); samples["rule_based_extract"].append(dt)
+        _, dt = _timed(core.parse_date, text); samples["parse_date"].append(dt)
+        _, dt = _timed(core.detect_city, text); samples["detect_city"].append(dt)
+        if not req.time_window: req.time_window = q["fields"]["time_window"]
+        if not req.city: req.city = "Kolkata"
+        weekday = core.WEEKDAY_TOKEN[req.when_date.weekday()] if req.when_date else None
+        matched, dt = _timed(core.PANDIT_INDEX.candidates, req.puja_type, req.time_window, weekday)
+        samples["filter"].append(dt)
+        ranked, dt = _timed(core.rank_matched, req, matched); samples["rank"].append(dt)
+        _, dt = _timed(core.render_results_md, ranked); samples["render"].append(dt)
+        _, dt = _timed(app.perform_search, text, q["fields"]["time_window"]); samples["perform_search"].append(dt)
+    return {"pandits": n, **mem, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024,
+            "stages": {s: percentiles(v) for s, v in samples.items()}, "date_parse": core.date_parse_stats()}
+
+def print_report(results: List[Dict[str, Any]]):
+    for r in results:
+        print(f"\n== {r['pandits']:,} pandits — build {r['build_s']:.2f}s, roster {r['roster_mb']:.1f} MB "
+              f"(peak {r['build_peak_mb']:.1f} MB), max RSS {r['max_rss_mb']:.0f} MB")
+        print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for s, p in r["stages"].items():
+            print(f"{s:<20}{p['p50_ms']:>10.3f}{p['p95_ms']:>10.3f}{p['p99_ms']:>10.3f}")
+        dp = r["date_parse"]
+        print(f"parse_date paths (cumulative): fast {dp['fast']}, dateparser {dp['slow']} "
+              f"({dp['slow_cache_hits']} memoized)")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-stage search latency and memory across roster sizes (offline).")
+    ap.add_argument("--scales", default="100,1000,10000,100000", help="comma-separated roster sizes")
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args(argv)
+    queries = synthetic.make_queries(args.queries, args.seed)
+    synthetic.install_stub(queries)
+    results = [run_scale(int(n), queries, args.seed) for n in args.scales.split(",")]
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+# === Voice search benchmark: raw-file upload vs trimmed/resampled/streamed pipeline (offline) ===
+# Usage: python benchmarks/bench_voice.py [--runs 5] [--uplink-kbps 2000] [--fail-first | --slow-first 5]
+# Talks to a local stub transcription server over real HTTP through the OpenAI SDK.
+
+from typing import List, Dict, Any
+import os, sys, time, wave, argparse, statistics, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("EXTRACT_MODE", "rules")  # voice cost only; the transcript parses without the LLM
+os.environ.setdefault("BOOKINGS_DB", os.path.join(tempfile.gettempdir(), "bench_voice_bookings.db"))
+
+import numpy as np
+
+import llm
+import app
+from stub_transcribe_server import StubTranscribeServer
+
+def make_recording(path: str, rate: int = 48_000, channels: int = 2, seed: int = 0):
+    # typical mic capture: 1.5 s lead-in, two phrases with a pause, 2 s tail; room noise at ~-70 dBFS
+    rng = np.random.default_rng(seed)
+    def silence(s): return rng.normal(0, 10 ** (-70 / 20), int(s * rate))
+    def phrase(s):
+        t = np.arange(int(s * rate)) / rate
+        env = 0.5 * (1 - np.cos(2 * np.pi * 4 * t)) * np.hanning(len(t))  # ~4 syllables/s
+        voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((140, 280, 420, 560, 700), 1))
+        return 0.2 * env * voice + rng.normal(0, 0.01, len(t))
+    x = np.concatenate([silence(1.5), phrase(3.0), silence(1.2), phrase(2.0), silence(2.0)])
+    pcm = (np.clip(np.repeat(x[:, None], channels, axis=1), -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels); w.setsampwidth(2); w.setframerate(rate); w.writeframes(pcm.tobytes())
+
+def legacy_transcribe(path: str) -> str:
+    # the previous path: re-open and upload the raw recording for every model, no streaming
+    for model in llm.TRANSCRIBE_MODELS:
+        try:
+            with open(path, "rb") as f:
+                resp = llm.get_openai_client().audio.transcriptions.create(
+                    model=model, file=f, response_format="text", temperature=0)
+            txt = llm._extract_text_from_transcribe(resp)
+            if txt: return txt
+        except Exception: continue
+    return ""
+
+def run(name: str, transcribe, paths: List[str], server: StubTranscribeServer) -> Dict[str, Any]:
+    lat: List[float] = []; sent: List[int] = []; attempts = 0
+    for path in paths:
+        server.log.clear()
+        t0 = time.perf_counter()
+        text = transcribe(path)
+        out = app.perform_search(text, forced_time=None) if text else None
+        lat.append(time.perf_counter() - t0)
+        sent.append(sum(e["bytes"] for e in server.log)); attempts += len(server.log)
+        assert out is not None and out[0].startswith("✅"), f"{name}: search failed for transcript {text!r}"
+    return {"pipeline": name, "upload_kb": statistics.median(sent) / 1024, "attempts": attempts / len(paths),
+            "p50_ms": statistics.median(lat) * 1000, "max_ms": max(lat) * 1000}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Voice search upload size and latency against a local stub endpoint.")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--uplink-kbps", type=float, default=2000, help="simulated mobile uplink")
+    ap.add_argument("--fail-first", action="store_true", help="first model answers 400, forcing the fallback model")
+    ap.add_argument("--slow-first", type=float, default=0.0, help="first model takes this many extra seconds")
+    args = ap.parse_args(argv)
+    app.roster.load_default_roster()
+    from openai import OpenAI, AsyncOpenAI
+    first = llm.TRANSCRIBE_MODELS[0]
+    server = StubTranscribeServer(uplink_bytes_per_s=args.uplink_kbps * 125,
+                                  fail_models={first} if args.fail_first else None,
+                                  model_delay_s={first: args.slow_first}).start()
+    llm.set_openai_clients(OpenAI(base_url=server.url, api_key="stub", max_retries=0),
+                           AsyncOpenAI(base_url=server.url, api_key="stub", max_retries=0))
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            paths = [os.path.join(d, f"mic{i}.wav") for i in range(args.runs)]  # distinct takes: no cache hits
+            for i, p in enumerate(paths): make_recording(p, seed=i)
+            incident = ", first model failing" if args.fail_first else (
+                f", first model +{args.slow_first:g}s" if args.slow_first else "")
+            print(f"recording: {os.path.getsize(paths[0])/1024:.0f} KB, 48 kHz stereo 16-bit, "
+                  f"uplink {args.uplink_kbps:.0f} kbps{incident}")
+            print(f"{'pipeline':<10}{'upload KB':>11}{'attempts':>10}{'p50 ms':>10}{'max ms':>10}")
+            for name, fn, ps in (("legacy", legacy_transcribe, paths), ("routed", llm.transcribe_audio, paths),
+                                 ("repeat", llm.transcribe_audio, paths)):  # same takes again: transcript cache
+                r = run(name, fn, ps, server)
+                print(f"{r['pipeline']:<10}{r['upload_kb']:>11.0f}{r['attempts']:>10.1f}{r['p50_ms']:>10.0f}{r['max_ms']:>10.0f}")
+            print("router:", {m: (s["breaker"], round(s["score"], 2)) for m, s in llm.TRANSCRIBE_ROUTER.stats().items()})
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
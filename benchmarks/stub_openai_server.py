@@ -0,0 +1,144 @@
+from __future__ import annotations
+# === Local stand-in for the OpenAI API: chat completions + transcription, with latency and error injection ===
+# Usage: python benchmarks/stub_openai_server.py --port 8765 --latency-ms 600 --jitter-ms 300 --error-rate 0.02
+#        OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python app.py
+# Chat completions answer the extraction prompt the way a good model would: the user text is parsed with
+# core.rule_based_extract and returned as the JSON llm._llm_parse expects (only the fields of a json_schema
+# response_format, when one is sent; usage counts the schema and reports a cached prefix). Every call waits latency_s plus an
+# exponential tail (mean jitter_s); error_rate answers 500, throttle_rate 429, and rate_per_s > 0 is a token
+# bucket quota that answers 429 once exhausted, like the real API. Transcription is StubTranscribeServer's.
+
+from typing import List, Dict, Optional, Set, Any
+from http.server import BaseHTTPRequestHandler
+from datetime import date
+import os, sys, json, time, random, argparse, threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import rule_based_extract
+from roster import load_default_roster
+from stub_transcribe_server import StubTranscribeServer, DEFAULT_TRANSCRIPT
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    # the text to parse: the last user message, or the "User: ..." line the extraction prompt ends with
+    content = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if isinstance(content, list): content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+    i = content.rfind("User:")
+    return (content[i + 5:] if i >= 0 else content).strip()
+
+def _extraction(user_text: str) -> Dict[str, Any]:
+    req, _ = rule_based_extract(user_text)
+    return {"puja_type": req.puja_type, "when_date": req.when_date.isoformat() if isinstance(req.when_date, date) else None,
+            "time_window": req.time_window, "time_specific_mins": req.time_specific_mins, "city": req.city,
+            "budget_inr": req.budget_inr}
+
+class StubOpenAIServer(StubTranscribeServer):
+    def __init__(self, port: int = 0, latency_s: float = 0.6, jitter_s: float = 0.3, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, rate_per_s: float = 0.0, seed: int = 0,
+                 transcript: str = DEFAULT_TRANSCRIPT, **transcribe_opts):
+        super().__init__(port, transcript, **transcribe_opts)
+        self.latency_s, self.jitter_s, self.error_rate, self.throttle_rate, self.rate_per_s = \
+            latency_s, jitter_s, error_rate, throttle_rate, rate_per_s
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens, self._refilled = max(1.0, rate_per_s), time.monotonic()  # quota bucket holds ~1 s of calls
+        self._prefixes: Set[str] = set()
+
+    def handle(self, h: BaseHTTPRequestHandler, body: bytes):
+        route = "chat" if h.path.endswith("/chat/completions") else "audio" if h.path.endswith("/audio/transcriptions") else None
+        if route is None: h.send_error(404); return
+        status = self._injected()
+        if status:
+            self.log.append({"route": route, "bytes": len(body), "status": status})
+            time.sleep(self.latency_s * 0.1)  # errors come back quickly
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            h._send(status, "application/json", json.dumps({"error": {"message": "stub " + kind, "type": kind}}).encode())
+            return
+        if route == "audio": self.transcribe(h, body)
+        else: self.chat(h, body)
+
+    def _injected(self) -> Optional[int]:
+        with self._lock:
+            if self.rate_per_s > 0:
+                now = time.monotonic()
+                self._tokens = min(max(1.0, self.rate_per_s), self._tokens + (now - self._refilled) * self.rate_per_s)
+                self._refilled = now
+                if self._tokens < 1: return 429
+                self._tokens -= 1
+            x = self._rng.random()
+            if x < self.error_rate: return 500
+            if x < self.error_rate + self.throttle_rate: return 429
+            return None
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency_s + (self._rng.expovariate(1.0 / self.jitter_s) if self.jitter_s > 0 else 0.0)
+
+    def chat(self, h: BaseHTTPRequestHandler, body: bytes):
+        t0 = time.perf_counter()
+        try: payload = json.loads(body or b"{}")
+        except ValueError: h._send(400, "application/json", b'{"error": {"message": "invalid JSON"}}'); return
+        messages = payload.get("messages") or []
+        answer = _extraction(_user_text(messages))
+        schema = ((payload.get("response_format") or {}).get("json_schema") or {}).get("schema")
+        if schema: answer = {k: answer.get(k) for k in schema.get("properties", {})}  # structured outputs: just these
+        content = json.dumps(answer)
+        time.sleep(self._delay())
+        prompt_tokens, cached_tokens = self._prompt_tokens(payload)
+        completion_tokens = len(content) // 4
+        self.log.append({"route": "chat", "model": payload.get("model"), "bytes": len(body), "status": 200,
+                         "seconds": time.perf_counter() - t0})
+        h._send(200, "application/json", json.dumps({
+            "id": f"chatcmpl-stub{len(self.log)}", "object": "chat.completion", "created": int(time.time()),
+            "model": payload.get("model") or "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+        }).encode())
+
+    def _prompt_tokens(self, payload: Dict[str, Any]):
+        # ~4 chars/token, schema included; like the API, a prefix (schema + leading system messages) seen before is
+        # served from cache once the prompt reaches 1024 tokens, in 128-token steps
+        messages = payload.get("messages") or []
+        head = messages[:next((i for i, m in enumerate(messages) if m.get("role") != "system"), len(messages))]
+        prefix = json.dumps([payload.get("response_format"), head], sort_keys=True)
+        total = (len(json.dumps(payload.get("response_format") or "")) + sum(len(str(m.get("content") or "")) for m in messages)) // 4 \
+            + 4 * len(messages)
+        with self._lock:
+            seen = prefix in self._prefixes
+            self._prefixes.add(prefix)
+        cached = (min(total, len(prefix) // 4) // 128 * 128) if seen and total >= 1024 else 0
+        return total, cached
+
+    def transcribe(self, h: BaseHTTPRequestHandler, body: bytes):
+        time.sleep(max(0.0, self._delay() - self.latency_s))  # the jitter tail; latency is the server's own base_s
+        super().transcribe(h, body)
+
+    def stats(self) -> Dict[str, Dict[int, int]]:
+        out: Dict[str, Dict[int, int]] = {}
+        for e in list(self.log):
+            by = out.setdefault(e.get("route", "audio"), {})
+            by[e["status"]] = by.get(e["status"], 0) + 1
+        return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline stub of the OpenAI chat completions and transcription endpoints.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=600, help="base chat completion latency")
+    ap.add_argument("--jitter-ms", type=float, default=300, help="mean of the exponential latency tail")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered 500")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="share of calls answered 429")
+    ap.add_argument("--rate-per-s", type=float, default=0.0, help="quota in calls/s, 429 above it (0 = unlimited)")
+    ap.add_argument("--transcript", default=DEFAULT_TRANSCRIPT)
+    args = ap.parse_args(argv)
+    load_default_roster()  # answers come from core.rule_based_extract, which needs the roster's cities
+    srv = StubOpenAIServer(args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate,
+                           args.throttle_rate, args.rate_per_s, transcript=args.transcript)
+    print(f"stub OpenAI server on {srv.url}", file=sys.stderr)
+    try: srv.httpd.serve_forever()
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
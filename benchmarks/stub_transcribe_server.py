@@ -0,0 +1,110 @@
+from __future__ import annotations
+# === Local stand-in for the OpenAI transcription endpoint (offline voice tests & benchmarks) ===
+# Usage: python benchmarks/stub_transcribe_server.py --port 8765
+#        OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python app.py
+# Emulates a slow uplink (sleep per uploaded byte), server time proportional to audio length,
+# SSE streaming (transcript.text.delta ... transcript.text.done) and per-model failures or slowdowns.
+
+from typing import List, Dict, Optional, Set, Any
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io, re, sys, json, time, wave, argparse, threading
+
+DEFAULT_TRANSCRIPT = "Satyanarayan Katha in Howrah, next Monday evening"
+
+def _field(body: bytes, name: str) -> Optional[str]:
+    m = re.search(rb'name="' + name.encode() + rb'"\r\n\r\n(.*?)\r\n--', body, re.S)
+    return m.group(1).decode() if m else None
+
+def _audio_seconds(body: bytes) -> float:
+    i = body.find(b"RIFF")
+    if i >= 0:
+        try:
+            with wave.open(io.BytesIO(body[i:]), "rb") as w: return w.getnframes() / float(w.getframerate())
+        except Exception: pass
+    return len(body) / 32_000.0  # unknown container: assume ~16 kHz 16-bit
+
+class StubTranscribeServer:
+    def __init__(self, port: int = 0, transcript: str = DEFAULT_TRANSCRIPT, uplink_bytes_per_s: float = 250_000,
+                 proc_s_per_audio_s: float = 0.1, base_s: float = 0.05, tail_s: float = 0.3,
+                 fail_models: Optional[Set[str]] = None, model_delay_s: Optional[Dict[str, float]] = None):
+        self.transcript, self.uplink, self.proc, self.base_s, self.tail_s = \
+            transcript, uplink_bytes_per_s, proc_s_per_audio_s, base_s, tail_s
+        self.fail_models = set(fail_models or ())
+        self.model_delay_s = dict(model_delay_s or {})  # extra server time per model (a degraded upstream)
+        self.log: List[Dict[str, Any]] = []  # one entry per request: model, bytes, stream, status
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *a): pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                stub.handle(self, body)
+
+            def _send(self, code: int, ctype: str, data: bytes):
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, obj: Dict[str, Any]):
+                try:
+                    self.wfile.write(b"data: " + json.dumps(obj).encode() + b"\n\n"); self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError): pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/v1"
+
+    def handle(self, h: BaseHTTPRequestHandler, body: bytes):
+        # one POST; subclasses add routes (see stub_openai_server.py)
+        if h.path.endswith("/audio/transcriptions"): self.transcribe(h, body)
+        else: h.send_error(404)
+
+    def transcribe(self, h: BaseHTTPRequestHandler, body: bytes):
+        model, stream = _field(body, "model"), _field(body, "stream") == "true"
+        if self.uplink: time.sleep(len(body) / self.uplink)  # bytes still "in flight" on a slow uplink
+        entry = {"model": model, "bytes": len(body), "stream": stream, "status": 200}
+        self.log.append(entry)
+        if model in self.fail_models:
+            entry["status"] = 400
+            h._send(400, "application/json", json.dumps({"error": {"message": "stub failure"}}).encode())
+            return
+        work = self.base_s + self.proc * _audio_seconds(body) + self.model_delay_s.get(model, 0.0)
+        if not stream:
+            time.sleep(work)
+            h._send(200, "text/plain", self.transcript.encode())
+            return
+        h.send_response(200)
+        h.send_header("Content-Type", "text/event-stream")
+        h.end_headers()
+        words = self.transcript.split()
+        for w in words:
+            time.sleep(work / max(1, len(words)))
+            h._event({"type": "transcript.text.delta", "delta": w + " "})
+        h._event({"type": "transcript.text.done", "text": self.transcript})
+        time.sleep(self.tail_s)  # usage/bookkeeping before close; clients shouldn't wait for it
+
+    def start(self) -> "StubTranscribeServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline stub of /v1/audio/transcriptions.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--transcript", default=DEFAULT_TRANSCRIPT)
+    ap.add_argument("--uplink-kbps", type=float, default=2000, help="simulated client uplink, 0 = unlimited")
+    ap.add_argument("--fail-model", action="append", default=[], help="answer 400 for this model (repeatable)")
+    args = ap.parse_args(argv)
+    srv = StubTranscribeServer(args.port, args.transcript, args.uplink_kbps * 125, fail_models=set(args.fail_model))
+    print(f"stub transcription server on {srv.url}", file=sys.stderr)
+    try: srv.httpd.serve_forever()
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
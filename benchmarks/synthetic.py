@@ -0,0 +1,100 @@
+from __future__ import annotations
+# === Synthetic pandit rosters & query corpora for benchmarks (deterministic per seed) ===
+
+from typing import List, Dict, Optional, Any
+import random, json
+
+import llm, roster
+from core import Pandit, CITY_COORDS, PUJA_CATALOG, WINDOW_MAP
+
+CITIES = list(CITY_COORDS)
+SEED_PANDITS = list(roster.open_roster().pandits)  # the 100 records of data/pandits.csv; not installed
+SPEC_TRIPLES = [p.specializations for p in SEED_PANDITS[20:]]  # ids 21..100 follow the patterns below
+DAY_CYCLES = [["Mon","Wed","Fri"], ["Tue","Thu","Sat"], ["Sat","Sun"], ["Mon","Tue","Thu"], ["Wed","Fri","Sun"], ["Mon","Sat"]]
+WIDE_LANG_CITIES = {"Siliguri","Kolkata","Bidhannagar","Salt Lake","Kalyani"}
+LANGS_WIDE, LANGS_NARROW = ["Hindi","English","Bengali"], ["Hindi","Bengali"]
+WINDOWS_ODD = [("morning","08:00","10:00")]
+WINDOWS_EVEN = [("afternoon","12:00","14:30"),("evening","17:30","19:00")]
+WEEKDAY_NAMES = ["monday","tuesday","wednesday","thursday","friday","saturday","sunday"]
+BUDGETS = [None, 500, 700, 900, 1000]
+
+# ---------- Pandits ----------
+def fee_for(i: int) -> int:
+    return [500,600,700,800,900,1000][(i-1)%6]
+
+def make_pandit(pid: int, rng: random.Random) -> Pandit:
+    # same shape as ids 21..100 of data/pandits.csv; city/specialization/home point drawn at random so
+    # posting lists and distances aren't perfectly periodic. Lists are shared to keep 1M rosters small.
+    city = rng.choice(CITIES)
+    lat, lon = CITY_COORDS[city]
+    return Pandit(
+        pid, f"Pandit {city} {pid}", rng.choice(SPEC_TRIPLES), fee_for(pid), city,
+        LANGS_WIDE if city in WIDE_LANG_CITIES else LANGS_NARROW,
+        4.0 + ((pid % 10) / 10.0), 4 + (pid % 10),
+        "either" if pid % 5 in (0,2) else ("online" if pid % 3 == 0 else "onsite"),
+        f"+91981{pid:07d}",
+        WINDOWS_ODD if pid % 2 else WINDOWS_EVEN,
+        DAY_CYCLES[(pid-1) % len(DAY_CYCLES)],
+        lat + rng.uniform(-0.06, 0.06), lon + rng.uniform(-0.06, 0.06),  # spread across the city, ~±6 km
+    )
+
+def make_pandits(n: int, seed: int = 0) -> List[Pandit]:
+    # keeps the 100 real pandits first, then pads with synthetic ones (or truncates below 100)
+    base = SEED_PANDITS[:n]
+    rng = random.Random(seed)
+    return base + [make_pandit(pid, rng) for pid in range(len(base)+1, n+1)]
+
+# ---------- Queries ----------
+def _phrase(puja: str, city: str, window: str, weekday: Optional[str], budget: Optional[int], rng: random.Random) -> str:
+    when = f"{rng.choice(['next','this','coming',''])} {weekday}".strip() if weekday else rng.choice(["tomorrow","today",""])
+    win = window if rng.random() < 0.8 else {"morning":"9 am","afternoon":"1:30 pm","evening":"6 pm","night":"9 pm"}[window]
+    parts = [puja, f"in {city}", when, win]
+    if budget: parts.append(f"budget {budget}")
+    return " ".join(p for p in parts if p)
+
+def make_queries(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    # every (puja, window, weekday-or-none, budget) combination appears once before any repeats
+    rng = random.Random(seed)
+    combos = [(pj, w, wd, b) for pj in PUJA_CATALOG for w in WINDOW_MAP for wd in WEEKDAY_NAMES+[None] for b in BUDGETS]
+    out = []
+    while len(out) < n:
+        rng.shuffle(combos)
+        for pj, w, wd, b in combos[:n-len(out)]:
+            city = rng.choice(CITIES)
+            out.append({"text": _phrase(pj, city, w, wd, b, rng),
+                        "fields": {"puja_type": pj, "city": city, "time_window": w, "budget_inr": b}})
+    return out
+
+# ---------- Stub OpenAI client (offline, deterministic) ----------
+class _Obj:
+    def __init__(self, **kw): self.__dict__.update(kw)
+
+class StubOpenAI:
+    # Answers chat completions from a text -> fields table (the generator's ground truth),
+    # and transcriptions with a fixed phrase. No network, no randomness.
+    def __init__(self, answers: Optional[Dict[str, Dict[str, Any]]] = None,
+                 transcript: str = "Satyanarayan Katha in Howrah, next Monday evening"):
+        self.answers = answers or {}
+        self.calls = 0
+        stub = self
+        class _Completions:
+            def create(self, model: str, messages: List[Dict[str, str]], **kw):
+                stub.calls += 1
+                prompt = messages[-1]["content"]
+                user = prompt.rsplit("User:", 1)[-1].strip()
+                fields = stub.answers.get(user, {})
+                body = json.dumps({**{"puja_type": None, "when_date": None, "time_window": None, "city": None,
+                                      "budget_inr": None, "language_pref": None, "conf": {}}, **fields})
+                return _Obj(choices=[_Obj(message=_Obj(content=body))])
+        class _Transcriptions:
+            def create(self, model: str, file, **kw):
+                stub.calls += 1
+                if not isinstance(file, tuple): file.read()  # (name, bytes, type) uploads are already in memory
+                return transcript
+        self.chat = _Obj(completions=_Completions())
+        self.audio = _Obj(transcriptions=_Transcriptions())
+
+def install_stub(queries: List[Dict[str, Any]]) -> StubOpenAI:
+    stub = StubOpenAI({q["text"]: q["fields"] for q in queries})
+    llm.set_openai_clients(stub)
+    return stub
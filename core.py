@@ -0,0 +1,1180 @@
+from __future__ import annotations
+# === Puja Booking core — catalog, pandit roster, parsing & ranking (headless: no Gradio/OpenAI) ===
+
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Set, Iterator, Literal, Hashable
+import os, re, csv, math, hashlib, threading
+from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime, timedelta, date, time as dtime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from pydantic import BaseModel, Field
+from rapidfuzz import process, fuzz
+
+import metrics
+from metrics import span
+
+TZ = "Asia/Kolkata"
+IST = ZoneInfo(TZ)
+
+# ---------- Puja Catalog ----------
+PUJA_CATALOG = [
+    "Satyanarayan Katha","Griha Pravesh","Mundan","Rudra Abhishek",
+    "Ganesh Puja","Navgrah Shanti","Durga Puja","Lakshmi Puja",
+    "Mahamrityunjaya Jaap","Kaal Sarp Dosh Puja","Hanuman Puja",
+    "Sundarkand Path","Katha & Havan","Vastu Shanti","Narayan Nagbali",
+    "Saraswati Puja","Chandi Path","Navratri Puja","Sat Chandi Yagya"
+]
+
+# ---------- Puja Samagri ----------
+PUJA_SAMAGRI: Dict[str, List[str]] = {
+    "Satyanarayan Katha": ["Kalash with coconut & mango leaves","Panchamrit","Haldi-Kumkum","Rice (Akshat)","Diya & Ghee","Flowers","Fruits & Sweets","Banana leaves","Tulsi leaves","Red cloth"],
+    "Griha Pravesh": ["Kalash & Coconut","Mango leaves","Ganga Jal","Turmeric & Kumkum","Rice","Dhoop/Incense","Camphor","Flowers","Havan samagri","Wheat flour (swastik)"],
+    "Mundan": ["New blade/razor","Holy water","Cotton","Haldi paste","Flowers","Coconut","Rice","Camphor","Cloth","Mirror (optional)"],
+    "Rudra Abhishek": ["Milk","Curd","Honey","Ghee","Sugar","Bilva leaves","Water","Black sesame","Roli & Rice"],
+    "Ganesh Puja": ["Ganesh idol/photo","Durva grass","Modak/Laddu","Red cloth","Haldi-Kumkum","Rice","Incense","Camphor","Flowers","Fruits"],
+    "Navgrah Shanti": ["Navgrah yantra","Nine grains","Flowers","Multi-color cloth","Til (sesame)","Havan samagri","Ghee","Fruits","Sweets"],
+    "Durga Puja": ["Durga idol/photo","Red cloth","Sindoor","Flowers","Fruits","Sweets","Incense","Camphor","Havan samagri","Kalash"],
+    "Lakshmi Puja": ["Lakshmi idol/photo","Lotus flowers","Kumkum","Akshat","Coins","Kalash & Coconut","Diya & Ghee","Fruits","Sweets"],
+    "Mahamrityunjaya Jaap": ["Shiv yantra","Bilva leaves","Panchamrit","Water","Black sesame","Camphor","Incense","Flowers"],
+    "Kaal Sarp Dosh Puja": ["Abhishek dravya","Naag-Nagin idols (optional)","Kalash","Black sesame","Flowers","Havan samagri","Camphor"],
+    "Hanuman Puja": ["Hanuman idol/photo","Sindoor","Jasmine oil","Betel leaves","Flowers","Fruits","Sweets","Incense","Camphor"],
+    "Sundarkand Path": ["Ramayan/Sundarkand book","Diya & Ghee","Incense","Camphor","Flowers","Fruits","Sweets","Asan (mat)"],
+    "Katha & Havan": ["Katha granth","Kalash","Coconut","Havan kund","Havan samagri","Ghee","Camphor","Spoons & Pot","Darbha (Kusha) grass"],
+    "Vastu Shanti": ["Navgrah yantra","Havan samagri","Kalash","Coconut","Haldi-Kumkum","Rice","Flowers","Fruits"],
+    "Narayan Nagbali": ["Sankalp items","Pind daan samagri","Kusha grass","Black sesame","White clothes","Flowers","Havan samagri"],
+    "Saraswati Puja": ["Saraswati idol/photo","White cloth","Books/Instruments","Flowers","Fruits","Sweets","Incense","Camphor"],
+    "Chandi Path": ["Chandi text","Kalash","Coconut","Red cloth","Sindoor","Flowers","Fruits","Havan samagri"],
+    "Navratri Puja": ["Kalash","Coconut","Red cloth","Akshat","Sindoor","Flowers","Fruits","Nava Dhanya","Diyas"],
+    "Sat Chandi Yagya": ["Chandi yantra","Havan kund","Havan samagri (large)","Ghee (extra)","Sruva/wooden spoons","Darbha grass","Fruits","Sweets","Cloths"]
+}
+
+# ---------- Extra Puja Instructions ----------
+PUJA_INSTRUCTIONS: Dict[str, Dict[str, str]] = {
+    "Satyanarayan Katha": {"prep":"Clean puja area; keep kalash ready.","duration":"~1.5–2 hours","dress":"Traditional/ethnic, light colors preferred.","notes":"Family members may keep light fast; distribute prasad to all."},
+    "Griha Pravesh": {"prep":"Home must be cleaned; threshold decorated with rangoli.","duration":"~2–3 hours","dress":"Traditional; head covered during sankalp.","notes":"Enter house right foot first while carrying kalash."},
+    "Mundan": {"prep":"Child’s hair wetted; razor sterilized.","duration":"~45–60 mins","dress":"Comfortable; towel/cloth handy.","notes":"Do in auspicious muhurat; protect scalp from sun after."},
+    "Rudra Abhishek": {"prep":"Abhishek dravya & bilva leaves ready.","duration":"~1–1.5 hours","dress":"Traditional/clean clothes.","notes":"Avoid non-veg & alcohol before/after puja."},
+    "Ganesh Puja": {"prep":"Place Ganesh on clean red cloth.","duration":"~60–90 mins","dress":"Traditional.","notes":"Offer 21 durva & modaks if possible."},
+    "Navgrah Shanti": {"prep":"Nine grains arranged in yantra.","duration":"~2 hours","dress":"Traditional.","notes":"Pandit will guide on specific graha daan."},
+    "Durga Puja": {"prep":"Kalash sthapana; red chunri ready.","duration":"~2–3 hours","dress":"Red/bright shades traditional.","notes":"Kumkum tilak and sindoor offered."},
+    "Lakshmi Puja": {"prep":"De-clutter wealth area; place coins.","duration":"~60–90 mins","dress":"Clean/bright traditional.","notes":"Keep account books/locker keys near idol."},
+    "Mahamrityunjaya Jaap": {"prep":"Silent & clean environment.","duration":"~1.5–3 hours","dress":"Traditional, simple.","notes":"Best performed on Mondays/Pradosh."},
+    "Kaal Sarp Dosh Puja": {"prep":"Sankalp details ready.","duration":"~2 hours","dress":"Traditional (prefer white).","notes":"Follow pandit’s guidance strictly."},
+    "Hanuman Puja": {"prep":"Apply sindoor and oil as per vidhi.","duration":"~45–75 mins","dress":"Traditional.","notes":"Chant Hanuman Chalisa collectively."},
+    "Sundarkand Path": {"prep":"Arrange path copies for participants.","duration":"~2–3 hours","dress":"Traditional.","notes":"Light snacks & water for participants."},
+    "Katha & Havan": {"prep":"Open ventilated area for havan.","duration":"~1.5–2 hours","dress":"Traditional; cotton preferred.","notes":"Keep water & fire safety in place."},
+    "Vastu Shanti": {"prep":"House map & owner details handy.","duration":"~2 hours","dress":"Traditional.","notes":"Ideal before/after renovation or shifting."},
+    "Narayan Nagbali": {"prep":"Special sankalp; consult pandit.","duration":"~1–2 days (elaborate)","dress":"White traditional.","notes":"Typically at specified tirtha; local simplified version possible."},
+    "Saraswati Puja": {"prep":"Keep books/instruments near idol.","duration":"~60–90 mins","dress":"White/yellow traditional.","notes":"Good day for students to start studies."},
+    "Chandi Path": {"prep":"Quiet place; text copies arranged.","duration":"~2–3 hours","dress":"Traditional.","notes":"Can be done with homa as per need."},
+    "Navratri Puja": {"prep":"Kalash sthapana day 1.","duration":"Daily ~45–60 mins","dress":"Traditional.","notes":"Observe simple satvik diet."},
+    "Sat Chandi Yagya": {"prep":"Large havan setup.","duration":"~4–6 hours","dress":"Traditional.","notes":"Requires extended samagri & arrangements."}
+}
+
+# ---------- Time windows & weekdays (the coded domains of a Pandit record) ----------
+WINDOW_MAP = {
+    "morning": (dtime(8,0), dtime(11,0)),
+    "afternoon": (dtime(12,0), dtime(16,0)),
+    "evening": (dtime(17,0), dtime(20,0)),
+    "night": (dtime(20,0), dtime(22,0))
+}
+WEEKDAY_TOKEN = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+WINDOW_LABELS = list(WINDOW_MAP)
+WINDOW_SLOT = {label: i for i, label in enumerate(WINDOW_MAP)}
+DAY_SLOT = {tok: i for i, tok in enumerate(WEEKDAY_TOKEN)}
+NO_WINDOW = -1
+SERVICE_MODES = ("onsite", "online", "either")
+
+def _to_minutes(hhmm: str) -> int:
+    hh, mm = map(int, hhmm.split(":")); return hh*60 + mm
+
+def _hhmm(mins: int) -> str:
+    return f"{mins // 60:02d}:{mins % 60:02d}"
+
+class Codebook:
+    # append-only name <-> small int table; Pandit records hold the ints, equal code tuples are shared
+    def __init__(self, names: Tuple[str, ...] = ()):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._tuples: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        for n in names: self.code(n)
+
+    def code(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self.ids.get(name)
+                if i is None:
+                    i = len(self.names); self.names.append(name); self.ids[name] = i
+        return i
+
+    def codes(self, names) -> Tuple[int, ...]:
+        t = tuple(self.code(n) for n in names)
+        return self._tuples.setdefault(t, t)
+
+CITY_BOOK, SPEC_BOOK, LANG_BOOK = Codebook(), Codebook(PUJA_CATALOG), Codebook()
+_DAYS_OF = [tuple(d for i, d in enumerate(WEEKDAY_TOKEN) if bits >> i & 1) for bits in range(1 << len(WEEKDAY_TOKEN))]
+
+@lru_cache(maxsize=4096)
+def _parse_windows(time_windows: Tuple[Tuple[str, str, str], ...]) -> Tuple[tuple, Tuple[int, ...], int]:
+    # ((slot, start, end) minutes per window, midpoint per slot (first window per label wins), label bitmask)
+    windows, mid, bits = [], [NO_WINDOW] * len(WINDOW_SLOT), 0
+    for label, start, end in time_windows:
+        slot = WINDOW_SLOT.get(label)
+        if slot is None: raise ValueError(f"unknown time window {label!r}")
+        a, b = _to_minutes(start), _to_minutes(end)
+        windows.append((slot, a, b))
+        if mid[slot] == NO_WINDOW: mid[slot], bits = (a + b)//2, bits | 1 << slot
+    return tuple(windows), tuple(mid), bits
+
+@lru_cache(maxsize=1024)
+def _day_bits(days: Tuple[str, ...]) -> int:
+    try: return sum(1 << DAY_SLOT[d] for d in set(days))
+    except KeyError as e: raise ValueError(f"unknown weekday {e.args[0]!r}") from None
+
+# ---------- Pandit model (with weekday availability) ----------
+class Pandit:
+    # Compact roster record (a million of these stay small): __slots__, city/specializations/languages as codes
+    # into the books above, windows pre-parsed to minutes with a midpoint per label, weekday/window bitmasks.
+    # The string-valued fields are read-only properties decoded on access, so the UI, the roster files and
+    # Pandit(...) calls see the same fields as before.
+    FIELDS = ("id", "name", "specializations", "base_fee", "city", "languages", "rating", "experience_years",
+              "service_mode", "phone", "time_windows", "days", "lat", "lon", "off_dates")
+    __slots__ = ("id", "name", "base_fee", "rating", "experience_years", "phone", "lat", "lon", "off_dates",
+                 "city_id", "spec_ids", "lang_ids", "mode_id", "windows", "window_mid", "window_bits", "day_bits")
+
+    def __init__(self, id: int, name: str, specializations: List[str], base_fee: int, city: str,
+                 languages: List[str], rating: float, experience_years: int, service_mode: str, phone: str,
+                 time_windows: List[Tuple[str,str,str]],  # (label, start, end)
+                 days: List[str],  # e.g., ["Mon","Wed","Fri"]
+                 lat: Optional[float] = None, lon: Optional[float] = None,  # home location; None = use the city centre
+                 off_dates: Tuple[date, ...] = ()):  # one-off unavailability (travel, leave) on top of the weekly days
+        if service_mode not in SERVICE_MODES: raise ValueError(f"unknown service mode {service_mode!r}")
+        self.id, self.name, self.base_fee, self.rating, self.experience_years = id, name, base_fee, rating, experience_years
+        self.phone, self.lat, self.lon, self.off_dates = phone, lat, lon, tuple(off_dates)
+        self.city_id, self.mode_id = CITY_BOOK.code(city), SERVICE_MODES.index(service_mode)
+        self.spec_ids, self.lang_ids = SPEC_BOOK.codes(specializations), LANG_BOOK.codes(languages)
+        self.windows, self.window_mid, self.window_bits = _parse_windows(tuple(map(tuple, time_windows)))
+        self.day_bits = _day_bits(tuple(days))
+
+    city = property(lambda self: CITY_BOOK.names[self.city_id])
+    specializations = property(lambda self: [SPEC_BOOK.names[c] for c in self.spec_ids])
+    languages = property(lambda self: [LANG_BOOK.names[c] for c in self.lang_ids])
+    service_mode = property(lambda self: SERVICE_MODES[self.mode_id])
+    time_windows = property(lambda self: [(WINDOW_LABELS[s], _hhmm(a), _hhmm(b)) for s, a, b in self.windows])
+    days = property(lambda self: list(_DAYS_OF[self.day_bits]))
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __eq__(self, other):
+        return self._values() == other._values() if isinstance(other, Pandit) else NotImplemented
+
+    __hash__ = None  # mutable, like the dataclass it replaced
+
+    def __repr__(self):
+        return "Pandit(" + ", ".join(f"{f}={v!r}" for f, v in zip(self.FIELDS, self._values())) + ")"
+
+    def __reduce__(self):
+        # pickle by value: codes are only meaningful inside this process's books
+        return Pandit, self._values()
+
+# ---------- Roster ----------
+# The pandits live in ROSTER_FILE (data/pandits.csv by default), their only copy. Importing this module loads
+# nothing: roster.start() (the app) or roster.load_default_roster() (scripts, tests) installs the file.
+PANDITS: List[Pandit] = []
+
+# ---------- Candidate Index (specialization / time window / weekday posting lists) ----------
+# candidates() intersects the smallest posting lists first and returns pandits in insertion
+# order, i.e. exactly what a linear scan over PANDITS with the same filters would yield.
+class PanditIndex:
+    def __init__(self, pandits: List[Pandit] = ()):
+        self.by_id: Dict[int, Pandit] = {}
+        self.order: Dict[int, int] = {}
+        self.by_spec: Dict[str, set] = {}
+        self.by_window: Dict[str, set] = {}
+        self.by_day: Dict[str, set] = {}
+        self.by_off: Dict[date, set] = {}
+        self._seq = 0
+        for p in pandits: self.add(p)
+
+    def _postings(self, p: Pandit):
+        yield from ((self.by_spec, SPEC_BOOK.names[c]) for c in p.spec_ids)
+        yield from ((self.by_window, WINDOW_LABELS[slot]) for slot, _, _ in p.windows)
+        yield from ((self.by_day, d) for d in _DAYS_OF[p.day_bits])
+        yield from ((self.by_off, d) for d in p.off_dates)
+
+    def add(self, p: Pandit):
+        if p.id in self.by_id: self.remove(p.id)
+        self.by_id[p.id] = p
+        self.order[p.id] = self._seq; self._seq += 1
+        for table, key in self._postings(p):
+            table.setdefault(key, set()).add(p.id)
+
+    def remove(self, pid: int):
+        p = self.by_id.pop(pid, None)
+        if p is None: return
+        del self.order[pid]
+        for table, key in self._postings(p):
+            ids = table.get(key)
+            if ids is None: continue
+            ids.discard(pid)
+            if not ids: del table[key]
+
+    def candidates(self, puja_type: Optional[str]=None, window: Optional[str]=None,
+                   weekday: Optional[str]=None, near: Optional[set]=None, on: Optional[date]=None) -> List[Pandit]:
+        # `near` (ids from GEO_INDEX) is intersected like any other posting list; `on` drops pandits off that date
+        lists = [] if near is None else [near]
+        if puja_type: lists.append(self.by_spec.get(puja_type, set()))
+        if window: lists.append(self.by_window.get(window, set()))
+        if weekday: lists.append(self.by_day.get(weekday, set()))
+        if not lists:
+            ids = self.by_id.keys()
+        else:
+            lists.sort(key=len)
+            ids = lists[0].intersection(*lists[1:])
+        if on is not None and on in self.by_off: ids = set(ids) - self.by_off[on]
+        return [self.by_id[i] for i in sorted(ids, key=self.order.__getitem__)]
+
+    def off_on(self, day: date) -> Optional[np.ndarray]:
+        # ids of pandits off on this date, or None
+        ids = self.by_off.get(day)
+        return np.fromiter(ids, dtype=np.int64, count=len(ids)) if ids else None
+
+PANDIT_INDEX = PanditIndex(PANDITS)
+
+
+# ---------- City Coordinates ----------
+CITY_COORDS = {
+    "Kolkata": (22.5726, 88.3639),    "Howrah": (22.5958, 88.2636),
+    "Siliguri": (26.7271, 88.3953),   "Durgapur": (23.5204, 87.3119),
+    "Asansol": (23.6739, 86.9524),    "Kharagpur": (22.3460, 87.2319),
+    "Bardhaman": (23.2324, 87.8615),  "Haldia": (22.0667, 88.0698),
+    "Kalyani": (22.9868, 88.4345),    "Bidhannagar": (22.5726, 88.4333),
+    "Salt Lake": (22.6070, 88.4273),  "Hooghly": (22.9089, 88.3966),
+    "Behala": (22.5010, 88.2950),     "Barasat": (22.7229, 88.4800),
+    "Bally": (22.6500, 88.3400),      "Serampore": (22.7528, 88.3426),
+    "Krishnanagar": (23.4058, 88.4900),"Jalpaiguri": (26.5435, 88.7200),
+    "Malda": (25.0108, 88.1411),      "Murshidabad": (24.1750, 88.2800),
+    "Bankura": (23.2324, 87.0750),    "Purulia": (23.3300, 86.3650),
+    "Midnapore": (22.4300, 87.3200),
+}
+
+# ---------- Localities (bundled neighbourhood/pincode table) ----------
+# Named localities and pincodes resolve to a point, so users inside a metro are ranked by real distance
+# instead of "same city = 0 km". Loaded once from data/localities.csv (locality,city,pincode,lat,lon).
+LOCALITIES_CSV = os.environ.get("LOCALITIES_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "localities.csv"))
+
+@dataclass(frozen=True)
+class Locality:
+    name: str
+    city: str
+    pincode: str
+    lat: float
+    lon: float
+
+def load_localities(path: str = LOCALITIES_CSV) -> List[Locality]:
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            return [Locality(r["locality"].strip(), r["city"].strip(), r["pincode"].strip(), float(r["lat"]), float(r["lon"]))
+                    for r in csv.DictReader(f)]
+    except FileNotFoundError:
+        return []
+
+LOCALITIES: Dict[str, Locality] = {}  # name -> locality
+LOCALITY_BY_PIN: Dict[str, Locality] = {}
+for _loc in load_localities():
+    LOCALITIES.setdefault(_loc.name, _loc); LOCALITY_BY_PIN.setdefault(_loc.pincode, _loc)
+_PINCODE = re.compile(r"\b(7[0-4]\d{4})\b")  # West Bengal pincodes
+
+# ---------- Time Windows & parsing ----------
+WINDOW_ALIASES = {
+    "morning": ["morning","subah","early","am"],
+    "afternoon": ["afternoon","dopahar"],
+    "evening": ["evening","shaam","eve","pm"],
+    "night": ["night","raat","late night"]
+}
+def detect_window_and_time(text: str, hits: Optional[Dict[str, List[str]]] = None) -> Tuple[Optional[str], Optional[int]]:
+    t = text.lower()
+    m = re.search(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b", t)
+    if m:
+        hh = int(m.group(1)); mm = int(m.group(2) or 0); mer = m.group(3)
+        if mer:
+            if mer.lower()=="pm" and hh<12: hh+=12
+            if mer.lower()=="am" and hh==12: hh=0
+        user_mins = hh*60 + mm
+        best_label, best_delta = None, 10**9
+        for label,(s,e) in WINDOW_MAP.items():
+            mid = ((s.hour*60 + s.minute) + (e.hour*60 + e.minute))//2
+            d = abs(user_mins - mid)
+            if d < best_delta: best_label, best_delta = label, d
+        return best_label, user_mins
+    labels = (scan_entities(text) if hits is None else hits).get("window", ())
+    for label in WINDOW_ALIASES:
+        if label in labels: return label, None
+    return None, None
+
+# ---------- Date Parsing (IST; robust weekdays) ----------
+WEEKDAY_IDX = {"monday":0,"tuesday":1,"wednesday":2,"thursday":3,"friday":4,"saturday":5,"sunday":6}
+def _next_weekday(base_d: date, idx: int)->date:
+    delta=(idx-base_d.weekday())%7
+    if delta==0: delta=7
+    return base_d+timedelta(days=delta)
+def _this_or_next_weekday(base_d: date, idx: int)->date:
+    delta=(idx-base_d.weekday())%7
+    if delta==0: delta=7
+    return base_d+timedelta(days=delta)
+
+def _dateparser():
+    import dateparser  # ~0.3 s to import; only free-form dates need it
+    return dateparser
+
+# Fast-path grammar for the date forms users actually type (English + Hindi, Latin or Devanagari);
+# only what it can't resolve goes to dateparser. Slash dates are DD/MM, as written in India. Month aliases
+# leave out Hinglish look-alikes ("mai" is "in": "Howrah mai 6 baje"), and a number followed by a clock
+# marker (baje, am/pm, :30) is a time, never a day of the month.
+MONTH_IDX = {}
+for _i, _names in enumerate([
+    ("january","jan","janvari","जनवरी"), ("february","feb","farvari","फरवरी"), ("march","mar","मार्च"),
+    ("april","apr","aprail","अप्रैल"), ("may","मई"), ("june","jun","joon","जून"),
+    ("july","jul","julai","जुलाई"), ("august","aug","agast","अगस्त"),
+    ("september","sep","sept","sitambar","सितंबर","सितम्बर"), ("october","oct","aktubar","अक्टूबर"),
+    ("november","nov","navambar","नवंबर","नवम्बर"), ("december","dec","disambar","दिसंबर","दिसम्बर")], 1):
+    for _n in _names: MONTH_IDX[_n] = _i
+HINDI_WEEKDAY_IDX = {"somvar":0,"सोमवार":0,"mangalvar":1,"मंगलवार":1,"budhvar":2,"बुधवार":2,
+                     "guruvar":3,"brihaspativar":3,"गुरुवार":3,"shukravar":4,"शुक्रवार":4,
+                     "shanivar":5,"शनिवार":5,"ravivar":6,"रविवार":6}
+HINDI_DAY_OFFSET = {"aaj":0,"आज":0,"kal":1,"कल":1,"parso":2,"parson":2,"परसों":2}
+
+_B, _E = r"(?<![\w\u0900-\u097F])", r"(?![\w\u0900-\u097F])"  # \b that also works for Devanagari
+_MONTHS = "|".join(sorted(MONTH_IDX, key=len, reverse=True))
+_DATE_ISO = re.compile(rf"{_B}(\d{{4}})-(\d{{1,2}})-(\d{{1,2}}){_E}")
+_DATE_NUMERIC = re.compile(rf"{_B}(\d{{1,2}})(?:/(\d{{1,2}})(?:/(\d{{4}}|\d{{2}}))?|[.-](\d{{1,2}})[.-](\d{{4}})){_E}")
+_CLOCK = r"(?!\s*(?:baje|बजे|o'?clock|[ap]\.?m\b|[:.]\d))"
+_DATE_DAY_MONTH = re.compile(rf"{_B}(\d{{1,2}})(?:st|nd|rd|th)?\s*(?:of\s+)?({_MONTHS})\.?(?:,?\s*(\d{{4}}))?{_E}")
+_DATE_MONTH_DAY = re.compile(rf"{_B}({_MONTHS})\.?\s*(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s*(\d{{4}}))?{_E}{_CLOCK}")
+_DATE_IN_N = re.compile(rf"{_B}(?:in|after)\s+(\d{{1,3}})\s+(days?|weeks?){_E}"
+                        rf"|{_B}(\d{{1,3}})\s*(din|दिन|hafte|हफ्ते)\s*(?:baad|bad|me|mein|बाद|में){_E}")
+_DATE_WEEKEND = re.compile(rf"{_B}(?:(this|coming|next)\s+)?weekend{_E}")
+_DATE_HINDI_DAY = re.compile(rf"{_B}({'|'.join(HINDI_DAY_OFFSET)}){_E}")
+_DATE_HINDI_WEEKDAY = re.compile(rf"{_B}({'|'.join(HINDI_WEEKDAY_IDX)}){_E}")
+
+DATE_CACHE_SIZE = 4096
+DATE_PARSE_STATS = {"fast": 0, "slow": 0}
+
+def _not_past(d: date, base_d: date) -> date:
+    return d if d>=base_d else _next_weekday(base_d, base_d.weekday())
+
+def _day_month(base_d: date, day: int, month: int, year: Optional[str]) -> Optional[date]:
+    # no year -> next occurrence (like PREFER_DATES_FROM future); invalid days fall through
+    try:
+        if year: return _not_past(date(int(year) + (2000 if len(year)==2 else 0), month, day), base_d)
+        d = date(base_d.year, month, day)
+        return d if d>=base_d else date(base_d.year+1, month, day)
+    except ValueError:
+        return None
+
+def _fast_dates(t: str, base_d: date) -> Iterator[date]:
+    # one candidate per form that matches, in priority order; _fast_date takes the first
+    m = _DATE_ISO.search(t)
+    if m:
+        try: yield _not_past(date(int(m.group(1)), int(m.group(2)), int(m.group(3))), base_d)
+        except ValueError: pass
+    m = _DATE_NUMERIC.search(t)
+    if m:
+        if m.group(2): d = _day_month(base_d, int(m.group(1)), int(m.group(2)), m.group(3))
+        else: d = _day_month(base_d, int(m.group(1)), int(m.group(4)), m.group(5))
+        if d: yield d
+    m = _DATE_IN_N.search(t)  # relative Hindi/English forms first: "kal" beats a stray month-like token
+    if m:
+        n, unit = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        yield base_d + timedelta(days=int(n) * (7 if unit in ("week","weeks","hafte","हफ्ते") else 1))
+    m = _DATE_HINDI_DAY.search(t)
+    if m: yield base_d + timedelta(days=HINDI_DAY_OFFSET[m.group(1)])
+    for rx, day_g, mon_g in ((_DATE_DAY_MONTH, 1, 2), (_DATE_MONTH_DAY, 2, 1)):
+        m = rx.search(t)
+        if m:
+            d = _day_month(base_d, int(m.group(day_g)), MONTH_IDX[m.group(mon_g)], m.group(3))
+            if d: yield d
+    m = _DATE_WEEKEND.search(t)
+    if m:
+        sat = base_d if base_d.weekday() >= 5 else _next_weekday(base_d, 5)  # Sat/Sun: this one is now
+        yield sat + timedelta(days=7 if m.group(1)=="next" else 0)
+    m = _DATE_HINDI_WEEKDAY.search(t)
+    if m: yield _next_weekday(base_d, HINDI_WEEKDAY_IDX[m.group(1)])
+
+def _fast_date(t: str, base_d: date) -> Optional[date]:
+    return next(_fast_dates(t, base_d), None)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _dateparser_date(text: str, day: date) -> Optional[date]:
+    # memoized per (text, IST day); relative phrases only need day resolution
+    now = datetime.now(IST)
+    base_dt = now if now.date()==day else datetime.combine(day, dtime(0, 0), tzinfo=IST)
+    dp = _dateparser().parse(text, settings={
+        "RELATIVE_BASE": base_dt, "PREFER_DATES_FROM":"future", "TIMEZONE": TZ,
+        "RETURN_AS_TIMEZONE_AWARE": False, "PREFER_DAY_OF_MONTH":"first"
+    }, languages=["en","hi"])
+    return dp.date() if dp else None
+
+def date_parse_stats() -> Dict[str, int]:
+    info = _dateparser_date.cache_info()
+    return {**DATE_PARSE_STATS, "slow_cache_hits": info.hits, "slow_cache_size": info.currsize}
+
+metrics.GaugeFn("pandit_date_parse_total", "parse_date calls by path (fast grammar vs dateparser).",
+                lambda: {("fast",): DATE_PARSE_STATS["fast"], ("dateparser",): DATE_PARSE_STATS["slow"]},
+                ("path",), kind="counter")
+
+def parse_date(text: str) -> Optional[date]:
+    t = text.lower().strip()
+    base_d = datetime.now(IST).date()
+    d = _parse_date_fast(t, base_d)
+    if d is not None:
+        DATE_PARSE_STATS["fast"] += 1
+        return d
+    DATE_PARSE_STATS["slow"] += 1
+    d = _dateparser_date(text, base_d)
+    return _not_past(d, base_d) if d else None
+
+def _date_candidates(t: str, base_d: date) -> Iterator[date]:
+    # English relative words and weekday names, then the rest of the fast grammar
+    if re.search(r"\bday after tomorrow\b", t): yield base_d+timedelta(days=2)
+    elif re.search(r"\btomorrow\b", t): yield base_d+timedelta(days=1)
+    elif re.search(r"\btoday\b", t): yield base_d
+    m = re.search(r"\b(next|this|coming)\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", t)
+    if m:
+        qual, wd = m.group(1), m.group(2); idx=WEEKDAY_IDX[wd]
+        if qual=="next": yield _next_weekday(base_d, idx)+timedelta(days=7)
+        else: yield _this_or_next_weekday(base_d, idx)
+    elif (m2 := re.search(r"\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", t)):
+        yield _next_weekday(base_d, WEEKDAY_IDX[m2.group(1)])
+    yield from _fast_dates(t, base_d)
+
+def _parse_date_fast(t: str, base_d: date) -> Optional[date]:
+    return next(_date_candidates(t, base_d), None)
+
+def date_mentions(text: str) -> Set[date]:
+    # every date the fast grammar reads, one per form; more than one means the message (or the grammar) disagrees
+    # with itself, e.g. "may 6 kal" -- the tiered gate sends those to the LLM
+    return set(_date_candidates(text.lower().strip(), datetime.now(IST).date()))
+
+# ---------- Date ranges ("any weekend in the next two weeks", "any evening this month") ----------
+RANGE_MAX_DAYS = int(os.environ.get("RANGE_MAX_DAYS", "62"))
+RANGE_DEFAULT_DAYS = 28  # horizon for "any weekend" / "any monday" when no period is given
+_COUNT_WORDS = {"a":1,"an":1,"one":1,"two":2,"three":3,"four":4,"five":5,"six":6,"couple of":2,"few":3}
+_WEEKDAY_NAMES = "|".join(WEEKDAY_IDX)
+_RANGE_SPAN = re.compile(rf"{_B}(\d{{1,2}})(?:st|nd|rd|th)?\s*(?:-|to|till|until|and)\s*(\d{{1,2}})(?:st|nd|rd|th)?\s*(?:of\s+)?({_MONTHS}){_E}")
+_RANGE_NEXT_N = re.compile(rf"{_B}(?:next|coming|within)\s+(?:the\s+next\s+)?(\d{{1,2}}|{'|'.join(_COUNT_WORDS)})\s+(days?|weeks?){_E}")
+_RANGE_PERIOD = re.compile(rf"{_B}(this|next|coming|agle|अगले|(?:is|इस)(?=\s+(?:hafte|mahine|हफ्ते|महीने)))"
+                           rf"\s+(week|fortnight|month|hafte|mahine|हफ्ते|महीने){_E}")
+_RANGE_MONTH = re.compile(rf"{_B}(?:in|during|for|throughout)\s+({_MONTHS}){_E}")
+_RANGE_WEEKENDS = re.compile(rf"{_B}(?:(?:any|every|all)\s+(?:the\s+)?weekends?|weekends){_E}")
+_RANGE_WEEKDAYS = re.compile(rf"{_B}(?:(?:any|every|all)\s+weekdays?|weekdays){_E}")
+_RANGE_NAMED_DAY = re.compile(rf"{_B}(?:(?:any|every|all)\s+({_WEEKDAY_NAMES})s?|({_WEEKDAY_NAMES})s){_E}")
+_RANGE_ANY = re.compile(rf"{_B}any\s+(?:day|date|time|morning|afternoon|evening|night){_E}|{_B}(?:whenever|flexible){_E}")
+
+def _month_end(d: date) -> date:
+    nxt = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+    return nxt - timedelta(days=1)
+
+def parse_date_range(text: str) -> Optional[Tuple[date, date, Optional[List[str]]]]:
+    # (first day, last day, weekday tokens or None) when the message asks for a span of dates, else None
+    t = text.lower().strip()
+    base_d = datetime.now(IST).date()
+    start = end = None
+    m = _RANGE_SPAN.search(t)
+    if m:
+        start = _day_month(base_d, int(m.group(1)), MONTH_IDX[m.group(3)], None)
+        end = _day_month(start or base_d, int(m.group(2)), MONTH_IDX[m.group(3)], None)
+    elif (m := _RANGE_NEXT_N.search(t)):
+        n = int(m.group(1)) if m.group(1).isdigit() else _COUNT_WORDS[m.group(1)]
+        start, end = base_d, base_d + timedelta(days=n * (7 if m.group(2).startswith("week") else 1) - 1)
+    elif (m := _RANGE_PERIOD.search(t)):
+        nxt = m.group(1) in ("next", "coming", "agle", "अगले")
+        unit = {"hafte": "week", "हफ्ते": "week", "mahine": "month", "महीने": "month"}.get(m.group(2), m.group(2))
+        if unit == "week":
+            start = base_d + timedelta(days=7 - base_d.weekday()) if nxt else base_d
+            end = start + timedelta(days=6 - start.weekday())
+        elif unit == "fortnight":
+            start, end = base_d, base_d + timedelta(days=13)
+        else:
+            start = _month_end(base_d) + timedelta(days=1) if nxt else base_d
+            end = _month_end(start)
+    elif (m := _RANGE_MONTH.search(t)):
+        month = MONTH_IDX[m.group(1)]
+        first = date(base_d.year + (month < base_d.month), month, 1)
+        start, end = max(first, base_d), _month_end(first)
+
+    days: Optional[List[str]] = None
+    if _RANGE_WEEKENDS.search(t): days = ["Sat", "Sun"]
+    elif _RANGE_WEEKDAYS.search(t): days = WEEKDAY_TOKEN[:5]
+    elif (m := _RANGE_NAMED_DAY.search(t)): days = [WEEKDAY_TOKEN[WEEKDAY_IDX[m.group(1) or m.group(2)]]]
+
+    if start is None:
+        if days is None and not _RANGE_ANY.search(t): return None
+        if days is None and _parse_date_fast(t, base_d) is not None: return None  # "any time tomorrow" is one date
+        start, end = base_d, base_d + timedelta(days=RANGE_DEFAULT_DAYS - 1)
+    if end is None or end < start: return None
+    return start, min(end, start + timedelta(days=RANGE_MAX_DAYS - 1)), days
+
+def attach_date_range(req: "PujaRequest", user_text: str) -> bool:
+    # a span of dates replaces the single when_date (the LLM is only asked for one date)
+    rng = parse_date_range(user_text)
+    if rng is None: return False
+    req.date_from, req.date_to, req.weekdays = rng
+    req.when_date = None
+    return True
+
+# ---------- Fuzzy puja + city ----------
+def fuzzy_match_puja(text: str)->Tuple[str,float]:
+    best, score, _ = process.extractOne(text, PUJA_CATALOG, scorer=fuzz.WRatio)
+    return best, score/100.0
+
+CITY_SYNONYMS = {"saltlake":"Salt Lake","salt lake":"Salt Lake","bidhannagar":"Bidhannagar"}
+LANGUAGES = ["Sanskrit","Hindi","English","Bengali"]
+
+# ---------- Entity matcher (one pass over the message for every known phrase) ----------
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"  # same as regex \w
+
+class EntityHits(dict):
+    # kind -> values, as found by EntityMatcher.scan(); gaps holds the message text between the hits,
+    # the only text fuzzy_city scores
+    __slots__ = ("text", "gaps")
+
+    def __init__(self, text: str = "", gaps: List[str] = ()):
+        super().__init__()
+        self.text, self.gaps = text, list(gaps)
+
+class EntityMatcher:
+    # Aho-Corasick automaton over lowercased phrases; scan() reports each (kind -> values) hit once,
+    # in order of first occurrence. whole_word phrases only count between \b boundaries.
+    def __init__(self, entries: List[Tuple[str, str, str, bool]]):  # (phrase, kind, value, whole_word)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str, str, bool]]] = [[]]
+        for phrase, kind, value, word in entries:
+            s = 0
+            for ch in phrase.lower():
+                nxt = self._goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto); self._goto[s][ch] = nxt
+                    self._goto.append({}); self._fail.append(0); self._out.append([])
+                s = nxt
+            self._out[s].append((len(phrase), kind, value, word))
+        queue = list(self._goto[0].values())
+        for s in queue:  # BFS: fail links point at the longest proper suffix that is also a prefix
+            for ch, nxt in self._goto[s].items():
+                f = self._fail[s]
+                while f and ch not in self._goto[f]: f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def scan(self, text: str) -> EntityHits:
+        t = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = EntityHits(text)
+        spans: List[Tuple[int, int]] = []
+        s = 0
+        for i, ch in enumerate(t):
+            while s and ch not in goto[s]: s = fail[s]
+            s = goto[s].get(ch, 0)
+            for n, kind, value, word in out[s]:
+                if word and ((i-n >= 0 and _is_word(t[i-n])) or (i+1 < len(t) and _is_word(t[i+1]))): continue
+                spans.append((i+1-n, i+1))
+                vals = hits.setdefault(kind, [])
+                if value not in vals: vals.append(value)
+        src = text if len(text) == len(t) else t  # fuzzy scorers see the original case when offsets line up
+        at = 0
+        for start, end in sorted(spans):
+            if start > at and src[at:start].strip(): hits.gaps.append(src[at:start].strip())
+            at = max(at, end)
+        if src[at:].strip(): hits.gaps.append(src[at:].strip())
+        return hits
+
+def _build_entity_matcher() -> EntityMatcher:
+    entries = [(c, "city", c, False) for c in ALL_CITIES]
+    entries += [(a, "city_alias", c, False) for a, c in CITY_SYNONYMS.items()]
+    entries += [(p, "puja", p, False) for p in PUJA_CATALOG]
+    entries += [(L, "language", L, True) for L in LANGUAGES]
+    entries += [(a, "window", label, True) for label, aliases in WINDOW_ALIASES.items() for a in aliases]
+    entries += [(name, "locality", name, True) for name in LOCALITIES]
+    return EntityMatcher(entries)
+
+def _refresh_city_lookups(cities=None):
+    # roster cities feed the matcher and the fuzzy fallback; rerun whenever the roster is replaced
+    global ALL_CITIES, CITY_LOWER, CITY_LEN, CITY_RANK, CITY_BY_LOWER, ENTITY_MATCHER
+    ALL_CITIES = sorted(set({p.city for p in PANDITS} if cities is None else cities))
+    CITY_LOWER = [c.lower() for c in ALL_CITIES]
+    CITY_LEN = np.array([len(c) for c in CITY_LOWER])
+    CITY_RANK = {c: i for i, c in enumerate(ALL_CITIES)}
+    CITY_BY_LOWER = {}
+    for c in ALL_CITIES: CITY_BY_LOWER.setdefault(c.lower(), c)
+    ENTITY_MATCHER = _build_entity_matcher()
+
+_refresh_city_lookups()
+
+def scan_entities(text: str) -> EntityHits:
+    return ENTITY_MATCHER.scan(text)
+
+def _fuzzy_city(queries: List[str], contain: bool = False) -> Optional[str]:
+    # one batched partial_ratio call, queries x roster cities; first best city wins, like the old loop.
+    # contain: queries are message gaps, and one more than a letter shorter than a city can't spell it
+    # (partial_ratio would align a short gap like "in" inside the city name and score 100)
+    if not ALL_CITIES or not queries: return None
+    scores = process.cdist([q.lower() for q in queries], CITY_LOWER, scorer=fuzz.partial_ratio, dtype=np.float64)
+    if contain: scores[np.array([len(q) for q in queries])[:, None] + 1 < CITY_LEN] = 0
+    best = scores.max(axis=0)
+    i = int(np.argmax(best))
+    return ALL_CITIES[i] if best[i] >= 80 else None
+
+def fuzzy_city(hits: EntityHits) -> Optional[str]:
+    return _fuzzy_city(hits.gaps, contain=True)
+
+def fuzzy_puja(hits: EntityHits) -> Tuple[Optional[str], float]:
+    # a puja named verbatim wins (the longest, if several) without any scoring; else WRatio over the whole
+    # message: unlike cities, cutting it to the gaps lets short words ("sunday") outscore misspelt names
+    if hits.get("puja"): return max(hits["puja"], key=len), 0.95
+    return fuzzy_match_puja(hits.text)
+
+def normalize_city_maybe(name: Optional[str]) -> Optional[str]:
+    if not name: return None
+    s = name.strip().lower()
+    if s in CITY_SYNONYMS: return CITY_SYNONYMS[s]
+    if s in CITY_BY_LOWER: return CITY_BY_LOWER[s]
+    return _fuzzy_city([s])
+
+def detect_city(user_text: str, hits: Optional[EntityHits] = None)->Optional[str]:
+    hits = scan_entities(user_text) if hits is None else hits
+    if hits.get("city"): return min(hits["city"], key=CITY_RANK.__getitem__)  # roster order, as before
+    if hits.get("city_alias"): return hits["city_alias"][0]
+    return fuzzy_city(hits)
+
+def detect_locality(user_text: str, hits: Optional[Dict[str, List[str]]] = None) -> Optional[Locality]:
+    # a named locality (the longest when one contains another: "New Alipore" over "Alipore"), else a pincode
+    hits = scan_entities(user_text) if hits is None else hits
+    names = hits.get("locality", ())
+    for n in names:
+        if not any(n != o and n.lower() in o.lower() for o in names): return LOCALITIES[n]
+    m = _PINCODE.search(user_text)
+    return LOCALITY_BY_PIN.get(m.group(1)) if m else None
+
+def attach_locality(req: "PujaRequest", user_text: str, hits: Optional[Dict[str, List[str]]] = None) -> Optional[Locality]:
+    # point-locate the request; the locality's city fills in when no city was named
+    loc = detect_locality(user_text, hits)
+    if loc is None: return None
+    req.locality, req.lat, req.lon = loc.name, loc.lat, loc.lon
+    if not req.city: req.city = loc.city
+    return loc
+
+# ---------- Distance ----------
+def haversine_km(a: str, b: str) -> float:
+    if a not in CITY_COORDS or b not in CITY_COORDS: return 9999.0
+    lat1, lon1 = CITY_COORDS[a]; lat2, lon2 = CITY_COORDS[b]
+    r=6371.0
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2-lat1); dl = math.radians(lon2-lon1)
+    h = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
+    return 2*r*math.asin(min(1, math.sqrt(h)))
+
+def proximity_tier_km(dist: float) -> int:
+    if dist==0: return 0
+    if dist<=30: return 1
+    if dist<=80: return 2
+    return 3
+
+# Dense city×city distance/tier tables, built once from haversine_km so values are bit-identical.
+# The extra last row/column (UNKNOWN_CITY_ID) holds the 9999.0 sentinel for cities without coordinates.
+NO_COORDS_KM = 9999.0
+CITY_IDS: Dict[str, int] = {c: i for i, c in enumerate(CITY_COORDS)}
+UNKNOWN_CITY_ID = len(CITY_IDS)
+
+def _build_city_tables() -> Tuple[np.ndarray, np.ndarray]:
+    n = UNKNOWN_CITY_ID + 1
+    dist = np.full((n, n), NO_COORDS_KM, dtype=np.float64)
+    for a, i in CITY_IDS.items():
+        for b, j in CITY_IDS.items():
+            dist[i, j] = 0.0 if a==b else haversine_km(a, b)
+    tier = np.array([[proximity_tier_km(d) for d in row] for row in dist.tolist()], dtype=np.int8)
+    return dist, tier
+
+CITY_DIST_KM, CITY_TIER = _build_city_tables()
+CITY_DIST_KM.flags.writeable = False; CITY_TIER.flags.writeable = False
+
+def city_id(name: Optional[str]) -> int:
+    return CITY_IDS.get(name, UNKNOWN_CITY_ID)
+
+# City keys extend the matrix ids with hashed ids for coordinate-less cities (> UNKNOWN_CITY_ID), so
+# "same city" stays an exact integer comparison for every name. The hash is stable across processes,
+# so store columns compiled by another process (shared snapshots) compare equal too.
+@lru_cache(maxsize=4096)
+def city_key(name: str) -> int:
+    k = CITY_IDS.get(name)
+    if k is None: k = UNKNOWN_CITY_ID + 1 + int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=6).digest(), "little")
+    return k
+
+def proximity_batch(req_city: str, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (dist_km, tier) per city key in one gather; same-city pairs are always (0.0, 0) as in the scalar path
+    rid = city_id(req_city)
+    cids = np.minimum(keys, UNKNOWN_CITY_ID)
+    dist, tier = CITY_DIST_KM[rid, cids], CITY_TIER[rid, cids].astype(np.int64)
+    if rid == UNKNOWN_CITY_ID:
+        same = keys == (city_key(req_city) if req_city is not None else -1)
+        dist = np.where(same, 0.0, dist); tier = np.where(same, 0, tier)
+    return dist, tier
+
+# ---------- Point distances + geo grid (locality-level proximity) ----------
+# Requests that carry lat/lon are ranked on haversine distance to each pandit's own point (or city centre).
+# Tiers keep their meaning with a radius standing in for "same city": <= LOCAL_TIER_KM, 30, 80, beyond.
+LOCAL_TIER_KM = float(os.environ.get("LOCAL_TIER_KM", "5"))
+POINT_TIER_KM = np.array([LOCAL_TIER_KM, 30.0, 80.0])
+GEO_CELL_DEG = float(os.environ.get("GEO_CELL_DEG", "0.05"))  # ~5.5 km cells
+GEO_PREFILTER_MIN = int(os.environ.get("GEO_PREFILTER_MIN", "5000"))  # smaller rosters rank every match directly
+
+def pandit_point(p: Pandit) -> Tuple[float, float]:
+    if p.lat is not None and p.lon is not None: return p.lat, p.lon
+    return CITY_COORDS.get(p.city, (math.nan, math.nan))
+
+def haversine_points_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    phi1, phi2 = math.radians(lat), np.radians(lats)
+    h = np.sin((phi2-phi1)/2)**2 + math.cos(phi1)*np.cos(phi2)*np.sin(np.radians(lons-lon)/2)**2
+    return 2*6371.0*np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+def proximity_points(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (dist_km, tier) from a point; pandits without any coordinates get the NO_COORDS_KM sentinel
+    dist = np.nan_to_num(haversine_points_km(lat, lon, lats, lons), nan=NO_COORDS_KM)
+    return dist, np.searchsorted(POINT_TIER_KM, dist, side="left").astype(np.int64)
+
+class GeoGrid:
+    # Uniform lat/lon grid over pandit points, kept as cell-sorted arrays (a flat "geohash" order): the cells
+    # of one grid row are contiguous, so a radius query is one searchsorted slice per row plus an exact
+    # haversine check. Edits only mark the arrays stale; they're rebuilt on the next query.
+    def __init__(self, pandits: List[Pandit] = (), cell_deg: float = GEO_CELL_DEG):
+        self.cell = cell_deg
+        self.width = int(math.ceil(360.0 / cell_deg)) + 2  # cells per row, so code = row*width + col is unique
+        self.point: Dict[int, Tuple[float, float]] = {}
+        self._arrays = None  # (codes, ids, lats, lons) sorted by code; None = stale
+        self._lock = threading.Lock()
+        for p in pandits: self.add(p)
+
+    def add(self, p: Pandit):
+        lat, lon = pandit_point(p)
+        if math.isnan(lat): self.point.pop(p.id, None)
+        else: self.point[p.id] = (lat, lon)
+        self._arrays = None
+
+    def remove(self, pid: int):
+        if self.point.pop(pid, None) is not None: self._arrays = None
+
+    def _code(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return (np.floor(lat / self.cell).astype(np.int64) * self.width
+                + np.floor(lon / self.cell).astype(np.int64) + self.width // 2)
+
+    def _sorted(self):
+        arrays = self._arrays
+        if arrays is not None: return arrays
+        with self._lock:
+            if self._arrays is None:
+                n = len(self.point)
+                ids = np.fromiter(self.point.keys(), dtype=np.int64, count=n)
+                pts = np.array(list(self.point.values()), dtype=np.float64).reshape(n, 2)
+                codes = self._code(pts[:, 0], pts[:, 1])
+                order = np.argsort(codes, kind="stable")
+                self._arrays = (codes[order], ids[order], pts[order, 0], pts[order, 1])
+            return self._arrays
+
+    def _around(self, lat: float, lon: float, km: float) -> Tuple[np.ndarray, np.ndarray]:
+        # ids and distances of every point in the cells covering the km box around (lat, lon)
+        codes, ids, lats, lons = self._sorted()
+        dlat = km / 111.0
+        dlon = km / (111.32 * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + dlat)))))
+        r0, r1 = math.floor((lat - dlat) / self.cell), math.floor((lat + dlat) / self.cell)
+        c0, c1 = math.floor((lon - dlon) / self.cell), math.floor((lon + dlon) / self.cell)
+        if c1 - c0 >= self.width - 2: c0, c1 = -(self.width // 2), self.width - self.width // 2 - 1  # whole rows
+        base = np.arange(r0, r1 + 1, dtype=np.int64) * self.width + self.width // 2
+        starts, ends = np.searchsorted(codes, base + c0, side="left"), np.searchsorted(codes, base + c1, side="right")
+        sel = np.concatenate([np.arange(a, b) for a, b in zip(starts.tolist(), ends.tolist()) if b > a] or [np.zeros(0, dtype=np.int64)])
+        return ids[sel], haversine_points_km(lat, lon, lats[sel], lons[sel])
+
+    def within(self, lat: float, lon: float, km: float) -> set:
+        ids, dist = self._around(lat, lon, km)
+        return set(ids[dist <= km].tolist())
+
+# ---------- Request Schema ----------
+class PujaRequest(BaseModel):
+    puja_type: Optional[str] = Field(None)
+    when_date: Optional[date] = Field(None)
+    time_window: Optional[Literal["morning","afternoon","evening","night"]] = Field(None)
+    time_specific_mins: Optional[int] = Field(None)
+    city: Optional[str] = Field(None)
+    budget_inr: Optional[int] = Field(None)
+    language_pref: Optional[List[str]] = Field(default=None)
+    notes: Optional[str] = None
+    locality: Optional[str] = Field(None)
+    lat: Optional[float] = Field(None)  # set from a locality/pincode; ranks by real distance when present
+    lon: Optional[float] = Field(None)
+    date_from: Optional[date] = Field(None)  # date-range search: earliest open slots in [date_from, date_to]
+    date_to: Optional[date] = Field(None)
+    weekdays: Optional[List[str]] = Field(None)  # e.g. ["Sat","Sun"] for "any weekend"
+
+def rule_based_extract(user_text: str, hits: Optional[EntityHits] = None):
+    # `hits`: scan_entities(user_text) when the caller already has it (the tiered gate reuses one scan)
+    conf={}
+    with span("match_entities"):
+        if hits is None: hits = scan_entities(user_text)
+        puja_guess, puja_conf = fuzzy_puja(hits)
+    conf["puja_type"]=puja_conf
+    with span("parse_date"):
+        period = parse_date_range(user_text)
+        d = None if period else parse_date(user_text)
+    conf["when_date"]=0.9 if (d or period) else 0.0
+    w, tmins = detect_window_and_time(user_text, hits); conf["time_window"]=0.9 if w else 0.0
+    with span("detect_city"):
+        loc = detect_locality(user_text, hits)
+        city = loc.city if loc and not (hits.get("city") or hits.get("city_alias")) else detect_city(user_text, hits)
+    conf["city"]=0.9 if city else 0.2
+    budget=None
+    m = re.search(r"(?:budget|under|upto|up to|around|~)\s*₹?\s*([0-9]{3,7})", user_text.lower())
+    if not m: m = re.search(r"₹\s*([0-9]{3,7})", user_text)
+    if m: budget=int(m.group(1))
+    conf["budget_inr"]=0.9 if budget else 0.0
+    langs=[L for L in LANGUAGES if L in hits.get("language", ())]
+    conf["language_pref"]=0.8 if langs else 0.2
+    req = PujaRequest(puja_type=puja_guess, when_date=d, time_window=w, time_specific_mins=tmins,
+                      city=city, budget_inr=budget, language_pref=langs or None)
+    if loc: req.locality, req.lat, req.lon = loc.name, loc.lat, loc.lon
+    if period: req.date_from, req.date_to, req.weekdays = period
+    return req, conf
+
+# ---------- Allocation (Specialization → Proximity → Time → Weekday → Budget/Ratings/Exp) ----------
+REQUIRE_TIME_STRICT = True
+
+def has_window(p: Pandit, label: str)->bool:
+    slot = WINDOW_SLOT.get(label)
+    return slot is not None and bool(p.window_bits >> slot & 1)
+
+def time_distance_minutes(p: Pandit, label: Optional[str], specific_mins: Optional[int]) -> int:
+    if not label: return 0
+    if specific_mins is None: return 0
+    slot = WINDOW_SLOT.get(label)
+    mid = NO_WINDOW if slot is None else p.window_mid[slot]  # pre-parsed; first window per label
+    if mid == NO_WINDOW: return 10_000
+    return abs(mid-specific_mins)
+
+# ---------- Columnar Pandit Store + bulk ranking ----------
+TOP_K = 12
+
+def slot_bit(day_slot: int, window_slot: int) -> int:
+    # bit of (weekday, window) in PanditStore.slot_bits: 7 days x 4 windows = 28 bits
+    return day_slot * len(WINDOW_SLOT) + window_slot
+
+@lru_cache(maxsize=None)
+def _slot_bits(day_bits: int, window_bits: int) -> int:
+    return sum(1 << slot_bit(day, w) for day in range(len(DAY_SLOT)) if day_bits >> day & 1
+               for w in range(len(WINDOW_SLOT)) if window_bits >> w & 1)
+
+class PanditStore:
+    # struct-of-arrays mirror of the roster; rows are unordered (swap-remove), look them up via row_of
+    COLUMNS = (("pid", np.int64), ("fee", np.int64), ("rating", np.float64), ("experience", np.int64),
+               ("city_key", np.int64), ("window_bits", np.uint8), ("day_bits", np.uint8),
+               ("lat", np.float64), ("lon", np.float64), ("slot_bits", np.uint32))
+
+    def __init__(self, pandits: List[Pandit] = (), capacity: int = 64):
+        self.n = 0
+        self.row_of: Dict[int, int] = {}
+        self._alloc(max(capacity, len(pandits)))
+        for p in pandits: self.add(p)
+
+    def _alloc(self, cap: int):
+        for name, dt in self.COLUMNS:
+            col = np.zeros(cap, dtype=dt)
+            if self.n: col[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, col)
+        mid = np.full((cap, len(WINDOW_SLOT)), NO_WINDOW, dtype=np.int64)  # window midpoint per label
+        if self.n: mid[:self.n] = self.window_mid[:self.n]
+        self.window_mid = mid
+
+    def add(self, p: Pandit):
+        if p.id in self.row_of: self.remove(p.id)
+        if self.n == len(self.pid): self._alloc(2*self.n)
+        r = self.n; self.n += 1; self.row_of[p.id] = r
+        self.pid[r], self.fee[r], self.rating[r], self.experience[r] = p.id, p.base_fee, p.rating, p.experience_years
+        self.city_key[r] = city_key(p.city)
+        self.lat[r], self.lon[r] = pandit_point(p)
+        self.window_bits[r], self.day_bits[r], self.window_mid[r] = p.window_bits, p.day_bits, p.window_mid
+        self.slot_bits[r] = _slot_bits(p.day_bits, p.window_bits)
+
+    def remove(self, pid: int):
+        r = self.row_of.pop(pid, None)
+        if r is None: return
+        last = self.n - 1
+        if r != last:
+            for name, _ in self.COLUMNS: getattr(self, name)[r] = getattr(self, name)[last]
+            self.window_mid[r] = self.window_mid[last]
+            self.row_of[int(self.pid[r])] = r
+        self.n = last
+
+    def rows_for(self, pandits: List[Pandit]) -> np.ndarray:
+        return np.fromiter((self.row_of[p.id] for p in pandits), dtype=np.intp, count=len(pandits))
+
+    def time_distance(self, rows: np.ndarray, label: Optional[str], specific_mins: Optional[int]) -> np.ndarray:
+        # vectorized time_distance_minutes
+        if not label or specific_mins is None: return np.zeros(len(rows), dtype=np.int64)
+        slot = WINDOW_SLOT.get(label)
+        if slot is None: return np.full(len(rows), 10_000, dtype=np.int64)
+        mid = self.window_mid[rows, slot]
+        return np.where(mid == NO_WINDOW, 10_000, np.abs(mid - specific_mins))
+
+def _lex_top_k(keys, pos: np.ndarray, k: int) -> np.ndarray:
+    # Exact lexicographic top-k over lazily computed key columns: rows strictly below the k-th value
+    # of the leading key are settled, rows tied with it recurse on the remaining keys.
+    # `pos` stays ascending, so full ties fall back to candidate order like a stable sort.
+    if not keys or k <= 0: return pos[:max(k, 0)]
+    if len(pos) <= 4*k:
+        return pos[np.lexsort([f(pos) for f in reversed(keys)])[:k]]
+    first = keys[0](pos)
+    v = np.partition(first, k-1)[k-1]
+    head, tied = pos[first < v], pos[first == v]
+    head = head[np.lexsort([f(head) for f in reversed(keys)])]
+    return np.concatenate([head, _lex_top_k(keys[1:], tied, k - len(head))])
+
+def rank_top_k(store: PanditStore, rows: np.ndarray, tier: np.ndarray, dist: np.ndarray, tdist: np.ndarray,
+               budget: Optional[int], k: Optional[int] = TOP_K) -> np.ndarray:
+    # Positions into `rows`, ordered like sorting on
+    # (tier, dist, tdist, |budget gap|, -rating, -experience, fee); ties keep candidate order.
+    keys = [lambda i: tier[i], lambda i: dist[i], lambda i: tdist[i],
+            (lambda i: np.abs(store.fee[rows[i]] - budget)) if budget else (lambda i: np.zeros(len(i), dtype=np.int64)),
+            lambda i: -store.rating[rows[i]], lambda i: -store.experience[rows[i]], lambda i: store.fee[rows[i]]]
+    return _lex_top_k(keys, np.arange(len(rows)), len(rows) if k is None else k)
+
+class Roster:
+    # One generation of the roster and everything derived from it. load_roster() builds a new one off to the
+    # side and swaps it in with a single assignment; searches read ROSTER once, so a reload never mixes
+    # generations under an in-flight request (it finishes on the old one).
+    # roster.SnapshotRoster is the read-only, mmap-backed variant with the same four parts; file rosters use it.
+    __slots__ = ("pandits", "index", "store", "geo")
+    read_only = False
+
+    def __init__(self, pandits: List[Pandit], index: Optional[PanditIndex] = None):
+        self.pandits = pandits
+        self.index = index if index is not None else PanditIndex(pandits)
+        self.store, self.geo = PanditStore(pandits), GeoGrid(pandits)
+
+    def cities(self) -> set:
+        return {p.city for p in self.pandits}
+
+ROSTER = Roster(PANDITS, PANDIT_INDEX)
+PANDIT_STORE, GEO_INDEX = ROSTER.store, ROSTER.geo  # the live generation's parts, for callers that want one
+ROSTER_VERSION = 0  # bumps on every roster change; part of every cached result's key
+_ROSTER_LOCK = threading.RLock()  # serializes writers only; readers never take it
+
+def load_roster(pandits: List[Pandit]):
+    # swap in a whole roster built from records (benchmarks); everything is rebuilt before the swap
+    install_roster(Roster(list(pandits)))
+
+def install_roster(new: Roster):
+    # make a fully built generation live with one assignment
+    global ROSTER, PANDITS, PANDIT_INDEX, PANDIT_STORE, GEO_INDEX, ROSTER_VERSION
+    with _ROSTER_LOCK:
+        _refresh_city_lookups(new.cities())
+        ROSTER = new
+        PANDITS, PANDIT_INDEX, PANDIT_STORE, GEO_INDEX = new.pandits, new.index, new.store, new.geo
+        ROSTER_VERSION += 1
+
+def _editable_roster() -> Roster:
+    # the live roster, ready for incremental edits: a read-only snapshot is first copied into an in-memory
+    # Roster (one full build), after which adds and removes only touch the affected postings and rows.
+    # The next reload of ROSTER_FILE replaces the copy, edits included.
+    if ROSTER.read_only: install_roster(Roster(list(ROSTER.pandits)))
+    return ROSTER
+
+def add_pandit(p: Pandit):
+    global ROSTER_VERSION
+    with _ROSTER_LOCK:
+        remove_pandit(p.id)
+        r = ROSTER
+        r.pandits.append(p); r.index.add(p); r.store.add(p); r.geo.add(p)
+        ROSTER_VERSION += 1
+
+def remove_pandit(pid: int):
+    global ROSTER_VERSION
+    with _ROSTER_LOCK:
+        r = _editable_roster()
+        r.pandits[:] = [p for p in r.pandits if p.id != pid]
+        r.index.remove(pid); r.store.remove(pid); r.geo.remove(pid)
+        ROSTER_VERSION += 1
+
+def samagri_markdown(puja_type: Optional[str]) -> str:
+    if not puja_type:
+        return "> 📦 Puja samagri will appear here once we detect your puja type."
+    items = PUJA_SAMAGRI.get(puja_type, [])
+    title = f"### 📦 Puja Samagri for **{puja_type}**"
+    if not items:
+        return f"{title}\n_(No preset list found; pandit will share a checklist on confirmation.)_"
+    return f"{title}\n" + "\n".join([f"- {x}" for x in items])
+
+def instructions_markdown(puja_type: Optional[str]) -> str:
+    if not puja_type: return "> 📋 Puja instructions will appear after we detect the puja type."
+    info = PUJA_INSTRUCTIONS.get(puja_type)
+    if not info:
+        return f"### 📋 Instructions for **{puja_type}**\n_(Pandit will brief you on custom vidhi.)_"
+    return (
+        f"### 📋 Instructions for **{puja_type}**\n"
+        f"- **Preparation:** {info['prep']}\n"
+        f"- **Duration:** {info['duration']}\n"
+        f"- **Dress code:** {info['dress']}\n"
+        f"- **Notes:** {info['notes']}"
+    )
+
+def rank_candidates(req: PujaRequest, k: Optional[int]=TOP_K, booked: Optional[np.ndarray]=None,
+                    roster: Optional[Roster]=None) -> List[Tuple[Pandit,int,int,float]]:
+    # pure filter + rank for a complete request; returns (pandit, tier, tdist, dist_km) best-first.
+    # `booked` is an array of booked pandit ids (ReservationLedger.booked_ids); those pandits are dropped.
+    r = ROSTER if roster is None else roster
+    weekday_token = WEEKDAY_TOKEN[req.when_date.weekday()] if req.when_date else None
+    window_filter = req.time_window if REQUIRE_TIME_STRICT else None
+    if req.lat is not None and req.lon is not None and k and len(r.pandits) >= GEO_PREFILTER_MIN:
+        # nearest tier rings first: once a ring holds k free matches nothing outside it can outrank them
+        for km in POINT_TIER_KM.tolist():
+            with span("geo"): near = r.geo.within(req.lat, req.lon, km)
+            if len(near) < k: continue
+            with span("filter"): matched = r.index.candidates(req.puja_type, window_filter, weekday_token, near, req.when_date)
+            if len(matched) < k: continue
+            with span("rank"): ranked = rank_matched(req, matched, k=k, booked=booked, roster=r)
+            if len(ranked) >= k: return ranked
+    with span("filter"): matched = r.index.candidates(req.puja_type, window_filter, weekday_token, on=req.when_date)
+    with span("rank"): return rank_matched(req, matched, k=k, booked=booked, roster=r)
+
+# ---------- Date-range search (bitmask calendar) ----------
+RANGE_SLOTS_PER_PANDIT = 3
+
+def range_slots(req: PujaRequest) -> List[Tuple[date, str]]:
+    # every (date, window) the request accepts, in time order
+    windows = [req.time_window] if req.time_window else list(WINDOW_MAP)
+    days = set(req.weekdays) if req.weekdays else None
+    out, d = [], req.date_from
+    while d <= req.date_to:
+        if days is None or WEEKDAY_TOKEN[d.weekday()] in days: out += [(d, w) for w in windows]
+        d += timedelta(days=1)
+    return out
+
+def rank_date_range(req: PujaRequest, k: Optional[int]=TOP_K, booked=None,
+                    max_slots: int = RANGE_SLOTS_PER_PANDIT, roster: Optional[Roster]=None) -> Tuple[List[Tuple[Pandit,int,int,float]], Dict[int, List[Tuple[date, str]]]]:
+    # One call for a whole date range: weekly slot bitmasks are expanded to a (slot x pandit) matrix,
+    # off-dates and bookings are cleared per slot, and pandits with any open slot are ranked as usual.
+    # `booked(date, window)` returns the booked pandit ids or None (ReservationLedger.booked_ids).
+    # -> (ranked, {pandit id: earliest open (date, window) slots, at most max_slots})
+    r = ROSTER if roster is None else roster
+    slots = range_slots(req)
+    window_filter = req.time_window if REQUIRE_TIME_STRICT else None
+    with span("filter"): matched = r.index.candidates(req.puja_type, window_filter)
+    if not matched or not slots: return [], {}
+    with span("availability"):
+        rows = r.store.rows_for(matched)
+        pids = r.store.pid[rows]
+        bits = np.array([slot_bit(d.weekday(), WINDOW_SLOT[w]) for d, w in slots], dtype=np.uint32)
+        free = ((r.store.slot_bits[rows][None, :] >> bits[:, None]) & 1).astype(bool)
+        for i, (d, w) in enumerate(slots):
+            off = r.index.off_on(d)
+            if off is not None: free[i] &= ~np.isin(pids, off)
+            taken = booked(d, w) if booked is not None else None
+            if taken is not None: free[i] &= ~np.isin(pids, taken)
+        open_cols = np.flatnonzero(free.any(axis=0))
+    with span("rank"): ranked = rank_matched(req, _take(matched, open_cols), k=k, roster=r)
+    col = dict(zip(pids[open_cols].tolist(), open_cols.tolist()))
+    earliest = {p.id: [slots[i] for i in np.flatnonzero(free[:, col[p.id]])[:max_slots].tolist()] for p, *_ in ranked}
+    return ranked, earliest
+
+def _take(matched, positions: np.ndarray):
+    # candidates at these positions; shared-snapshot candidate rows subset without decoding any record
+    if hasattr(matched, "take"): return matched.take(positions)
+    return [matched[j] for j in positions.tolist()]
+
+def rank_matched(req: PujaRequest, matched: List[Pandit], k: Optional[int]=TOP_K,
+                 booked: Optional[np.ndarray]=None, roster: Optional[Roster]=None) -> List[Tuple[Pandit,int,int,float]]:
+    if not matched: return []
+    store = (ROSTER if roster is None else roster).store
+    store_rows = store.rows_for(matched)
+    pos = np.arange(len(matched))
+    if booked is not None:
+        taken = np.isin(store.pid[store_rows], booked)
+        pos, store_rows = pos[~taken], store_rows[~taken]
+        if not len(pos): return []
+    # Sort: proximity tier → distance → time Δ → |budget gap| → rating desc → exp desc → fee asc
+    if req.lat is not None and req.lon is not None:
+        dists, tiers = proximity_points(req.lat, req.lon, store.lat[store_rows], store.lon[store_rows])
+    else:
+        dists, tiers = proximity_batch(req.city, store.city_key[store_rows])
+    tdists = store.time_distance(store_rows, req.time_window, req.time_specific_mins)
+    top = rank_top_k(store, store_rows, tiers, dists, tdists, req.budget_inr, k=k).tolist()
+    return list(zip([matched[i] for i in pos[top].tolist()], tiers[top].tolist(), tdists[top].tolist(), dists[top].tolist()))
+
+# ---------- Ranked-result cache ----------
+# Many messages resolve to the same structured query, so results are cached on the request fields that
+# ranking actually reads, never on the raw text. Keys carry ROSTER_VERSION and the caller's occupancy
+# version for that date/window (for a date range, the tuple of every slot's version in range_slots order),
+# so a roster change or a booking makes older entries unreachable (they age out through the LRU).
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+
+def result_key(req: PujaRequest, k: Optional[int], occupancy_version: Hashable = 0) -> Tuple:
+    return (ROSTER_VERSION, occupancy_version, k, req.puja_type, req.when_date, req.time_window,
+            req.time_specific_mins, req.city, req.budget_inr, req.lat, req.lon,
+            req.date_from, req.date_to, tuple(req.weekdays or ()))
+
+class ResultCache:
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Tuple):
+        with self._lock:
+            v = self._data.get(key)
+            if v is None: self.misses += 1; return None
+            self._data.move_to_end(key); self.hits += 1
+            return v
+
+    def put(self, key: Tuple, value):
+        with self._lock:
+            self._data[key] = value; self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock: return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+RESULT_CACHE = ResultCache()
+metrics.GaugeFn("pandit_result_cache_total", "Ranked-result cache lookups by result.",
+                lambda: {("hit",): RESULT_CACHE.hits, ("miss",): RESULT_CACHE.misses}, ("result",), kind="counter")
+
+def format_slot(slot: Tuple[date, str]) -> str:
+    return f"{slot[0]:%a %d %b} {slot[1]}"
+
+def render_results_md(ranked: List[Tuple[Pandit,int,int,float]],
+                      slots: Optional[Dict[int, List[Tuple[date, str]]]] = None) -> Tuple[str, str, List[str]]:
+    # -> (results table markdown, top-6 explanations, pandit id options); `slots` adds an open-slots column
+    headers = ["ID","Name","City","Mode","Windows","Days","Fee","★","Exp","Dist(km)","Tier","TimeΔ"]
+    if slots is not None: headers.insert(6, "Open slots")
+    rows, opts, exps = [], [], []
+    for (p, tier, tdist, dist) in ranked:
+        rows.append([p.id, p.name, p.city, p.service_mode,
+                     "; ".join([f"{w[0]} {w[1]}-{w[2]}" for w in p.time_windows]),
+                     ",".join(p.days), f"₹{p.base_fee}", p.rating, p.experience_years, f"{dist:.1f}", tier, tdist])
+        opts.append(str(p.id))
+        exps.append(f"• {p.name}: {p.city}, {','.join(p.days)}, tier {tier}, {dist:.1f} km, Δ {tdist} min, ₹{p.base_fee}, {p.rating}★.")
+        if slots is not None:
+            rows[-1].insert(6, "; ".join(format_slot(x) for x in slots.get(p.id, ())))
+            exps[-1] = exps[-1][:-1] + (f", first open {format_slot(slots[p.id][0])}." if slots.get(p.id) else ".")
+
+    table_md = "| " + " | ".join(headers) + " |\n" + "| " + " | ".join(["---"]*len(headers)) + " |\n"
+    for r in rows: table_md += "| " + " | ".join(map(str, r)) + " |\n"
+    return table_md, "\n".join(exps[:6]), opts
@@ -0,0 +1,631 @@
+from __future__ import annotations
+# === OpenAI layer — lazy clients, cached LLM extraction (tiered/async), speech-to-text ===
+
+from typing import Callable, List, Dict, Optional, Tuple
+import re, os, json, time, random, threading, asyncio, weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+from datetime import datetime, date
+
+import core, audio, metrics
+from metrics import span
+from core import (IST, PUJA_CATALOG, PujaRequest, rule_based_extract,
+                  fuzzy_match_puja, normalize_city_maybe)
+
+# ---- OpenAI key from env (set in HF: Settings → Variables and secrets); clients are built on first use ----
+OPENAI_TIMEOUT_S = float(os.environ.get("OPENAI_TIMEOUT_S", "30"))
+_clients_lock = threading.Lock()
+_openai_client = None
+_openai_async_client = None
+
+def _api_key() -> str:
+    key = os.environ.get("OPENAI_API_KEY", "")
+    if not key:
+        raise RuntimeError("OPENAI_API_KEY is not set. Add it in your Space: Settings → Variables and secrets.")
+    return key
+
+def get_openai_client():
+    global _openai_client
+    with _clients_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=_api_key(), timeout=OPENAI_TIMEOUT_S)
+        return _openai_client
+
+def get_async_openai_client():
+    global _openai_async_client
+    with _clients_lock:
+        if _openai_async_client is None:
+            from openai import AsyncOpenAI
+            _openai_async_client = AsyncOpenAI(api_key=_api_key(), timeout=OPENAI_TIMEOUT_S)
+        return _openai_async_client
+
+def set_openai_clients(sync_client=None, async_client=None):
+    # swap in stubs / preconfigured clients (benchmarks, load tests)
+    global _openai_client, _openai_async_client
+    with _clients_lock:
+        _openai_client, _openai_async_client = sync_client, async_client
+
+# ---------- LLM extraction (structured outputs, short answers) ----------
+# The schema is PujaRequest's own, cut to the fields ranking reads, with the catalog as an enum, so answers
+# always parse and name a catalog puja. Without notes and per-field confidences an answer is ~40 tokens
+# instead of ~76, and output tokens are what a call's latency grows with. The prompt (~350 tokens, mostly
+# the schema) is under the 1024 the API needs before it caches a prefix, so nothing here relies on caching.
+# Tokens and latency of every call go to metrics.LLM_TOKENS/LLM_CALL_SECONDS.
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", "120"))  # a full answer is ~50 tokens
+# what ranking reads; language_pref/notes were asked for before but nothing downstream uses them
+LLM_FIELDS = ("puja_type", "when_date", "time_window", "time_specific_mins", "city", "budget_inr")
+
+LLM_SYSTEM_PROMPT = (
+    "Extract the puja booking request (English/Hindi/Bengali/Hinglish). null if not stated. "
+    "puja_type: closest listed puja. when_date: resolve kal/parso/next Monday etc. against Today. "
+    "time_window: stated or implied by a clock time; time_specific_mins: that time as minutes after midnight. "
+    "city: as written. budget_inr: rupees."
+)
+
+def _nullable(field: Dict) -> Dict:
+    # pydantic's {"anyOf": [X, {"type": "null"}], "default": None, "title": ...} -> X with a "null" type: same
+    # constraint, fewer schema tokens in every request
+    x = dict(field["anyOf"][0])
+    x["type"] = [x["type"], "null"]
+    if "enum" in x: x["enum"] = x["enum"] + [None]
+    return x
+
+def _extraction_schema() -> Dict:
+    # strict structured-outputs subset: every field required (null when unknown), closed object
+    fields = PujaRequest.model_json_schema()["properties"]
+    props = {name: _nullable(fields[name]) for name in LLM_FIELDS}
+    props["puja_type"]["enum"] = list(PUJA_CATALOG) + [None]
+    return {"type": "object", "properties": props, "required": list(props), "additionalProperties": False}
+
+LLM_RESPONSE_FORMAT = {"type": "json_schema",
+                       "json_schema": {"name": "puja_request", "strict": True, "schema": _extraction_schema()}}
+
+class LLMParseError(ValueError):
+    # the model answered, but not with a usable extraction (refusal, truncated or invalid JSON)
+    pass
+
+def _llm_messages(user_text: str) -> List[Dict[str, str]]:
+    today = datetime.now(IST).date()
+    return [{"role": "system", "content": LLM_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Today: {today.isoformat()} ({today:%A})\nUser: {user_text}"}]
+
+def _llm_request(user_text: str) -> Dict:
+    return dict(model=LLM_MODEL, temperature=0, max_tokens=LLM_MAX_TOKENS,
+                response_format=LLM_RESPONSE_FORMAT, messages=_llm_messages(user_text))
+
+def _llm_parse(txt: str, user_text: str):
+    data = json.loads(txt.strip())
+    d = date.fromisoformat(data["when_date"]) if data.get("when_date") else None
+    req = PujaRequest(
+        puja_type=data.get("puja_type"),
+        when_date=d,
+        time_window=data.get("time_window"),
+        time_specific_mins=data.get("time_specific_mins"),
+        city=normalize_city_maybe(data.get("city")),
+        budget_inr=data.get("budget_inr")
+    )
+    conf = {}
+    if req.puja_type and req.puja_type not in PUJA_CATALOG:
+        req.puja_type, conf["puja_type"] = fuzzy_match_puja(req.puja_type)
+    core.attach_locality(req, user_text)  # the model isn't asked for coordinates; rules point-locate the text
+    core.attach_date_range(req, user_text)
+    if not req.city:
+        req.city = core.detect_city(user_text)
+    return req, conf
+
+def _llm_result(resp, user_text: str, seconds: float):
+    # bill the call, then parse; anything unusable in an answered call is an LLMParseError
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        metrics.LLM_TOKENS.inc("prompt", n=usage.prompt_tokens or 0)
+        metrics.LLM_TOKENS.inc("cached_prompt", n=getattr(details, "cached_tokens", None) or 0)
+        metrics.LLM_TOKENS.inc("completion", n=usage.completion_tokens or 0)
+    try:
+        choice = resp.choices[0]
+        if getattr(choice.message, "refusal", None): raise ValueError(f"refused: {choice.message.refusal}")
+        if getattr(choice, "finish_reason", None) == "length": raise ValueError("answer cut off at LLM_MAX_TOKENS")
+        out = _llm_parse(choice.message.content or "", user_text)
+    except (ValueError, TypeError, KeyError, AttributeError, IndexError) as e:  # JSON and pydantic errors are ValueErrors
+        metrics.LLM_CALL_SECONDS.observe(seconds, "parse_error")
+        raise LLMParseError(str(e)) from e
+    metrics.LLM_CALL_SECONDS.observe(seconds, "ok")
+    return out
+
+def _llm_failed(t0: float, e: BaseException):
+    metrics.LLM_CALL_SECONDS.observe(time.perf_counter() - t0, "cancelled" if isinstance(e, asyncio.CancelledError) else "error")
+
+def _llm_extract_uncached(user_text: str):
+    with ADMISSION.call(), span("llm_call"):
+        t0 = time.perf_counter()
+        try: resp = get_openai_client().chat.completions.create(**_llm_request(user_text))
+        except BaseException as e: _llm_failed(t0, e); raise
+    return _llm_result(resp, user_text, time.perf_counter() - t0)
+
+# ---------- Admission control (festival bursts) ----------
+# Every uncached LLM extraction passes admit() first: a token bucket sized to the API quota, a cap on calls
+# waiting or running (queue depth) and a moving p95 of recent call latency. A request that doesn't get in is
+# answered by rule_based_extract at once instead of queueing behind calls that will be rate-limited or time
+# out. Saturation (shedding, 429s, deadline hits) halves the admitted fraction at most once a second; every
+# fast, successful call adds LLM_ADMIT_STEP back, so the LLM share recovers gradually once load falls.
+LLM_RATE_PER_S = float(os.environ.get("LLM_RATE_PER_S", "8"))         # sustained calls/s the API quota allows
+LLM_BURST = float(os.environ.get("LLM_BURST", "16"))                  # token bucket size
+LLM_MAX_INFLIGHT = int(os.environ.get("LLM_MAX_INFLIGHT", "32"))      # admitted calls waiting or running
+LLM_P95_LIMIT_S = float(os.environ.get("LLM_P95_LIMIT_S", "4"))       # shed while the moving p95 is above this
+LLM_LATENCY_WINDOW_S = float(os.environ.get("LLM_LATENCY_WINDOW_S", "30"))  # p95 over calls finished this recently
+LLM_ADMIT_MIN = float(os.environ.get("LLM_ADMIT_MIN", "0.05"))        # always let a trickle through to probe
+LLM_ADMIT_STEP = float(os.environ.get("LLM_ADMIT_STEP", "0.05"))
+
+class LLMShed(Exception):
+    # admission refused; args[0] is the reason (queue, rate, latency, throttled)
+    pass
+
+def _is_saturation(e: BaseException) -> bool:
+    # 429s and our own deadline cancelling the call; plain errors don't say anything about load
+    return (getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError"
+            or isinstance(e, (asyncio.CancelledError, asyncio.TimeoutError, TimeoutError)))
+
+class AdmissionController:
+    P95_MIN_SAMPLES = 10
+
+    def __init__(self, rate_per_s: float = LLM_RATE_PER_S, burst: float = LLM_BURST,
+                 max_inflight: int = LLM_MAX_INFLIGHT, p95_limit_s: float = LLM_P95_LIMIT_S,
+                 window_s: float = LLM_LATENCY_WINDOW_S, clock: Callable[[], float] = time.monotonic):
+        self.rate, self.burst, self.max_inflight, self.p95_limit_s, self.window_s = rate_per_s, burst, max_inflight, p95_limit_s, window_s
+        self.clock = clock
+        self.tokens, self._refilled = burst, clock()
+        self.inflight = 0
+        self.admit_fraction = 1.0
+        self._last_cut = 0.0
+        self._latencies: "deque[Tuple[float, float]]" = deque(maxlen=512)  # (finished at, seconds)
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"queue": 0, "rate": 0, "latency": 0, "throttled": 0}
+
+    def _p95(self, now: float) -> float:
+        while self._latencies and now - self._latencies[0][0] > self.window_s: self._latencies.popleft()
+        if len(self._latencies) < self.P95_MIN_SAMPLES: return 0.0
+        lat = sorted(dt for _, dt in self._latencies)
+        return lat[int(0.95 * (len(lat) - 1))]
+
+    def _cut(self, now: float):
+        if now - self._last_cut >= 1.0:
+            self.admit_fraction, self._last_cut = max(LLM_ADMIT_MIN, self.admit_fraction / 2), now
+
+    def admit(self):
+        # take a slot or raise LLMShed
+        now = self.clock()
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate); self._refilled = now
+            if self.inflight >= self.max_inflight: reason = "queue"
+            elif self.tokens < 1.0: reason = "rate"
+            elif self._p95(now) > self.p95_limit_s: reason = "latency"
+            elif self._rng.random() >= self.admit_fraction: reason = "throttled"
+            else:
+                self.tokens -= 1.0; self.inflight += 1; self.admitted += 1
+                return
+            self.shed[reason] += 1
+            if reason != "throttled": self._cut(now)
+        raise LLMShed(reason)
+
+    def release(self, latency_s: float, ok: bool, saturated: bool = False):
+        now = self.clock()
+        with self._lock:
+            self.inflight -= 1
+            self._latencies.append((now, latency_s))
+            if saturated: self._cut(now)
+            elif ok and latency_s <= self.p95_limit_s: self.admit_fraction = min(1.0, self.admit_fraction + LLM_ADMIT_STEP)
+
+    @contextmanager
+    def call(self):
+        self.admit()
+        t0, ok, saturated = self.clock(), False, False
+        try:
+            yield
+            ok = True
+        except BaseException as e:
+            saturated = _is_saturation(e); raise
+        finally:
+            self.release(self.clock() - t0, ok, saturated)
+
+    def stats(self) -> Dict[str, float]:
+        now = self.clock()
+        with self._lock:
+            return {"inflight": self.inflight, "admit_fraction": self.admit_fraction, "p95_s": self._p95(now),
+                    "tokens": min(self.burst, self.tokens + (now - self._refilled) * self.rate), "admitted": self.admitted}
+
+ADMISSION = AdmissionController()
+
+# ---------- LLM extraction cache (LRU + TTL, per IST day, single-flight) ----------
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL_S = float(os.environ.get("LLM_CACHE_TTL_S", "900"))
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower()).rstrip(" .!?")
+
+class ExtractionCache:
+    # Keys are (IST date, normalized text): "tomorrow"/"next Monday" resolve against today's date, so
+    # everything cached on an earlier IST day is dropped. Concurrent misses on one key share a single load.
+    # `clock` (entry ages) and `today` (the IST date) are injectable for tests.
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl_s: float = LLM_CACHE_TTL_S,
+                 clock: Callable[[], float] = time.monotonic, today: Callable[[], date] = lambda: datetime.now(IST).date()):
+        self.maxsize, self.ttl_s, self.clock, self.today = maxsize, ttl_s, clock, today
+        self._data: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        self._inflight: Dict[Tuple[str,str], Future] = {}
+        self._lock = threading.Lock()
+        self._day: Optional[str] = None
+        self.hits = self.misses = self.shared = 0
+
+    def _key(self, text: str) -> Tuple[str,str]:
+        # -> (scope, key); entries from an older scope are dropped once a newer one shows up
+        return self.today().isoformat(), normalize_query(text)
+
+    def _claim(self, text: str) -> Tuple[Tuple[str,str], Future, bool]:
+        # -> (key, future, owner); hits come back as an already-resolved future
+        key = self._key(text); day = key[0]
+        with self._lock:
+            if self._day is None or day > self._day: self._data.clear(); self._day = day
+            hit = self._data.get(key)
+            if hit and self.clock() - hit[0] < self.ttl_s:
+                self._data.move_to_end(key); self.hits += 1
+                fut = Future(); fut.set_result(hit[1])
+                return key, fut, False
+            if hit: del self._data[key]
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.shared += 1
+                return key, fut, False
+            fut = self._inflight[key] = Future(); self.misses += 1
+            return key, fut, True
+
+    def _settle(self, key: Tuple[str,str], fut: Future, value=None, exc: Optional[BaseException]=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if exc is None and key[0] == self._day:
+                self._data[key] = (self.clock(), value)
+                while len(self._data) > self.maxsize: self._data.popitem(last=False)
+        if exc is None: fut.set_result(value)
+        else: fut.set_exception(exc if isinstance(exc, Exception) else RuntimeError(f"extraction aborted: {exc!r}"))
+
+    def get_or_load(self, text: str, loader):
+        key, fut, owner = self._claim(text)
+        if not owner: return fut.result()
+        try: value = loader(text)
+        except BaseException as e: self._settle(key, fut, exc=e); raise
+        self._settle(key, fut, value)
+        return value
+
+    async def aget_or_load(self, text: str, loader):
+        # async twin of get_or_load; shield so one waiter's deadline never cancels the shared call
+        key, fut, owner = self._claim(text)
+        if not owner: return await asyncio.shield(asyncio.wrap_future(fut))
+        try: value = await loader(text)
+        except BaseException as e: self._settle(key, fut, exc=e); raise
+        self._settle(key, fut, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "shared_inflight": self.shared, "size": len(self._data)}
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+LLM_CACHE = ExtractionCache()
+
+def degraded_extract(user_text: str, reason: str):
+    # rules standing in for the LLM; conf["degraded"] tells the UI to say so in the status line
+    metrics.LLM_FALLBACKS.inc(reason)
+    req, conf = rule_based_extract(user_text)
+    conf["degraded"] = reason
+    return req, conf
+
+def llm_extract(user_text: str):
+    # failures are not cached; callers get private copies since perform_search mutates the request
+    try: req, conf = LLM_CACHE.get_or_load(user_text, _llm_extract_uncached)
+    except LLMShed: return degraded_extract(user_text, "shed")
+    except LLMParseError: return degraded_extract(user_text, "parse")
+    except Exception: return degraded_extract(user_text, "error")
+    return req.model_copy(deep=True), dict(conf)
+
+# ---------- Tiered extraction (rules first; LLM only for low-confidence or conflicting fields) ----------
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "tiered")  # tiered | llm | rules
+TIERED_MIN_CONF = {
+    "puja_type": float(os.environ.get("TIERED_MIN_CONF_PUJA", "0.9")),
+    "city": float(os.environ.get("TIERED_MIN_CONF_CITY", "0.9")),
+    "time_window": float(os.environ.get("TIERED_MIN_CONF_WINDOW", "0.9")),
+}
+EXTRACT_STATS = {"rules": 0, "llm": 0}
+
+def extraction_conflicts(user_text: str, req: PujaRequest, hits: Optional[core.EntityHits] = None) -> List[str]:
+    if hits is None: hits = core.scan_entities(user_text)
+    out = []
+    pujas = set(hits.get("puja", ()))
+    if len(pujas) > 1 or (pujas and req.puja_type not in pujas): out.append("puja_type")
+    if len(hits.get("city", ())) > 1: out.append("city")
+    labels = set(hits.get("window", ()))
+    if req.time_window: labels.add(req.time_window)
+    if len(labels) > 1: out.append("time_window")
+    if len(core.date_mentions(user_text)) > 1: out.append("when_date")  # e.g. a month-like token next to "kal"
+    return out
+
+def _tiered_gate(user_text: str):
+    # -> (rules request, conf, whether the LLM should answer instead); shared by the sync and async paths
+    with span("match_entities"): hits = core.scan_entities(user_text)  # one scan for the rules and the conflict check
+    req, conf = rule_based_extract(user_text, hits)
+    unsure = [f for f, th in TIERED_MIN_CONF.items() if conf.get(f, 0.0) < th]
+    use_llm = bool(unsure or extraction_conflicts(user_text, req, hits))
+    EXTRACT_STATS["llm" if use_llm else "rules"] += 1
+    return req, conf, use_llm
+
+def tiered_extract(user_text: str):
+    req, conf, use_llm = _tiered_gate(user_text)
+    return llm_extract(user_text) if use_llm else (req, conf)
+
+def extract_request(user_text: str):
+    if EXTRACT_MODE == "llm": return llm_extract(user_text)
+    if EXTRACT_MODE == "rules": return rule_based_extract(user_text)
+    return tiered_extract(user_text)
+
+# ---------- Async OpenAI path (per-call deadline + global concurrency cap) ----------
+LLM_DEADLINE_S = float(os.environ.get("LLM_DEADLINE_S", "6"))
+TRANSCRIBE_DEADLINE_S = float(os.environ.get("TRANSCRIBE_DEADLINE_S", "20"))
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))
+_OPENAI_SLOTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _openai_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _OPENAI_SLOTS.get(loop)
+    if sem is None: sem = _OPENAI_SLOTS[loop] = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return sem
+
+async def _llm_extract_uncached_async(user_text: str):
+    with ADMISSION.call(), span("llm_call"):  # admitted calls waiting for a slot count toward queue depth
+        async with _openai_slots():
+            t0 = time.perf_counter()
+            try: resp = await get_async_openai_client().chat.completions.create(**_llm_request(user_text))
+            except BaseException as e: _llm_failed(t0, e); raise
+    return _llm_result(resp, user_text, time.perf_counter() - t0)
+
+async def llm_extract_async(user_text: str):
+    # the deadline covers waiting for a slot too; on timeout the call is cancelled and rules take over
+    try:
+        req, conf = await asyncio.wait_for(LLM_CACHE.aget_or_load(user_text, _llm_extract_uncached_async), LLM_DEADLINE_S)
+    except Exception as e:
+        reason = ("shed" if isinstance(e, LLMShed) else "parse" if isinstance(e, LLMParseError)
+                  else "timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+        return await asyncio.to_thread(degraded_extract, user_text, reason)
+    return req.model_copy(deep=True), dict(conf)
+
+async def extract_request_async(user_text: str):
+    # rules and date parsing run in a worker thread so the event loop only ever waits on OpenAI
+    if EXTRACT_MODE == "llm": return await llm_extract_async(user_text)
+    if EXTRACT_MODE == "rules": return await asyncio.to_thread(rule_based_extract, user_text)
+    req, conf, use_llm = await asyncio.to_thread(_tiered_gate, user_text)
+    return await llm_extract_async(user_text) if use_llm else (req, conf)
+
+# ---------- Voice (STT) ----------
+TRANSCRIBE_MODELS = ["gpt-4o-transcribe", "whisper-1"]  # candidates, in order of preference when healthy
+STREAMING_TRANSCRIBE_MODELS = {"gpt-4o-transcribe", "gpt-4o-mini-transcribe"}  # whisper-1 can't stream
+TRANSCRIPT_CACHE_SIZE = int(os.environ.get("TRANSCRIPT_CACHE_SIZE", "256"))
+TRANSCRIPT_CACHE_TTL_S = float(os.environ.get("TRANSCRIPT_CACHE_TTL_S", "3600"))
+ROUTER_WINDOW = int(os.environ.get("ROUTER_WINDOW", "100"))
+ROUTER_PRIOR_LATENCY_S = float(os.environ.get("ROUTER_PRIOR_LATENCY_S", "2"))
+ROUTER_FAIL_PENALTY_S = float(os.environ.get("ROUTER_FAIL_PENALTY_S", "5"))
+BREAKER_FAILS = int(os.environ.get("BREAKER_FAILS", "3"))
+BREAKER_COOLDOWN_S = float(os.environ.get("BREAKER_COOLDOWN_S", "30"))
+
+class TranscriptCache(ExtractionCache):
+    # keyed by a hash of the recording's bytes; a transcript doesn't depend on the date, so one scope
+    def _key(self, digest: str) -> Tuple[str,str]:
+        return "", digest
+
+TRANSCRIPT_CACHE = TranscriptCache(TRANSCRIPT_CACHE_SIZE, TRANSCRIPT_CACHE_TTL_S)
+
+class _ModelHealth:
+    __slots__ = ("calls", "consecutive_fails", "open_until", "probing")
+    def __init__(self):
+        self.calls: "deque[Tuple[float, bool]]" = deque(maxlen=ROUTER_WINDOW)  # (latency_s, ok)
+        self.consecutive_fails = 0
+        self.open_until = 0.0   # breaker open while clock() < open_until
+        self.probing = False    # half-open: one trial call in flight
+
+class ModelRouter:
+    # Orders models by expected cost over their last ROUTER_WINDOW calls: mean latency plus error rate x
+    # ROUTER_FAIL_PENALTY_S, both smoothed toward a prior so an untried model gets a fair first chance.
+    # BREAKER_FAILS failures in a row open a model's breaker for BREAKER_COOLDOWN_S; after that a single
+    # probe call decides whether it closes again or stays open for another cooldown.
+    PRIOR_CALLS = 3
+
+    def __init__(self, models: List[str], clock: Callable[[], float] = time.monotonic):
+        self.models, self.clock = list(models), clock
+        self._health = {m: _ModelHealth() for m in self.models}
+        self._lock = threading.Lock()
+
+    def _score(self, h: _ModelHealth) -> float:
+        n = len(h.calls)
+        lat = (sum(dt for dt, _ in h.calls) + self.PRIOR_CALLS * ROUTER_PRIOR_LATENCY_S) / (n + self.PRIOR_CALLS)
+        err = sum(1 for _, ok in h.calls if not ok) / (n + self.PRIOR_CALLS)
+        return lat + err * ROUTER_FAIL_PENALTY_S
+
+    def order(self) -> List[str]:
+        # healthiest first; models with an open breaker (still cooling down) are left out
+        now = self.clock()
+        with self._lock:
+            live = [(self._score(self._health[m]), i, m) for i, m in enumerate(self.models)
+                    if self._health[m].open_until <= now]
+        return [m for _, _, m in sorted(live)]
+
+    def acquire(self, model: str) -> bool:
+        # called right before a request; only one caller gets to probe a half-open model
+        with self._lock:
+            h = self._health[model]
+            if h.open_until == 0.0: return True
+            if h.probing or h.open_until > self.clock(): return False
+            h.probing = True
+            return True
+
+    def record(self, model: str, latency_s: float, ok: bool):
+        with self._lock:
+            h = self._health[model]
+            h.calls.append((latency_s, ok))
+            h.probing = False
+            if ok:
+                h.consecutive_fails, h.open_until = 0, 0.0
+            else:
+                h.consecutive_fails += 1
+                if h.consecutive_fails >= BREAKER_FAILS or h.open_until:
+                    h.open_until = self.clock() + BREAKER_COOLDOWN_S
+
+    def release(self, model: str):
+        # the call was abandoned (caller cancelled) — no verdict on the model either way
+        with self._lock: self._health[model].probing = False
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = self.clock()
+        with self._lock:
+            return {m: {"calls": len(h.calls), "errors": sum(1 for _, ok in h.calls if not ok),
+                        "mean_latency_s": sum(dt for dt, _ in h.calls) / len(h.calls) if h.calls else 0.0,
+                        "score": self._score(h),
+                        "breaker": "closed" if not h.open_until else ("open" if h.open_until > now else "half-open")}
+                    for m, h in self._health.items()}
+
+TRANSCRIBE_ROUTER = ModelRouter(TRANSCRIBE_MODELS)
+def _extract_text_from_transcribe(resp) -> str:
+    if isinstance(resp, str): return resp.strip()
+    for attr in ("text","output_text","transcript","result"):
+        if hasattr(resp, attr):
+            v = getattr(resp, attr)
+            if isinstance(v, str): return v.strip()
+    try:
+        d = resp.to_dict() if hasattr(resp,"to_dict") else (resp.model_dump() if hasattr(resp,"model_dump") else None)
+        if d:
+            for k in ("text","output_text","transcript","result"):
+                if k in d and isinstance(d[k], str): return d[k].strip()
+    except Exception: pass
+    return ""
+
+def _stream_event_text(ev, parts: List[str]) -> Optional[str]:
+    # collects deltas; returns the transcript once the final ("done") event arrives
+    kind = getattr(ev, "type", "")
+    if kind == "transcript.text.delta": parts.append(getattr(ev, "delta", "") or "")
+    elif kind == "transcript.text.done": return (getattr(ev, "text", None) or "".join(parts)).strip()
+    return None
+
+def _transcribe_call(model: str, upload: audio.Upload) -> str:
+    client = get_openai_client()
+    if model not in STREAMING_TRANSCRIBE_MODELS:
+        return _extract_text_from_transcribe(client.audio.transcriptions.create(
+            model=model, file=upload, response_format="text", temperature=0))
+    stream = client.audio.transcriptions.create(
+        model=model, file=upload, response_format="text", temperature=0, stream=True)
+    parts: List[str] = []
+    try:
+        for ev in stream:
+            txt = _stream_event_text(ev, parts)
+            if txt is not None: return txt  # don't wait for the server to close the stream
+    finally:
+        stream.close()
+    return "".join(parts).strip()
+
+def _transcribe_routed(upload: Optional[audio.Upload]) -> str:
+    # raises when no model produced text, so failures never land in the transcript cache
+    if upload is None: return ""
+    attempts = 0
+    for model in TRANSCRIBE_ROUTER.order():
+        if not TRANSCRIBE_ROUTER.acquire(model): continue
+        if attempts: metrics.TRANSCRIBE_RETRIES.inc(model)
+        attempts += 1
+        t0 = time.monotonic()
+        try:
+            with span("stt_call"): txt = _transcribe_call(model, upload)
+        except Exception:
+            TRANSCRIBE_ROUTER.record(model, time.monotonic() - t0, False); continue
+        TRANSCRIBE_ROUTER.record(model, time.monotonic() - t0, True)
+        if txt: return txt
+    raise RuntimeError("no transcription model returned text")
+
+def _prepare_upload(filepath: str, src: bytes) -> Optional[audio.Upload]:
+    with span("prepare_audio"): return audio.prepare_upload(filepath, src)
+
+@metrics.timed("transcribe_audio")
+def transcribe_audio(filepath: str) -> str:
+    if not filepath: return ""
+    # trimmed 16 kHz mono WAV, encoded once for all attempts; repeat clicks on one recording hit the cache.
+    # Unreadable or undecodable recordings give "" like a failed transcription (the UI asks to re-record).
+    try:
+        src = audio.read_source(filepath)
+        return TRANSCRIPT_CACHE.get_or_load(audio.content_hash(src),
+                                            lambda _: _transcribe_routed(_prepare_upload(filepath, src)))
+    except Exception: return ""
+
+async def _transcribe_call_async(model: str, upload: audio.Upload) -> str:
+    async with _openai_slots():
+        client = get_async_openai_client()
+        if model not in STREAMING_TRANSCRIBE_MODELS:
+            return _extract_text_from_transcribe(await client.audio.transcriptions.create(
+                model=model, file=upload, response_format="text", temperature=0))
+        stream = await client.audio.transcriptions.create(
+            model=model, file=upload, response_format="text", temperature=0, stream=True)
+        parts: List[str] = []
+        try:
+            async for ev in stream:
+                txt = _stream_event_text(ev, parts)
+                if txt is not None: return txt
+        finally:
+            await stream.close()
+        return "".join(parts).strip()
+
+async def _transcribe_routed_async(upload: Optional[audio.Upload]) -> str:
+    if upload is None: return ""
+    attempts = 0
+    for model in TRANSCRIBE_ROUTER.order():
+        if not TRANSCRIBE_ROUTER.acquire(model): continue
+        if attempts: metrics.TRANSCRIBE_RETRIES.inc(model)
+        attempts += 1
+        t0 = time.monotonic()
+        try:
+            with span("stt_call"):
+                txt = await asyncio.wait_for(_transcribe_call_async(model, upload), TRANSCRIBE_DEADLINE_S)
+        except asyncio.CancelledError:
+            TRANSCRIBE_ROUTER.release(model); raise
+        except Exception:
+            TRANSCRIBE_ROUTER.record(model, time.monotonic() - t0, False); continue
+        TRANSCRIBE_ROUTER.record(model, time.monotonic() - t0, True)
+        if txt: return txt
+    raise RuntimeError("no transcription model returned text")
+
+@metrics.timed("transcribe_audio")
+async def transcribe_audio_async(filepath: str) -> str:
+    if not filepath: return ""
+    try:
+        src = await asyncio.to_thread(audio.read_source, filepath)
+        async def load(_):
+            return await _transcribe_routed_async(await asyncio.to_thread(_prepare_upload, filepath, src))
+        return await TRANSCRIPT_CACHE.aget_or_load(audio.content_hash(src), load)
+    except Exception: return ""
+
+# ---------- Scrape-time gauges (see metrics.py) ----------
+def _cache_totals(field: str):
+    return lambda: {("llm",): LLM_CACHE.stats()[field], ("transcript",): TRANSCRIPT_CACHE.stats()[field]}
+
+metrics.GaugeFn("pandit_cache_hits_total", "Extraction/transcript cache hits.", _cache_totals("hits"), ("cache",), kind="counter")
+metrics.GaugeFn("pandit_cache_misses_total", "Extraction/transcript cache misses.", _cache_totals("misses"), ("cache",), kind="counter")
+metrics.GaugeFn("pandit_cache_entries", "Entries held per cache.", _cache_totals("size"), ("cache",))
+metrics.GaugeFn("pandit_extract_path_total", "Tiered extraction answered by rules vs LLM.",
+                lambda: {(k,): v for k, v in EXTRACT_STATS.items()}, ("path",), kind="counter")
+metrics.GaugeFn("pandit_llm_admit_fraction", "Share of uncached LLM extractions admitted (1 = no throttling).",
+                lambda: {(): ADMISSION.stats()["admit_fraction"]})
+metrics.GaugeFn("pandit_llm_inflight", "Admitted LLM extractions waiting or running.", lambda: {(): ADMISSION.inflight})
+metrics.GaugeFn("pandit_llm_p95_seconds", "Moving p95 of LLM extraction latency used for admission.",
+                lambda: {(): ADMISSION.stats()["p95_s"]})
+metrics.GaugeFn("pandit_llm_shed_total", "LLM extractions answered by rules at admission, by reason.",
+                lambda: {(k,): v for k, v in ADMISSION.shed.items()}, ("reason",), kind="counter")
+metrics.GaugeFn("pandit_stt_breaker_open", "1 while a transcription model's circuit breaker is open.",
+                lambda: {(m,): float(s["breaker"] == "open") for m, s in TRANSCRIBE_ROUTER.stats().items()}, ("model",))
+metrics.GaugeFn("pandit_stt_model_score", "Router expected cost per transcription model (lower is tried first).",
+                lambda: {(m,): s["score"] for m, s in TRANSCRIBE_ROUTER.stats().items()}, ("model",))
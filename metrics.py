@@ -0,0 +1,219 @@
+from __future__ import annotations
+# === Metrics — per-stage timing spans, counters, Prometheus text endpoint, slowest-request profiler ===
+# Stdlib only, so core.py and llm.py can instrument themselves without pulling in anything heavy.
+# A request (perform_search, voice_find, ...) opens a trace in a ContextVar; span() inside it records the
+# stage into a histogram and, when the request is sampled for profiling, into the trace's breakdown.
+# Spans outside any request (batch jobs, benchmarks) cost one ContextVar lookup and record nothing.
+
+from typing import List, Dict, Optional, Tuple, Callable, Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os, json, time, heapq, atexit, random, bisect, inspect, threading, functools
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))                 # 0 disables the endpoint
+PROFILE_SLOWEST_N = int(os.environ.get("PROFILE_SLOWEST_N", "0"))          # opt-in: keep the N slowest requests
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "1.0"))  # fraction of requests considered
+PROFILE_DUMP = os.environ.get("PROFILE_DUMP", "")                          # write them here as JSON at exit
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+_REGISTRY: List[Any] = []
+
+def _esc(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{k}="{_esc(v)}"' for k, v in zip(names, values)] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, *labels: str, n: float = 1.0):
+        with self._lock: self._values[labels] = self._values.get(labels, 0.0) + n
+
+    def value(self, *labels: str) -> float:
+        with self._lock: return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock: items = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.label_names, k)} {v:g}" for k, v in items]
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help, labels, buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # labels -> [per-bucket counts..., +Inf, sum]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None: s = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1; s[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            s = self._series.get(labels)
+            return int(sum(s[:-1])) if s else 0
+
+    def render(self) -> List[str]:
+        with self._lock: items = sorted((k, list(v)) for k, v in self._series.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, s in items:
+            cum = 0.0
+            for le, c in zip([f"{b:g}" for b in self.buckets] + ["+Inf"], s[:-1]):
+                cum += c; le_label = f'le="{le}"'
+                out.append(f"{self.name}_bucket{_labels(self.label_names, k, le_label)} {cum:g}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, k)} {s[-1]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.label_names, k)} {cum:g}")
+        return out
+
+class GaugeFn:
+    # sampled at scrape time: fn() -> {label values tuple: value}; kind="counter" for totals kept elsewhere
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name, self.help, self.fn, self.label_names, self.kind = name, help, fn, labels, kind
+        _REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        try: items = sorted(self.fn().items())
+        except Exception: items = []
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        out += [f"{self.name}{_labels(self.label_names, k)} {float(v):g}" for k, v in items]
+        return out
+
+REQUEST_SECONDS = Histogram("pandit_request_seconds", "End-to-end handler latency.", ("handler",))
+STAGE_SECONDS = Histogram("pandit_stage_seconds", "Latency of one stage inside a handler.", ("handler", "stage"))
+REQUEST_ERRORS = Counter("pandit_request_errors_total", "Handlers that raised.", ("handler",))
+LLM_FALLBACKS = Counter("pandit_llm_fallbacks_total", "LLM extractions answered by the rule-based parser instead.", ("reason",))
+SEARCH_OUTCOMES = Counter("pandit_search_outcomes_total", "Searches by outcome (ok, no_match, needs_time_window).", ("outcome",))
+LLM_TOKENS = Counter("pandit_llm_tokens_total", "Tokens billed for LLM extractions (prompt includes cached_prompt).", ("kind",))
+LLM_CALL_SECONDS = Histogram("pandit_llm_call_seconds", "One LLM extraction call, by outcome (ok, parse_error, error, cancelled).", ("outcome",))
+TRANSCRIBE_RETRIES = Counter("pandit_transcription_retries_total", "Transcription attempts after the first for one recording.", ("model",))
+
+# ---------- Traces ----------
+class _Trace:
+    __slots__ = ("handler", "t0", "started_at", "spans")
+    def __init__(self, handler: str, sampled: bool):
+        self.handler, self.t0, self.started_at = handler, time.perf_counter(), time.time()
+        self.spans: Optional[List[Tuple[str, float, float]]] = [] if sampled else None  # (stage, offset_s, dt_s)
+
+_TRACE: ContextVar[Optional[_Trace]] = ContextVar("pandit_trace", default=None)
+
+@contextmanager
+def span(stage: str):
+    tr = _TRACE.get()
+    if tr is None:
+        yield; return
+    t0 = time.perf_counter()
+    try: yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, tr.handler, stage)
+        if tr.spans is not None: tr.spans.append((stage, t0 - tr.t0, dt))
+
+@contextmanager
+def request(handler: str):
+    # a request started inside another (voice_find -> perform_search) is recorded as a stage of the outer one
+    if _TRACE.get() is not None:
+        with span(handler): yield
+        return
+    tr = _Trace(handler, PROFILE_SLOWEST_N > 0 and random.random() < PROFILE_SAMPLE_RATE)
+    token = _TRACE.set(tr)
+    try: yield
+    except BaseException:
+        REQUEST_ERRORS.inc(handler); raise
+    finally:
+        _TRACE.reset(token)
+        dt = time.perf_counter() - tr.t0
+        REQUEST_SECONDS.observe(dt, handler)
+        if tr.spans is not None: SLOWEST.offer(tr, dt)
+
+def timed(handler: str):
+    # decorator form of request(); works on sync and async functions
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*a, **kw):
+                with request(handler): return await fn(*a, **kw)
+            return awrapper
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with request(handler): return fn(*a, **kw)
+        return wrapper
+    return deco
+
+# ---------- Slowest-N profiler (opt-in) ----------
+class SlowestRequests:
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []  # min-heap on total time
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def offer(self, tr: _Trace, dt: float):
+        with self._lock:
+            if self.n <= 0 or (len(self._heap) >= self.n and dt <= self._heap[0][0]): return
+            rec = {"handler": tr.handler, "total_ms": round(dt * 1000, 3),
+                   "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(tr.started_at)),
+                   "stages": [{"stage": s, "start_ms": round(off * 1000, 3), "ms": round(d * 1000, 3)}
+                              for s, off, d in sorted(tr.spans, key=lambda sp: sp[1])]}
+            self._seq += 1
+            heapq.heappush(self._heap, (dt, self._seq, rec))
+            if len(self._heap) > self.n: heapq.heappop(self._heap)
+
+    def dump(self) -> List[Dict[str, Any]]:
+        with self._lock: return [rec for _, _, rec in sorted(self._heap, reverse=True)]
+
+SLOWEST = SlowestRequests(PROFILE_SLOWEST_N)
+
+def dump_slowest(path: str):
+    with open(path, "w", encoding="utf-8") as f: json.dump(SLOWEST.dump(), f, indent=2, ensure_ascii=False)
+
+if PROFILE_DUMP and PROFILE_SLOWEST_N > 0: atexit.register(dump_slowest, PROFILE_DUMP)
+
+# ---------- Exposition ----------
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for m in list(_REGISTRY): lines += m.render()
+    return "\n".join(lines) + "\n"
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    # GET /metrics (Prometheus text format) and /slowest (profiler JSON) on a daemon thread; idempotent
+    global _server
+    if port <= 0: return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    with _server_lock:
+        if _server is not None: return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *a): pass
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body, ctype = render_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/slowest":
+                    body, ctype = json.dumps(SLOWEST.dump(), ensure_ascii=False).encode(), "application/json"
+                else:
+                    self.send_error(404); return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,160 @@
+from __future__ import annotations
+# === Slot reservations — SQLite (WAL) ledger + in-memory occupancy bitmaps per (date, window) ===
+# The ledger is the source of truth: one row per (pandit, date, window), so "check and reserve" is a
+# single INSERT against the primary key. Searches only read the in-memory bitmaps, which are loaded
+# lazily per date and re-read every OCCUPANCY_REFRESH_S to pick up bookings made by other workers.
+# Bits are dense ordinals handed out to pandit ids on their first booking, so a bitmap's size follows
+# the number of booked pandits, not the largest pandit id.
+# WAL lets those re-reads run while a writer holds the lock, so festival write bursts never stall search.
+
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime
+import os, time, sqlite3, threading
+
+import numpy as np
+
+from core import IST
+
+BOOKINGS_DB = os.environ.get("BOOKINGS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db"))
+OCCUPANCY_REFRESH_S = float(os.environ.get("OCCUPANCY_REFRESH_S", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    pandit_id  INTEGER NOT NULL,
+    slot_date  TEXT    NOT NULL,  -- YYYY-MM-DD (IST)
+    time_window TEXT   NOT NULL,
+    puja_type  TEXT,
+    payment    TEXT,
+    created_at TEXT    NOT NULL,
+    PRIMARY KEY (pandit_id, slot_date, time_window)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS reservations_by_slot ON reservations (slot_date, time_window);
+"""
+
+def _set_bit(bm: bytearray, bit: int):
+    i = bit >> 3
+    if i >= len(bm): bm.extend(bytes(i + 1 - len(bm)))
+    bm[i] |= 1 << (bit & 7)
+
+def _clear_bit(bm: bytearray, bit: int):
+    i = bit >> 3
+    if i < len(bm): bm[i] &= ~(1 << (bit & 7)) & 0xFF
+
+def _test_bit(bm: Optional[bytearray], bit: int) -> bool:
+    i = bit >> 3
+    return bool(bm) and i < len(bm) and bool(bm[i] >> (bit & 7) & 1)
+
+class ReservationLedger:
+    def __init__(self, path: str = BOOKINGS_DB, refresh_s: float = OCCUPANCY_REFRESH_S):
+        self.path, self.refresh_s = path, refresh_s
+        self._local = threading.local()  # one connection per thread
+        self._lock = threading.Lock()    # guards the bitmaps only, never held across SQL
+        self._occ: Dict[Tuple[str, str], bytearray] = {}  # (date, window) -> bitmap over pandit ordinals
+        self._ord: Dict[int, int] = {}                    # pandit id -> ordinal (its bit), from first booking
+        self._ids: List[int] = []                         # ordinal -> pandit id
+        self._loaded: Dict[str, float] = {}               # date -> monotonic load time
+        self._writes: Dict[str, int] = {}                 # date -> local writes, to drop racing reloads
+        self._slot_ver: Dict[Tuple[str, str], int] = {}   # (date, window) -> bumps when that bitmap changes
+        self.version = 0                                  # bumps whenever occupancy changes
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    # ---- occupancy (reads) ----
+    def _ensure_loaded(self, day: str):
+        t = self._loaded.get(day)
+        if t is not None and time.monotonic() - t < self.refresh_s: return
+        writes = self._writes.get(day, 0)
+        rows = self._conn().execute(
+            "SELECT pandit_id, time_window FROM reservations WHERE slot_date = ?", (day,)).fetchall()
+        with self._lock:
+            if self._writes.get(day, 0) != writes: return  # a local write landed mid-read; retry next time
+            fresh: Dict[str, bytearray] = {}
+            for pid, window in rows: _set_bit(fresh.setdefault(window, bytearray()), self._ordinal(pid))
+            old = {w: bm for (d, w), bm in self._occ.items() if d == day}
+            if old != fresh:
+                for w in set(old) | set(fresh):
+                    if old.get(w, b"").rstrip(b"\0") != fresh.get(w, b"").rstrip(b"\0"): self._bump(day, w)
+                for w in old: del self._occ[(day, w)]
+                for w, bm in fresh.items(): self._occ[(day, w)] = bm
+                self.version += 1
+            self._loaded[day] = time.monotonic()
+
+    def _ordinal(self, pid: int) -> int:
+        # caller holds self._lock
+        o = self._ord.get(pid)
+        if o is None: o = self._ord[pid] = len(self._ids); self._ids.append(pid)
+        return o
+
+    def _bump(self, day: str, window: str):
+        self._slot_ver[(day, window)] = self._slot_ver.get((day, window), 0) + 1
+
+    def slot_version(self, when: date, window: str) -> int:
+        # changes whenever the set of booked pandits for this date/window changes (here or in another worker)
+        day = when.isoformat()
+        self._ensure_loaded(day)
+        with self._lock: return self._slot_ver.get((day, window), 0)
+
+    def booked_ids(self, when: date, window: str) -> Optional[np.ndarray]:
+        # sorted ids of the pandits booked for this date/window; None when nothing is booked
+        day = when.isoformat()
+        self._ensure_loaded(day)
+        with self._lock:
+            bm = self._occ.get((day, window))
+            if not bm or not any(bm): return None
+            bits = np.flatnonzero(np.unpackbits(np.frombuffer(bytes(bm), dtype=np.uint8), bitorder="little"))
+            return np.sort(np.array([self._ids[b] for b in bits.tolist()], dtype=np.int64))
+
+    def is_booked(self, pandit_id: int, when: date, window: str) -> bool:
+        day = when.isoformat()
+        self._ensure_loaded(day)
+        with self._lock:
+            o = self._ord.get(pandit_id)
+            return o is not None and _test_bit(self._occ.get((day, window)), o)
+
+    # ---- reservations (writes) ----
+    def reserve(self, pandit_id: int, when: date, window: str, puja_type: Optional[str] = None,
+                payment: Optional[str] = None) -> bool:
+        # atomic check-and-reserve; False when the slot is already taken (by anyone, in any process)
+        day = when.isoformat()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO reservations (pandit_id, slot_date, time_window, puja_type, payment, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (int(pandit_id), day, window, puja_type, payment, datetime.now(IST).isoformat(timespec="seconds")))
+        ok = cur.rowcount == 1
+        with self._lock:
+            self._writes[day] = self._writes.get(day, 0) + 1
+            bm, o = self._occ.setdefault((day, window), bytearray()), self._ordinal(pandit_id)
+            if not _test_bit(bm, o):
+                _set_bit(bm, o); self.version += 1; self._bump(day, window)
+        return ok
+
+    def release(self, pandit_id: int, when: date, window: str) -> bool:
+        day = when.isoformat()
+        cur = self._conn().execute(
+            "DELETE FROM reservations WHERE pandit_id = ? AND slot_date = ? AND time_window = ?",
+            (int(pandit_id), day, window))
+        with self._lock:
+            self._writes[day] = self._writes.get(day, 0) + 1
+            bm, o = self._occ.get((day, window)), self._ord.get(pandit_id)
+            if o is not None and _test_bit(bm, o):
+                _clear_bit(bm, o); self.version += 1; self._bump(day, window)
+        return cur.rowcount == 1
+
+_ledger: Optional[ReservationLedger] = None
+_ledger_lock = threading.Lock()
+
+def get_ledger() -> ReservationLedger:
+    # created on first use so importing never touches the filesystem
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None: _ledger = ReservationLedger()
+        return _ledger
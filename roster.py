@@ -0,0 +1,450 @@
+from __future__ import annotations
+# === Roster file -> compact binary snapshot -> live roster, with hot reload ===
+# The roster lives in an external CSV/JSONL file (ROSTER_FILE). It is compiled once into a snapshot of
+# fixed-width little-endian records with integer-coded cities, specializations, languages and time windows
+# plus one string table, laid out so np.frombuffer over an mmap reads it with no per-record parsing.
+# A snapshot remembers the size/mtime of the file it came from and is only recompiled when that changes.
+# The live roster ranks straight off the mapped snapshot (SnapshotRoster): its store columns, posting lists and
+# geo arrays are used as they are, and Pandit records are decoded only for the rows a search returns.
+# start() installs ROSTER_FILE and a watcher thread polls it, swapping the new roster in with
+# core.install_roster(); searches already running finish on the generation they started with.
+# Usage: python roster.py export data/pandits.jsonl    (write ROSTER_FILE out in another format, e.g. CSV -> JSONL)
+#        python roster.py compile data/pandits.csv     (validate + write data/pandits.csv.snap)
+
+from typing import List, Dict, Optional, Tuple, Any
+from datetime import date
+import os, re, csv, sys, json, math, mmap, struct, argparse, threading
+
+import numpy as np
+
+import core, metrics
+from core import (Pandit, GeoGrid, PanditStore, PUJA_CATALOG, WINDOW_MAP, WINDOW_LABELS, WEEKDAY_TOKEN,
+                  SERVICE_MODES, _hhmm)
+
+ROSTER_FILE = os.environ.get("ROSTER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pandits.csv"))
+ROSTER_SNAPSHOT = os.environ.get("ROSTER_SNAPSHOT", "")      # default: <ROSTER_FILE>.snap
+ROSTER_POLL_S = float(os.environ.get("ROSTER_POLL_S", "5"))  # 0 disables hot reload
+
+FIELDS = ["id", "name", "specializations", "base_fee", "city", "languages", "rating", "experience_years",
+          "service_mode", "phone", "time_windows", "days", "lat", "lon", "off_dates"]
+_HHMM = re.compile(r"^([01]\d|2[0-3]):([0-5]\d)$")
+
+ROSTER_RELOADS = metrics.Counter("pandit_roster_reloads_total", "Roster file reloads by result.", ("result",))
+metrics.GaugeFn("pandit_roster_size", "Pandits in the live roster.", lambda: {(): len(core.ROSTER.pandits)})
+
+# ---------- Source file (CSV / JSONL) ----------
+def _split(v: Any) -> List[str]:
+    # list fields: JSON arrays, or "a|b|c" in CSV
+    if v is None or v == "": return []
+    if isinstance(v, list): return [str(x).strip() for x in v]
+    return [x.strip() for x in str(v).split("|") if x.strip()]
+
+def _windows(v: Any) -> List[Tuple[str, str, str]]:
+    # [["morning","08:30","10:30"], ...] or "morning 08:30-10:30|evening 17:30-19:30"
+    out = []
+    for w in (v if isinstance(v, list) else _split(v)):
+        if isinstance(w, str):
+            m = re.fullmatch(r"(\w+)\s+(\d\d:\d\d)\s*-\s*(\d\d:\d\d)", w)
+            if not m: raise ValueError(f"bad time window {w!r}")
+            w = m.groups()
+        label, start, end = (str(x).strip() for x in w)
+        if label not in WINDOW_MAP: raise ValueError(f"unknown window {label!r}")
+        if not (_HHMM.match(start) and _HHMM.match(end)): raise ValueError(f"bad time in window {label} {start}-{end}")
+        out.append((label, start, end))
+    return out
+
+def _pandit(row: Dict[str, Any]) -> Pandit:
+    specs = _split(row.get("specializations"))
+    unknown = [s for s in specs if s not in PUJA_CATALOG]
+    if unknown: raise ValueError(f"unknown specialization(s) {unknown}")
+    days = _split(row.get("days"))
+    if any(d not in WEEKDAY_TOKEN for d in days): raise ValueError(f"bad days {days}")
+    mode = str(row.get("service_mode") or "").strip()
+    if mode not in SERVICE_MODES: raise ValueError(f"bad service_mode {mode!r}")
+    lat, lon = row.get("lat"), row.get("lon")
+    return Pandit(int(row["id"]), str(row["name"]).strip(), specs, int(row["base_fee"]), str(row["city"]).strip(),
+                  _split(row.get("languages")), float(row["rating"]), int(row["experience_years"]), mode,
+                  str(row["phone"]).strip(), _windows(row.get("time_windows")), days,
+                  float(lat) if lat not in (None, "") else None, float(lon) if lon not in (None, "") else None,
+                  tuple(date.fromisoformat(d) for d in _split(row.get("off_dates"))))
+
+def read_roster_file(path: str) -> List[Pandit]:
+    # CSV (list fields "|"-separated) or JSONL by extension; raises ValueError naming the bad line
+    jsonl = path.endswith((".jsonl", ".ndjson"))
+    out: List[Pandit] = []
+    seen: Dict[int, int] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = ((i, json.loads(line)) for i, line in enumerate(f, 1) if line.strip()) if jsonl else \
+               ((i, row) for i, row in enumerate(csv.DictReader(f), 2))
+        for line, row in rows:
+            try:
+                p = _pandit(row)
+            except (KeyError, ValueError, TypeError) as e:
+                raise ValueError(f"{path}:{line}: {type(e).__name__}: {e}") from None
+            if p.id in seen: raise ValueError(f"{path}:{line}: duplicate id {p.id} (first on line {seen[p.id]})")
+            seen[p.id] = line
+            out.append(p)
+    return out
+
+def write_roster_file(pandits: List[Pandit], path: str):
+    def row(p: Pandit) -> Dict[str, Any]:
+        return {"id": p.id, "name": p.name, "specializations": "|".join(p.specializations), "base_fee": p.base_fee,
+                "city": p.city, "languages": "|".join(p.languages), "rating": p.rating,
+                "experience_years": p.experience_years, "service_mode": p.service_mode, "phone": p.phone,
+                "time_windows": "|".join(f"{l} {s}-{e}" for l, s, e in p.time_windows), "days": "|".join(p.days),
+                "lat": "" if p.lat is None else p.lat, "lon": "" if p.lon is None else p.lon,
+                "off_dates": "|".join(d.isoformat() for d in p.off_dates)}
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for p in pandits:
+                r = row(p)
+                r.update(specializations=p.specializations, languages=p.languages, days=p.days,
+                         time_windows=[list(w) for w in p.time_windows], lat=p.lat, lon=p.lon,
+                         off_dates=[d.isoformat() for d in p.off_dates])
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        else:
+            w = csv.DictWriter(f, fieldnames=FIELDS)
+            w.writeheader()
+            for p in pandits: w.writerow(row(p))
+
+# ---------- Binary snapshot ----------
+MAGIC = b"PNDTSNAP"
+FORMAT_VERSION = 2
+RECORD = np.dtype([("id", "<i8"), ("rating", "<f8"), ("lat", "<f8"), ("lon", "<f8"),   # lat/lon NaN = unset
+                   ("fee", "<i4"), ("city", "<u4"), ("name", "<u4"), ("phone", "<u4"),  # string-table ids
+                   ("spec_at", "<u4"), ("lang_at", "<u4"), ("win_at", "<u4"), ("off_at", "<u4"),  # slice starts
+                   ("experience", "<i2"), ("off_n", "<u2"), ("mode", "u1"), ("day_bits", "u1"),
+                   ("spec_n", "u1"), ("lang_n", "u1"), ("win_n", "u1"), ("_pad", "V7")])
+WINDOW = np.dtype([("label", "u1"), ("start", "<u2"), ("end", "<u2")])  # minutes from midnight
+POSTING = np.dtype([("kind", "u1"), ("key", "<i8"), ("at", "<i8"), ("n", "<i8")])  # key: string id, or date ordinal
+POSTING_KINDS = ("spec", "window", "day", "off")
+SECTIONS = (("records", RECORD), ("codes", np.dtype("<u4")), ("windows", WINDOW), ("off_dates", np.dtype("<i4")),
+            ("str_offsets", np.dtype("<u8")), ("str_blob", np.dtype("u1")),
+            # rank-ready part, what shared_roster.py ranks from: PanditStore columns in record order,
+            # ids sorted for id -> row lookups, posting lists of rows, and the geo grid's cell-sorted arrays
+            *((f"col_{name}", np.dtype(dt).newbyteorder("<")) for name, dt in core.PanditStore.COLUMNS),
+            ("col_window_mid", np.dtype("<i8")), ("id_sorted", np.dtype("<i8")), ("id_order", np.dtype("<i8")),
+            ("post_keys", POSTING), ("post_rows", np.dtype("<i4")),
+            ("geo_codes", np.dtype("<i8")), ("geo_ids", np.dtype("<i8")), ("geo_lat", np.dtype("<f8")),
+            ("geo_lon", np.dtype("<f8")), ("meta", np.dtype("<f8")))
+HEADER = struct.Struct("<8sIIqq" + "qq" * len(SECTIONS))  # magic, version, pad, source size, source mtime_ns, (offset, count)*
+
+def compile_snapshot(pandits: List[Pandit], path: str, source: Tuple[int, int] = (0, 0)):
+    # written to a temp file and renamed, so readers (other workers) see the old or the new snapshot, never half
+    strings: Dict[str, int] = {}
+    sid = lambda s: strings.setdefault(s, len(strings))
+    rec = np.zeros(len(pandits), dtype=RECORD)
+    codes: List[int] = []; windows: List[Tuple[int, int, int]] = []; offs: List[int] = []
+    for i, p in enumerate(pandits):
+        r = rec[i]
+        r["id"], r["rating"], r["fee"], r["experience"] = p.id, p.rating, p.base_fee, p.experience_years
+        r["lat"] = np.nan if p.lat is None else p.lat
+        r["lon"] = np.nan if p.lon is None else p.lon
+        r["city"], r["name"], r["phone"] = sid(p.city), sid(p.name), sid(p.phone)
+        r["mode"], r["day_bits"] = p.mode_id, p.day_bits
+        r["spec_at"], r["spec_n"] = len(codes), len(p.specializations); codes += [sid(s) for s in p.specializations]
+        r["lang_at"], r["lang_n"] = len(codes), len(p.languages); codes += [sid(s) for s in p.languages]
+        r["win_at"], r["win_n"] = len(windows), len(p.time_windows)
+        windows += p.windows  # already (slot, start, end) minutes
+        r["off_at"], r["off_n"] = len(offs), len(p.off_dates); offs += [d.toordinal() for d in p.off_dates]
+    store, geo = core.PanditStore(pandits), core.GeoGrid(pandits)
+    if store.n != len(pandits): raise ValueError("duplicate pandit ids")
+    postings: Dict[Tuple[int, int], List[int]] = {}
+    for row, p in enumerate(pandits):
+        keys = ({(0, sid(x)) for x in p.specializations} | {(1, sid(w)) for w, _, _ in p.time_windows}
+                | {(2, sid(d)) for d in p.days} | {(3, d.toordinal()) for d in p.off_dates})
+        for key in keys: postings.setdefault(key, []).append(row)
+    post_keys = np.zeros(len(postings), dtype=POSTING)
+    post_rows: List[int] = []
+    for i, key in enumerate(sorted(postings)):
+        post_keys[i] = key + (len(post_rows), len(postings[key])); post_rows += postings[key]
+    pid = store.pid[:store.n]
+    id_order = np.argsort(pid, kind="stable")
+    encoded = [s.encode("utf-8") for s in strings]
+    str_offsets = np.zeros(len(encoded) + 1, dtype="<u8"); np.cumsum([len(b) for b in encoded], out=str_offsets[1:])
+    arrays = [rec, np.array(codes, dtype="<u4"), np.array(windows, dtype=WINDOW), np.array(offs, dtype="<i4"),
+              str_offsets, np.frombuffer(b"".join(encoded), dtype="u1"),
+              *(getattr(store, name)[:store.n] for name, _ in core.PanditStore.COLUMNS),
+              store.window_mid[:store.n].ravel(), pid[id_order], id_order, post_keys, np.array(post_rows, dtype="<i4"),
+              *geo._sorted(), np.array([geo.cell])]
+    arrays = [a.astype(dt, copy=False) for a, (_, dt) in zip(arrays, SECTIONS)]
+    layout, pos = [], HEADER.size
+    for a in arrays:
+        pos = (pos + 7) & ~7  # 8-byte aligned sections
+        layout += [pos, len(a)]; pos += a.nbytes
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, source[0], source[1], *layout))
+        for a, off in zip(arrays, layout[::2]):
+            f.write(b"\0" * (off - f.tell())); f.write(a.tobytes())
+    os.replace(tmp, path)
+
+class Snapshot:
+    # zero-copy views over a compiled snapshot (an mmap or bytes); pandit(row) decodes one record
+    def __init__(self, buf):
+        magic, version, _, size, mtime, *layout = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION: raise ValueError("not a roster snapshot (or an old format)")
+        self.buf, self.source, self._small = buf, (size, mtime), {}
+        for (name, dt), off, n in zip(SECTIONS, layout[::2], layout[1::2]):
+            setattr(self, name, np.frombuffer(buf, dtype=dt, count=n, offset=off))
+
+    @classmethod
+    def open(cls, path: str) -> "Snapshot":
+        with open(path, "rb") as f: return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def string(self, i: int) -> str:
+        a, b = self.str_offsets[i:i + 2].tolist()
+        return self.str_blob[a:b].tobytes().decode("utf-8")
+
+    def pandit(self, row: int) -> Pandit:
+        # one record decoded straight from the mapped pages; only the few repeated strings are cached
+        (pid, rating, lat, lon, fee, city, name, phone, spec_at, lang_at, win_at, off_at,
+         exp, off_n, mode, day_bits, spec_n, lang_n, win_n, _) = self.records[row].tolist()
+        small = self._small
+        def word(i: int) -> str:
+            v = small.get(i)
+            if v is None: v = small[i] = self.string(i)
+            return v
+        return Pandit(pid, self.string(name), [word(c) for c in self.codes[spec_at:spec_at + spec_n].tolist()], fee,
+                      word(city), [word(c) for c in self.codes[lang_at:lang_at + lang_n].tolist()], rating, exp,
+                      SERVICE_MODES[mode], self.string(phone),
+                      [(WINDOW_LABELS[l], _hhmm(a), _hhmm(b)) for l, a, b in self.windows[win_at:win_at + win_n].tolist()],
+                      [d for i, d in enumerate(WEEKDAY_TOKEN) if day_bits >> i & 1],
+                      None if lat != lat else lat, None if lon != lon else lon,  # NaN = unset
+                      tuple(date.fromordinal(d) for d in self.off_dates[off_at:off_at + off_n].tolist()))
+
+# ---------- Read-only roster over a snapshot ----------
+class RosterRows:
+    # candidates from a snapshot: store rows in candidate order; records are decoded on access
+    __slots__ = ("rows", "snapshot")
+
+    def __init__(self, rows: np.ndarray, snapshot: Snapshot):
+        self.rows, self.snapshot = rows, snapshot
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i: int) -> Pandit:
+        return self.snapshot.pandit(int(self.rows[i]))
+
+    def __iter__(self):
+        return (self.snapshot.pandit(r) for r in self.rows.tolist())
+
+    def take(self, positions: np.ndarray) -> "RosterRows":
+        return RosterRows(self.rows[positions], self.snapshot)
+
+class _RowOf:
+    # the `row_of` mapping of a snapshot store: binary search over the snapshot's sorted ids
+    __slots__ = ("ids", "order")
+
+    def __init__(self, ids: np.ndarray, order: np.ndarray):
+        self.ids, self.order = ids, order
+
+    def get(self, pid: int, default=None):
+        i = int(np.searchsorted(self.ids, pid))
+        return int(self.order[i]) if i < len(self.ids) and self.ids[i] == pid else default
+
+    def __contains__(self, pid) -> bool:
+        return self.get(pid) is not None
+
+    def __getitem__(self, pid: int) -> int:
+        r = self.get(pid)
+        if r is None: raise KeyError(pid)
+        return r
+
+    def rows(self, pids: np.ndarray) -> np.ndarray:
+        # rows of ids known to be present
+        return self.order[np.searchsorted(self.ids, pids)]
+
+class SnapshotStore(PanditStore):
+    # PanditStore whose columns are read-only views into the snapshot
+    def __init__(self, snap: Snapshot):
+        self.n = len(snap)
+        for name, _ in self.COLUMNS: setattr(self, name, getattr(snap, f"col_{name}"))
+        self.window_mid = snap.col_window_mid.reshape(self.n, len(core.WINDOW_SLOT))
+        self.row_of = _RowOf(snap.id_sorted, snap.id_order)
+
+    def add(self, p: Pandit): raise TypeError("snapshot store is read-only")
+    def remove(self, pid: int): raise TypeError("snapshot store is read-only")
+
+    def rows_for(self, pandits) -> np.ndarray:
+        if isinstance(pandits, RosterRows): return pandits.rows
+        return self.row_of.rows(np.fromiter((p.id for p in pandits), dtype=np.int64, count=len(pandits)))
+
+class SnapshotIndex:
+    # PanditIndex.candidates() over the snapshot's posting lists (rows ascending = roster order)
+    def __init__(self, snap: Snapshot, row_of: _RowOf):
+        self.snapshot, self.row_of, self.n = snap, row_of, len(snap)
+        self.postings: Dict[Tuple[str, object], Tuple[int, int]] = {}
+        for kind, key, at, n in snap.post_keys.tolist():
+            k = date.fromordinal(key) if POSTING_KINDS[kind] == "off" else snap.string(key)
+            self.postings[(POSTING_KINDS[kind], k)] = (at, n)
+
+    def _rows(self, kind: str, key) -> np.ndarray:
+        at, n = self.postings.get((kind, key), (0, 0))
+        return self.snapshot.post_rows[at:at + n]
+
+    def candidates(self, puja_type: Optional[str]=None, window: Optional[str]=None,
+                   weekday: Optional[str]=None, near: Optional[set]=None, on: Optional[date]=None) -> RosterRows:
+        lists = [] if near is None else [np.sort(self.row_of.rows(np.fromiter(near, dtype=np.int64, count=len(near))))]
+        if puja_type: lists.append(self._rows("spec", puja_type))
+        if window: lists.append(self._rows("window", window))
+        if weekday: lists.append(self._rows("day", weekday))
+        if not lists:
+            rows = np.arange(self.n)
+        else:
+            lists.sort(key=len)
+            rows = lists[0]
+            for other in lists[1:]: rows = np.intersect1d(rows, other, assume_unique=True)
+        if on is not None:
+            off = self._rows("off", on)
+            if len(off): rows = np.setdiff1d(rows, off, assume_unique=True)
+        return RosterRows(np.asarray(rows, dtype=np.intp), self.snapshot)
+
+    def off_on(self, day: date) -> Optional[np.ndarray]:
+        rows = self._rows("off", day)
+        return self.snapshot.col_pid[rows] if len(rows) else None
+
+class SnapshotGeoGrid(GeoGrid):
+    # GeoGrid over the snapshot's cell-sorted arrays; never rebuilt
+    def __init__(self, snap: Snapshot):
+        self.cell = float(snap.meta[0])
+        self.width = int(math.ceil(360.0 / self.cell)) + 2
+        self._arrays = (snap.geo_codes, snap.geo_ids, snap.geo_lat, snap.geo_lon)
+        self._lock = threading.Lock()
+
+    def add(self, p: Pandit): raise TypeError("snapshot geo grid is read-only")
+    def remove(self, pid: int): raise TypeError("snapshot geo grid is read-only")
+
+class SnapshotPandits:
+    # the roster as a sequence; records are decoded on access
+    def __init__(self, snap: Snapshot):
+        self.snapshot = snap
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __getitem__(self, i: int) -> Pandit:
+        if not -len(self) <= i < len(self): raise IndexError(i)
+        return self.snapshot.pandit(i % len(self))
+
+    def __iter__(self):
+        return (self.snapshot.pandit(i) for i in range(len(self)))
+
+class SnapshotRoster:
+    # a core.Roster generation ranked straight off one mapped snapshot; nothing is parsed per record
+    __slots__ = ("pandits", "index", "store", "geo", "snapshot")
+    read_only = True
+
+    def __init__(self, snap: Snapshot):
+        self.snapshot, self.pandits = snap, SnapshotPandits(snap)
+        self.store = SnapshotStore(snap)
+        self.index, self.geo = SnapshotIndex(snap, self.store.row_of), SnapshotGeoGrid(snap)
+
+    def cities(self) -> set:
+        return {self.snapshot.string(c) for c in np.unique(self.snapshot.records["city"]).tolist()}
+
+# ---------- Load + hot reload ----------
+def snapshot_path(src: str) -> str:
+    return ROSTER_SNAPSHOT or f"{src}.snap"
+
+def _signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def load_snapshot(src: str = ROSTER_FILE, snap: Optional[str] = None) -> Snapshot:
+    # the snapshot compiled from this exact version of the file, compiling it first if needed
+    snap = snap or snapshot_path(src)
+    sig = _signature(src)
+    try:
+        s = Snapshot.open(snap)
+        if s.source == sig: return s
+    except (OSError, ValueError, struct.error):
+        pass
+    compile_snapshot(read_roster_file(src), snap, sig)
+    return Snapshot.open(snap)
+
+def open_roster(src: str = ROSTER_FILE, snap: Optional[str] = None):
+    # the roster in src, ranked off its snapshot; if the snapshot can't be written (read-only install dir,
+    # ROSTER_SNAPSHOT somewhere unwritable) the records are parsed into an in-memory core.Roster instead
+    try:
+        return SnapshotRoster(load_snapshot(src, snap))
+    except OSError:
+        if not os.path.exists(src): raise
+        return core.Roster(read_roster_file(src))
+
+def load_default_roster(src: str = ROSTER_FILE):
+    # install src once, without watching it (scripts, tests, batch jobs); start() also keeps it fresh
+    r = open_roster(src)
+    core.install_roster(r)
+    return r
+
+class RosterReloader:
+    def __init__(self, src: str = ROSTER_FILE, snap: Optional[str] = None, poll_s: float = ROSTER_POLL_S):
+        self.src, self.snap, self.poll_s = src, snap, poll_s
+        self.signature: Optional[Tuple[int, int]] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        # reload if the file changed since the last attempt; a bad file keeps the current roster until it changes again
+        try:
+            sig = _signature(self.src)
+            if sig == self.signature: return False
+            self.signature = sig
+            core.install_roster(open_roster(self.src, self.snap))
+        except Exception as e:
+            self.last_error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            ROSTER_RELOADS.inc("error")
+            return False
+        self.last_error = None
+        ROSTER_RELOADS.inc("ok")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_s): self.check()
+
+    def start(self) -> "RosterReloader":
+        if self.poll_s > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="roster-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+_reloader: Optional[RosterReloader] = None
+_reloader_lock = threading.Lock()
+
+def start(src: str = ROSTER_FILE) -> Optional[RosterReloader]:
+    # load ROSTER_FILE now and keep watching it; no-op when there is no file. Idempotent.
+    global _reloader
+    if not src or not os.path.exists(src): return None
+    with _reloader_lock:
+        if _reloader is None:
+            _reloader = RosterReloader(src)
+            if not _reloader.check(): raise ValueError(f"cannot load roster {src}: {_reloader.last_error}")
+            _reloader.start()
+        return _reloader
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Roster file tools.")
+    ap.add_argument("command", choices=["export", "compile"])
+    ap.add_argument("path", help="roster file (.csv or .jsonl)")
+    ap.add_argument("--snapshot", help="snapshot path (default <path>.snap)")
+    args = ap.parse_args(argv)
+    if args.command == "export":
+        pandits = read_roster_file(ROSTER_FILE)
+        write_roster_file(pandits, args.path)
+        print(f"wrote {len(pandits)} pandits from {ROSTER_FILE} to {args.path}", file=sys.stderr)
+    else:
+        snap = args.snapshot or snapshot_path(args.path)
+        compile_snapshot(read_roster_file(args.path), snap, _signature(args.path))
+        print(f"compiled {len(Snapshot.open(snap))} pandits to {snap} ({os.path.getsize(snap)} bytes)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
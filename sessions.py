@@ -0,0 +1,83 @@
+from __future__ import annotations
+# === Search sessions — result sets kept server-side, the UI only carries an opaque token ===
+# Each search stores the request it ranked and the pandits it offered under a random token; gr.State holds
+# just that token, so events don't ship the result set back and forth as JSON. Confirming a booking is a
+# dict lookup on the token and then on the pandit id: unknown/expired tokens and ids that weren't offered
+# are rejected. Entries expire after SESSION_TTL_S and the oldest are evicted beyond SESSION_MAX.
+
+from typing import Dict, List, Optional, Tuple, Any
+from collections import OrderedDict
+from datetime import date
+import os, time, secrets, threading
+
+import core, metrics
+from core import Pandit, PujaRequest
+
+SESSION_TTL_S = float(os.environ.get("SESSION_TTL_S", "1800"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))  # ~1 KB each: the request plus references into the roster
+
+class SearchSession:
+    __slots__ = ("puja_type", "when_date", "time_window", "options", "slots", "roster_version", "expires")
+
+    def __init__(self, req: PujaRequest, pandits: List[Pandit], expires: float,
+                 slots: Optional[Dict[int, List[Tuple[date, str]]]] = None):
+        self.puja_type, self.when_date, self.time_window = req.puja_type, req.when_date, req.time_window
+        self.options: Dict[int, Pandit] = {p.id: p for p in pandits}  # what the dropdown offered, by id
+        self.slots = {pid: s[0] for pid, s in (slots or {}).items() if s}  # date-range search: earliest open slot
+        self.roster_version, self.expires = core.ROSTER_VERSION, expires
+
+    def slot_for(self, p: Pandit) -> Tuple[Optional[date], Optional[str]]:
+        # (date, window) a booking with this pandit is for
+        return self.slots.get(p.id, (self.when_date, self.time_window))
+
+    def pick(self, selected_id: Any) -> Optional[Pandit]:
+        # the offered pandit for a dropdown value; None if it wasn't offered or has left the roster since
+        try: p = self.options.get(int(str(selected_id).strip()))
+        except ValueError: return None
+        if p is None: return None
+        if self.roster_version != core.ROSTER_VERSION and p.id not in core.ROSTER.store.row_of: return None
+        return p
+
+class SessionStore:
+    def __init__(self, ttl_s: float = SESSION_TTL_S, maxsize: int = SESSION_MAX):
+        self.ttl_s, self.maxsize = ttl_s, maxsize
+        self._data: OrderedDict = OrderedDict()  # token -> SearchSession, oldest first (one TTL, so also soonest to expire)
+        self._lock = threading.Lock()
+        self.created = self.expired = self.evicted = 0
+
+    def create(self, req: PujaRequest, pandits: List[Pandit],
+               slots: Optional[Dict[int, List[Tuple[date, str]]]] = None) -> str:
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._data[token] = SearchSession(req, pandits, now + self.ttl_s, slots)
+            self.created += 1
+            self._expire(now)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False); self.evicted += 1
+        return token
+
+    def get(self, token: Optional[str]) -> Optional[SearchSession]:
+        if not token or not isinstance(token, str): return None
+        now = time.monotonic()
+        with self._lock:
+            s = self._data.get(token)
+            if s is not None and s.expires <= now:
+                del self._data[token]; self.expired += 1
+                return None
+            return s
+
+    def _expire(self, now: float):
+        while self._data:
+            token, s = next(iter(self._data.items()))
+            if s.expires > now: break
+            del self._data[token]; self.expired += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"live": len(self._data), "created": self.created, "expired": self.expired, "evicted": self.evicted}
+
+SESSIONS = SessionStore()
+metrics.GaugeFn("pandit_search_sessions", "Search sessions held server-side.", lambda: {(): len(SESSIONS._data)})
+metrics.GaugeFn("pandit_search_sessions_dropped_total", "Search sessions dropped before use, by reason.",
+                lambda: {("expired",): SESSIONS.expired, ("evicted",): SESSIONS.evicted}, ("reason",), kind="counter")
@@ -0,0 +1,160 @@
+from __future__ import annotations
+# === Shared roster generations for multi-worker deployments ===
+# Instead of every worker process compiling and mapping its own snapshot, the roster is compiled once per change
+# into a rank-ready snapshot (roster.py format: records + store columns + posting lists + geo arrays) under
+# SHARED_ROSTER_DIR, and a CURRENT file names the live generation. Workers mmap that file and rank straight off
+# its pages (roster.SnapshotRoster), so the OS page cache holds one copy for all of them and per-worker RSS
+# stays nearly flat as workers are added. Pandit records are decoded only for the rows a search returns.
+# Workers poll CURRENT and swap generations with core.install_roster(); in-flight searches finish on the
+# generation they started with, whose mapping stays valid even after its file is pruned.
+# Whichever worker first sees ROSTER_FILE change compiles the next generation (under a file lock).
+# Usage: python shared_roster.py publish data/pandits.csv    (or just start the app with SHARED_ROSTER_DIR set)
+
+from typing import List, Optional, Tuple
+from contextlib import contextmanager
+import os, sys, fcntl, struct, argparse, threading
+
+import core, metrics, roster
+from core import Pandit
+from roster import Snapshot, SnapshotRoster
+
+SHARED_ROSTER_DIR = os.environ.get("SHARED_ROSTER_DIR", "")  # e.g. /dev/shm/pandit-roster; empty = per-process rosters
+SHARED_ROSTER_POLL_S = float(os.environ.get("SHARED_ROSTER_POLL_S", "2"))
+SHARED_ROSTER_KEEP = int(os.environ.get("SHARED_ROSTER_KEEP", "3"))  # generation files kept on disk
+
+metrics.GaugeFn("pandit_shared_roster_generation", "Shared roster generation this worker ranks from (0 = none).",
+                lambda: {(): _follower.generation if _follower else 0})
+
+# ---------- Generations ----------
+def _current_path(d: str) -> str:
+    return os.path.join(d, "CURRENT")
+
+def current(d: str = SHARED_ROSTER_DIR) -> Optional[str]:
+    # file name of the live generation, or None before the first publish
+    try:
+        with open(_current_path(d), encoding="utf-8") as f: return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+@contextmanager
+def _publish_lock(d: str):
+    with open(os.path.join(d, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try: yield
+        finally: fcntl.flock(f, fcntl.LOCK_UN)
+
+def publish(pandits: List[Pandit], d: str = SHARED_ROSTER_DIR, source: Tuple[int, int] = (0, 0)) -> str:
+    # compile the next generation, then point CURRENT at it (both written by rename, so readers never see
+    # half a file); older generations beyond SHARED_ROSTER_KEEP are unlinked (mapped ones stay readable)
+    os.makedirs(d, exist_ok=True)
+    with _publish_lock(d): return _publish(pandits, d, source)
+
+def _generation(name: str) -> int:
+    return int(name[len("gen-"):-len(".snap")])
+
+def _publish(pandits: List[Pandit], d: str, source: Tuple[int, int]) -> str:
+    # caller holds the publish lock
+    cur = current(d)
+    name = f"gen-{_generation(cur) + 1 if cur else 1:08d}.snap"
+    roster.compile_snapshot(pandits, os.path.join(d, name), source)
+    tmp = f"{_current_path(d)}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(name + "\n")
+    os.replace(tmp, _current_path(d))
+    for old in sorted(f for f in os.listdir(d) if f.startswith("gen-") and f.endswith(".snap"))[:-SHARED_ROSTER_KEEP]:
+        os.unlink(os.path.join(d, old))
+    return name
+
+def publish_if_stale(src: str, d: str = SHARED_ROSTER_DIR) -> bool:
+    # publish src unless the live generation was already compiled from this version of it
+    sig = roster._signature(src)
+    with _publish_lock(d):
+        cur = current(d)
+        if cur:
+            try:
+                if Snapshot.open(os.path.join(d, cur)).source == sig: return False
+            except (OSError, ValueError, struct.error):
+                pass
+        _publish(roster.read_roster_file(src), d, sig)
+        return True
+
+def attach(d: str = SHARED_ROSTER_DIR) -> Optional[SnapshotRoster]:
+    name = current(d)
+    return SnapshotRoster(Snapshot.open(os.path.join(d, name))) if name else None
+
+class SharedRosterFollower:
+    # keeps this worker on the live generation; also publishes a new one when ROSTER_FILE changes
+    def __init__(self, d: str = SHARED_ROSTER_DIR, src: str = roster.ROSTER_FILE, poll_s: float = SHARED_ROSTER_POLL_S):
+        self.dir, self.src, self.poll_s = d, src, poll_s
+        self.name: Optional[str] = None
+        self.generation = 0
+        self.source: Optional[Tuple[int, int]] = None  # file version the live generation was built from
+        self.failed: Optional[Tuple[int, int]] = None  # file version that didn't compile; not retried
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        try:
+            if self.src and os.path.exists(self.src):
+                sig = roster._signature(self.src)
+                if sig != self.source and sig != self.failed:
+                    try: publish_if_stale(self.src, self.dir)
+                    except ValueError: self.failed = sig; raise
+            name = current(self.dir)
+            if name is None or name == self.name: return False
+            new = SnapshotRoster(Snapshot.open(os.path.join(self.dir, name)))
+            core.install_roster(new)
+        except Exception as e:
+            self.last_error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            roster.ROSTER_RELOADS.inc("error")
+            return False
+        self.name, self.source, self.last_error = name, new.snapshot.source, None
+        self.generation = _generation(name)
+        roster.ROSTER_RELOADS.inc("ok")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_s): self.check()
+
+    def start(self) -> "SharedRosterFollower":
+        if self.poll_s > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shared-roster", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+_follower: Optional[SharedRosterFollower] = None
+_follower_lock = threading.Lock()
+
+def start(d: str = SHARED_ROSTER_DIR) -> Optional[SharedRosterFollower]:
+    # attach this worker to the shared roster when SHARED_ROSTER_DIR is set (publishing the first generation
+    # from ROSTER_FILE if nobody has yet); None when the mode is off. Idempotent.
+    global _follower
+    if not d: return None
+    with _follower_lock:
+        if _follower is None:
+            os.makedirs(d, exist_ok=True)
+            f = SharedRosterFollower(d)
+            if not f.check() and f.name is None:
+                raise ValueError(f"no shared roster in {d}: {f.last_error or 'nothing published and no ROSTER_FILE'}")
+            _follower = f.start()
+        return _follower
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Publish shared roster generations.")
+    ap.add_argument("command", choices=["publish", "status"])
+    ap.add_argument("path", nargs="?", default=roster.ROSTER_FILE, help="roster file (.csv or .jsonl)")
+    ap.add_argument("--dir", default=SHARED_ROSTER_DIR or None, required=not SHARED_ROSTER_DIR)
+    args = ap.parse_args(argv)
+    if args.command == "publish":
+        name = publish(roster.read_roster_file(args.path), args.dir, roster._signature(args.path))
+        print(f"published {name} in {args.dir}", file=sys.stderr)
+    else:
+        name = current(args.dir)
+        snap = Snapshot.open(os.path.join(args.dir, name)) if name else None
+        print(f"{args.dir}: {name or 'nothing published'}" + (f", {len(snap)} pandits" if snap else ""))
+
+if __name__ == "__main__":
+    main()
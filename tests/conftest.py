@@ -0,0 +1,8 @@
+import pytest
+
+import roster
+
+@pytest.fixture(autouse=True, scope="session")
+def bundled_roster():
+    # importing core loads no roster; tests search the bundled data/pandits.csv
+    return roster.load_default_roster()
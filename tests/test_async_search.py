@@ -0,0 +1,21 @@
+import asyncio, threading
+
+import app, llm
+
+def test_search_work_runs_off_the_event_loop(monkeypatch):
+    threads = {}
+    search_response, gate = app._search_response, llm._tiered_gate
+    def recording(name, fn):
+        def wrapper(*a, **kw):
+            threads[name] = threading.get_ident()
+            return fn(*a, **kw)
+        return wrapper
+    monkeypatch.setattr(app, "_search_response", recording("search", search_response))
+    monkeypatch.setattr(llm, "_tiered_gate", recording("gate", gate))
+    monkeypatch.setattr(llm, "EXTRACT_MODE", "tiered")
+    async def search():
+        threads["loop"] = threading.get_ident()
+        return await app.perform_search_async("Satyanarayan Katha in Howrah tomorrow evening, budget 900")
+    out = asyncio.run(search())
+    assert out[0]
+    assert threads["search"] != threads["loop"] and threads["gate"] != threads["loop"]
@@ -0,0 +1,33 @@
+from dataclasses import asdict
+
+import pytest
+
+import batch, core
+
+QUERIES = [
+    "Satyanarayan Katha in Howrah next Monday evening, budget 900",
+    core.PujaRequest(puja_type="Griha Pravesh", time_window="morning", city="Kolkata"),
+    {"puja_type": "Griha Pravesh"},  # not a query: comes back as an error, the rest still run
+    "Lakshmi Puja in Siliguri",  # no time window
+    "Durga Puja in Durgapur any weekend evening",
+    "Rudrabhishek Kolkata tomorrow night",
+    "Vastu Shanti kal subah Salt Lake",
+]
+
+@pytest.fixture(scope="module")
+def expected():
+    return [asdict(batch.search_one(q)) for q in QUERIES]
+
+def test_statuses_cover_errors(expected):
+    statuses = [r["status"] for r in expected]
+    assert statuses[2] == "error" and "AttributeError" in expected[2]["error"]
+    assert statuses[3] == "needs_time_window" and "ok" in statuses
+
+@pytest.mark.parametrize("executor", ["process", "thread", "inline"])
+@pytest.mark.parametrize("chunk_size, workers", [(1, 2), (2, 3), (1, 16)])  # (1, 16): fewer items than workers
+def test_results_keep_input_order(expected, executor, chunk_size, workers):
+    got = batch.search_batch(QUERIES, executor=executor, workers=workers, chunk_size=chunk_size)
+    assert [asdict(r) for r in got] == expected
+
+def test_empty_batch():
+    assert batch.search_batch([], executor="process") == []
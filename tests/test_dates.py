@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import core
+from core import IST, parse_date, parse_date_range
+
+def today():
+    return datetime.now(IST).date()
+
+# Hinglish locatives: "<city> mai ..." means "in <city>", never May
+@pytest.mark.parametrize("text, days", [
+    ("Satyanarayan Katha Howrah mai 6 baje kal", 1),
+    ("Kolkata mai parso shaam", 2),
+    ("Durgapur mai 3 din baad", 3),
+    ("Howrah mai aaj 7 baje", 0),
+])
+def test_locative_mai_with_relative_day(text, days):
+    assert parse_date(text) == today() + timedelta(days=days)
+
+@pytest.mark.parametrize("text", ["Howrah mai 9:30 am", "Siliguri mai 6 baje", "Howrah may 6 baje"])
+def test_locative_with_clock_time_is_not_a_date(text):
+    assert parse_date(text) is None
+
+def test_mai_is_not_a_month_alias():
+    assert "mai" not in core.MONTH_IDX
+
+@pytest.mark.parametrize("text, month, day", [("Griha pravesh 15 may", 5, 15), ("may 20 ko havan", 5, 20),
+                                              ("3rd of march", 3, 3)])
+def test_month_names_still_parse(text, month, day):
+    d = parse_date(text)
+    assert (d.month, d.day) == (month, day)
+
+def test_hindi_day_word_wins_over_month_day():
+    assert parse_date("kal 15 march") == today() + timedelta(days=1)
+
+@pytest.mark.parametrize("text", ["is week we are busy", "is month pls", "this is month end stuff"])
+def test_english_is_does_not_start_a_range(text):
+    assert parse_date_range(text) is None
+
+@pytest.mark.parametrize("text", ["is hafte koi bhi din", "is mahine kabhi bhi", "this week"])
+def test_this_period_ranges(text):
+    assert parse_date_range(text) is not None
+
+# ---------- date ranges at month and year boundaries ----------
+def frozen_today(monkeypatch, day):
+    class Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None): return cls(day.year, day.month, day.day, 10, 0, tzinfo=tz)
+    monkeypatch.setattr(core, "datetime", Frozen)
+
+@pytest.mark.parametrize("today_, text, expected", [
+    (date(2025, 12, 29), "any evening next week", (date(2026, 1, 5), date(2026, 1, 11), None)),
+    (date(2025, 12, 29), "any day this month", (date(2025, 12, 29), date(2025, 12, 31), None)),
+    (date(2025, 12, 29), "any morning next month", (date(2026, 1, 1), date(2026, 1, 31), None)),
+    (date(2025, 12, 29), "20 to 25 january", (date(2026, 1, 20), date(2026, 1, 25), None)),
+    (date(2025, 12, 29), "any day in january", (date(2026, 1, 1), date(2026, 1, 31), None)),
+    (date(2025, 12, 29), "any weekend", (date(2025, 12, 29), date(2026, 1, 25), ["Sat", "Sun"])),
+    (date(2025, 1, 30), "next 5 days", (date(2025, 1, 30), date(2025, 2, 3), None)),
+    (date(2025, 1, 30), "any day this week", (date(2025, 1, 30), date(2025, 2, 2), None)),
+    (date(2025, 1, 31), "next month", (date(2025, 2, 1), date(2025, 2, 28), None)),
+    (date(2024, 1, 31), "agle mahine kabhi bhi", (date(2024, 2, 1), date(2024, 2, 29), None)),
+    (date(2025, 3, 10), "any weekday in february", (date(2026, 2, 1), date(2026, 2, 28), ["Mon", "Tue", "Wed", "Thu", "Fri"])),
+])
+def test_ranges_cross_month_and_year_ends(monkeypatch, today_, text, expected):
+    frozen_today(monkeypatch, today_)
+    assert parse_date_range(text) == expected
+
+def test_range_replaces_the_single_date(monkeypatch):
+    frozen_today(monkeypatch, date(2025, 12, 29))
+    req = core.PujaRequest(when_date=date(2025, 12, 30))
+    assert core.attach_date_range(req, "Satyanarayan Katha any weekend in january")
+    assert (req.when_date, req.date_from, req.date_to, req.weekdays) == (None, date(2026, 1, 1), date(2026, 1, 31), ["Sat", "Sun"])
+    assert not core.attach_date_range(core.PujaRequest(), "Satyanarayan Katha kal subah")
@@ -0,0 +1,22 @@
+import pytest
+
+import core
+
+def test_gaps_are_the_text_between_hits():
+    hits = core.scan_entities("Durga Puja in Kolkata tomorrow evening budget 700")
+    assert hits["puja"] == ["Durga Puja"] and hits["city"] == ["Kolkata"]
+    assert hits.gaps == ["in", "tomorrow", "budget 700"]
+
+# a named puja is not fuzzed into a city ("Saraswati" ~ Barasat, "Durga" ~ Durgapur)
+@pytest.mark.parametrize("text", ["Saraswati Puja in kal budget 800", "Durga Puja at near my home"])
+def test_puja_name_is_not_a_city(text):
+    assert core.detect_city(text) is None
+
+@pytest.mark.parametrize("text, city", [("Saraswati Puja at howra shaam", "Howrah"),
+                                        ("Durga Puja mai kolkatta kal", "Kolkata")])
+def test_misspelt_city_next_to_a_puja(text, city):
+    assert core.detect_city(text) == city
+
+def test_verbatim_puja_skips_scoring():
+    assert core.fuzzy_puja(core.scan_entities("Ganesh Puja at home")) == ("Ganesh Puja", 0.95)
+    assert core.rule_based_extract("satyanarayan kata tomorrow")[0].puja_type == "Satyanarayan Katha"
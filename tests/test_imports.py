@@ -0,0 +1,28 @@
+import json, os, subprocess, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["gradio", "openai", "dateparser"]
+
+PROBE = """
+import sys, json
+import {mods}
+app = sys.modules.get("app")
+print(json.dumps({{"heavy": [m for m in {heavy!r} if m in sys.modules], "ui_built": app is not None and "demo" in vars(app),
+                   "roster_loaded": sys.modules["core"].ROSTER_VERSION != 0}}))
+"""
+
+def probe(mods):
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}  # importing must not need the key
+    out = subprocess.run([sys.executable, "-c", PROBE.format(mods=mods, heavy=HEAVY)], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("mods", ["core", "llm", "core, llm, audio, metrics, batch, roster, shared_roster, reservations, sessions"])
+def test_headless_modules_import_nothing_heavy(mods):
+    assert probe(mods) == {"heavy": [], "ui_built": False, "roster_loaded": False}
+
+def test_app_imports_gradio_only_and_builds_no_ui():
+    assert probe("app") == {"heavy": ["gradio"], "ui_built": False, "roster_loaded": False}
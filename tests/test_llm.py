@@ -0,0 +1,187 @@
+import asyncio, json, math, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+
+def test_schema_answer_parses():
+    answer = {"puja_type": "Griha Pravesh", "when_date": None, "time_window": "morning",
+              "time_specific_mins": None, "city": "howrah", "budget_inr": 800}
+    assert set(answer) == set(llm.LLM_RESPONSE_FORMAT["json_schema"]["schema"]["properties"])
+    req, conf = llm._llm_parse(json.dumps(answer), "griha pravesh howrah morning budget 800")
+    assert (req.puja_type, req.city, req.time_window, req.budget_inr) == ("Griha Pravesh", "Howrah", "morning", 800)
+    assert conf == {} and req.notes is None
+
+def test_off_catalog_puja_is_remapped():
+    req, conf = llm._llm_parse(json.dumps({"puja_type": "Satyanarayan Pooja", "city": None}), "satyanarayan pooja")
+    assert req.puja_type == "Satyanarayan Katha" and 0 < conf["puja_type"] <= 1
+
+# ---------- extraction cache ----------
+class FakeClock:
+    def __init__(self, t=1000.0): self.t = t
+    def __call__(self): return self.t
+
+class CountingClient:
+    # chat completions stub: counts calls and, with `gate` set, holds every call until the gate opens
+    def __init__(self, answer=None, gate=None):
+        self.calls, self.gate = 0, gate
+        body = json.dumps(answer or {"puja_type": "Griha Pravesh", "city": "Howrah", "time_window": "morning"})
+        def create(**kw):
+            self.calls += 1
+            if self.gate is not None: assert self.gate.wait(5)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=body))])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+def counting_loader(calls):
+    def load(text):
+        calls.append(text)
+        return text.upper()
+    return load
+
+def test_cache_evicts_least_recently_used():
+    calls, cache = [], llm.ExtractionCache(maxsize=2, clock=FakeClock(), today=lambda: date(2025, 11, 20))
+    load = counting_loader(calls)
+    for text in ("a", "b", "a", "c", "a", "b"): cache.get_or_load(text, load)
+    assert calls == ["a", "b", "c", "b"]  # "a" was used after "b", so "c" pushed "b" out
+    assert cache.stats()["size"] == 2
+
+def test_cache_entries_expire_after_ttl_and_at_ist_midnight():
+    clock, day = FakeClock(), [date(2025, 11, 20)]
+    calls, cache = [], llm.ExtractionCache(ttl_s=900, clock=clock, today=lambda: day[0])
+    load = counting_loader(calls)
+    cache.get_or_load("kal subah", load)
+    clock.t += 899; cache.get_or_load("kal subah", load)
+    clock.t += 2; cache.get_or_load("kal subah", load)
+    assert len(calls) == 2
+    clock.t += 60; day[0] = date(2025, 11, 21)  # 00:00 IST: "kal" now means another date
+    cache.get_or_load("kal subah", load)
+    assert len(calls) == 3 and cache.stats()["size"] == 1
+
+def test_concurrent_identical_misses_make_one_llm_call(monkeypatch):
+    gate = threading.Event()
+    client, cache = CountingClient(gate=gate), llm.ExtractionCache(clock=FakeClock(), today=lambda: date(2025, 11, 20))
+    monkeypatch.setattr(llm, "LLM_CACHE", cache)
+    monkeypatch.setattr(llm, "ADMISSION", llm.AdmissionController())
+    llm.set_openai_clients(client)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(llm.llm_extract, "griha pravesh howrah morning") for _ in range(8)]
+            while cache.stats()["shared_inflight"] < 7: time.sleep(0.001)
+            gate.set()
+            results = [f.result() for f in futures]
+    finally:
+        llm.set_openai_clients(None)
+    assert client.calls == 1 and not any("degraded" in conf for _, conf in results)
+    assert {(r.puja_type, r.city, r.time_window) for r, _ in results} == {("Griha Pravesh", "Howrah", "morning")}
+    assert len({id(r) for r, _ in results}) == 8  # each caller still gets a private copy
+
+def test_concurrent_identical_async_misses_share_one_load():
+    calls, cache = [], llm.ExtractionCache(clock=FakeClock(), today=lambda: date(2025, 11, 20))
+    async def run():
+        release = asyncio.Event()
+        async def load(text):
+            calls.append(text)
+            await release.wait()
+            return text
+        tasks = [asyncio.create_task(cache.aget_or_load("same", load)) for _ in range(8)]
+        while cache.stats()["shared_inflight"] < 7: await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+    assert asyncio.run(run()) == ["same"] * 8 and calls == ["same"]
+
+# ---------- admission control ----------
+def controller(clock=None, **kw):
+    ctrl = llm.AdmissionController(clock=clock or FakeClock(), **kw)
+    ctrl._rng = SimpleNamespace(random=lambda: 0.0)  # the throttle admits anything inside admit_fraction
+    return ctrl
+
+def shed_reason(ctrl):
+    with pytest.raises(llm.LLMShed) as e: ctrl.admit()
+    return e.value.args[0]
+
+def test_token_bucket_sheds_then_refills():
+    clock = FakeClock()
+    ctrl = controller(rate_per_s=2, burst=2, max_inflight=100, clock=clock)
+    for _ in range(2): ctrl.admit(); ctrl.release(0.1, True)
+    assert shed_reason(ctrl) == "rate" and ctrl.shed["rate"] == 1
+    assert ctrl.admit_fraction == 0.5  # shedding is saturation too
+    clock.t += 0.5  # one token back
+    ctrl.admit(); ctrl.release(0.1, True)
+
+def test_inflight_cap_sheds_until_a_call_finishes():
+    ctrl = controller(burst=100, max_inflight=2)
+    ctrl.admit(); ctrl.admit()
+    assert shed_reason(ctrl) == "queue"
+    ctrl.release(0.1, True)
+    ctrl.admit()
+
+def test_p95_latency_limit_sheds_until_slow_calls_age_out():
+    clock = FakeClock()
+    ctrl = controller(burst=100, p95_limit_s=1.0, window_s=30, clock=clock)
+    for _ in range(ctrl.P95_MIN_SAMPLES): ctrl.admit(); ctrl.release(3.0, True)
+    assert shed_reason(ctrl) == "latency"
+    clock.t += 31
+    ctrl.admit()
+
+class RateLimitError(Exception):
+    status_code = 429
+
+@pytest.mark.parametrize("error", [RateLimitError(), TimeoutError(), asyncio.TimeoutError()])
+def test_saturation_halves_admission_at_most_once_a_second(error):
+    clock = FakeClock()
+    ctrl = controller(burst=100, clock=clock)
+    def saturated_call():
+        with pytest.raises(type(error)):
+            with ctrl.call(): raise error
+    saturated_call()
+    assert ctrl.admit_fraction == 0.5
+    saturated_call()
+    assert ctrl.admit_fraction == 0.5  # same second
+    clock.t += 1; saturated_call()
+    assert ctrl.admit_fraction == 0.25
+
+def test_plain_errors_and_slow_calls_neither_cut_nor_recover():
+    clock = FakeClock()
+    ctrl = controller(burst=100, p95_limit_s=1.0, clock=clock)
+    ctrl._cut(clock()); clock.t += 1
+    with pytest.raises(ValueError):
+        with ctrl.call(): raise ValueError("bad answer")
+    ctrl.admit(); ctrl.release(2.0, True)
+    assert ctrl.admit_fraction == 0.5
+
+def test_admission_recovers_additively_to_one():
+    clock = FakeClock()
+    ctrl = controller(burst=1000, clock=clock)
+    for _ in range(3): ctrl._cut(clock()); clock.t += 1
+    assert ctrl.admit_fraction == 0.125
+    steps = 0
+    while ctrl.admit_fraction < 1.0:
+        ctrl.admit(); ctrl.release(0.1, True); steps += 1
+        assert steps <= 100
+    assert steps == math.ceil((1.0 - 0.125) / llm.LLM_ADMIT_STEP - 1e-9) and ctrl.admit_fraction == 1.0
+    ctrl.admit(); ctrl.release(0.1, True)
+    assert ctrl.admit_fraction == 1.0
+
+def test_throttled_requests_are_shed_by_fraction():
+    ctrl = controller(burst=100)
+    ctrl.admit_fraction, ctrl._rng = 0.5, SimpleNamespace(random=lambda: 0.7)
+    assert shed_reason(ctrl) == "throttled"
+    assert ctrl.admit_fraction == 0.5  # throttling alone doesn't cut further
+
+def test_shed_request_is_answered_by_rules(monkeypatch):
+    text = "Griha Pravesh in Howrah tomorrow morning, budget 800"
+    client = CountingClient()
+    monkeypatch.setattr(llm, "LLM_CACHE", llm.ExtractionCache())
+    monkeypatch.setattr(llm, "ADMISSION", controller(max_inflight=0))
+    llm.set_openai_clients(client, client)
+    try:
+        req, conf = llm.llm_extract(text)
+        areq, aconf = asyncio.run(llm.llm_extract_async(text))
+    finally:
+        llm.set_openai_clients(None)
+    rules, _ = llm.rule_based_extract(text)
+    assert client.calls == 0 and conf["degraded"] == aconf["degraded"] == "shed"
+    assert req == areq == rules
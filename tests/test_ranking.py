@@ -0,0 +1,223 @@
+import math, random
+from datetime import date, timedelta
+
+import numpy as np
+
+import core
+
+# ---------- baseline reference (the original linear scan in app.perform_search) ----------
+def scan(pandits, puja_type=None, window=None, weekday=None, on=None):
+    return [p for p in pandits
+            if not (puja_type and puja_type not in p.specializations)
+            and not (window and not any(w[0] == window for w in p.time_windows))
+            and not (weekday and weekday not in p.days)
+            and not (on is not None and on in p.off_dates)]
+
+def baseline_haversine_km(a, b):
+    if a not in core.CITY_COORDS or b not in core.CITY_COORDS: return 9999.0
+    lat1, lon1 = core.CITY_COORDS[a]; lat2, lon2 = core.CITY_COORDS[b]
+    r=6371.0
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2-lat1); dl = math.radians(lon2-lon1)
+    h = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
+    return 2*r*math.asin(min(1, math.sqrt(h)))
+
+def baseline_tier(dist):
+    if dist==0: return 0
+    if dist<=30: return 1
+    if dist<=80: return 2
+    return 3
+
+def random_filters(rng, days):
+    pick = lambda xs: rng.choice(xs) if rng.random() < 0.8 else None
+    return (pick(core.SPEC_BOOK.names), pick(core.WINDOW_LABELS), pick(core.WEEKDAY_TOKEN),
+            rng.choice(days) if rng.random() < 0.5 else None)
+
+def assert_index_matches_scan(roster, rng, days, n):
+    for _ in range(n):
+        puja, window, weekday, on = random_filters(rng, days)
+        got = roster.index.candidates(puja, window, weekday, on=on)
+        assert [p.id for p in got] == [p.id for p in scan(roster.pandits, puja, window, weekday, on)], (puja, window, weekday, on)
+
+def test_index_matches_linear_scan():
+    assert_index_matches_scan(core.ROSTER, random.Random(1), [date(2025, 1, 6)], 1500)
+
+def test_edits_on_the_snapshot_keep_the_index_exact():
+    live, rng = core.ROSTER, random.Random(2)
+    days = [date(2025, 3, 1) + timedelta(days=i) for i in range(10)]
+    try:
+        assert live.read_only
+        for pid in rng.sample([p.id for p in live.pandits], 15): core.remove_pandit(pid)
+        assert not core.ROSTER.read_only and len(core.PANDITS) == len(live.pandits) - 15
+        for i, p in enumerate(rng.sample(list(core.PANDITS), 20)):  # replace some, add some new ids
+            v = list(p._values())
+            if i % 2: v[0] = 10_000 + i
+            v[3], v[14] = p.base_fee + 50, tuple(rng.sample(days, 2))
+            core.add_pandit(core.Pandit(*v))
+        assert len({p.id for p in core.PANDITS}) == len(core.PANDITS)
+        assert_index_matches_scan(core.ROSTER, rng, days, 1500)
+        req, _ = core.rule_based_extract("Satyanarayan Katha in Kolkata on 3 March 2025 morning")
+        ranked = core.rank_candidates(req, k=None)
+        assert {p.id for p, *_ in ranked} == {p.id for p in scan(core.PANDITS, req.puja_type, req.time_window,
+                                                                   core.WEEKDAY_TOKEN[req.when_date.weekday()], req.when_date)}
+    finally:
+        core.install_roster(live)
+
+def baseline_rank(pandits, req, k):
+    # the original filter loop and full sort on _key, cut to k
+    def tdist_of(p):
+        if not req.time_window or req.time_specific_mins is None: return 0
+        w = next((w for w in p.time_windows if w[0] == req.time_window), None)
+        if not w: return 10_000
+        return abs((core._to_minutes(w[1]) + core._to_minutes(w[2]))//2 - req.time_specific_mins)
+    weekday = core.WEEKDAY_TOKEN[req.when_date.weekday()] if req.when_date else None
+    candidates = []
+    for p in scan(pandits, req.puja_type, req.time_window, weekday):
+        dist = 0.0 if p.city == req.city else baseline_haversine_km(req.city, p.city)
+        tier = 0 if p.city == req.city else baseline_tier(dist)
+        candidates.append((p, tier, tdist_of(p), dist))
+    def _key(t):
+        p, tier, tdist, dist = t
+        gap = abs((p.base_fee - (req.budget_inr or p.base_fee)))
+        return (tier, dist, tdist, gap, -p.rating, -p.experience_years, p.base_fee)
+    return sorted(candidates, key=_key)[:k]
+
+def tied_roster(n, rng):
+    # few distinct values per key, so most comparisons fall through to later keys or to candidate order
+    seed, cities = list(core.PANDITS), ["Kolkata", "Howrah", "Siliguri", "Atlantis"]
+    out = []
+    for pid in range(1, n+1):
+        v = list(rng.choice(seed)._values())
+        v[0], v[4], v[3], v[6], v[7] = pid, rng.choice(cities), rng.choice([500, 900]), rng.choice([4.5, 4.8]), rng.choice([10, 12])
+        v[12] = v[13] = None
+        out.append(core.Pandit(*v))
+    return out
+
+def test_ranking_matches_baseline_sort_with_ties():
+    rng = random.Random(5)
+    pandits = tied_roster(600, rng)
+    roster = core.Roster(pandits)
+    for _ in range(400):
+        req = core.PujaRequest(puja_type=rng.choice([None, *core.SPEC_BOOK.names]), time_window=rng.choice(core.WINDOW_LABELS),
+                               city=rng.choice(["Kolkata", "Howrah", "Durgapur", "Atlantis", "Mars"]),
+                               when_date=rng.choice([None, date(2025, 1, 6) + timedelta(days=rng.randrange(7))]),
+                               budget_inr=rng.choice([None, 500, 700, 900]), time_specific_mins=rng.choice([None, 540, 1110]))
+        k = rng.choice([1, 5, 12, 50, None])
+        got = [(p.id, tier, tdist, dist) for p, tier, tdist, dist in core.rank_candidates(req, k=k, roster=roster)]
+        assert got == [(p.id, tier, tdist, dist) for p, tier, tdist, dist in baseline_rank(pandits, req, k)]
+
+def test_lex_top_k_matches_stable_sort():
+    rng = np.random.default_rng(6)
+    for _ in range(3000):
+        n, ncols = int(rng.integers(0, 200)), int(rng.integers(1, 5))
+        cols = [rng.integers(0, int(rng.integers(1, 4)), n) for _ in range(ncols)]  # tiny value ranges: many ties
+        k = int(rng.integers(0, n + 2))
+        keys = [lambda i, c=c: c[i] for c in cols]
+        got = core._lex_top_k(keys, np.arange(n), k).tolist()
+        assert got == sorted(range(n), key=lambda i: tuple(c[i] for c in cols))[:k]
+
+# ---------- city distance tables ----------
+def test_city_tables_match_haversine():
+    cities = list(core.CITY_COORDS) + ["Atlantis", "Nowhere"]  # the last two have no coordinates
+    keys = np.array([core.city_key(c) for c in cities])
+    for a in cities:
+        dist, tier = core.proximity_batch(a, keys)
+        expected = [0.0 if a == b else baseline_haversine_km(a, b) for b in cities]
+        assert dist.tolist() == expected  # bit-for-bit
+        assert tier.tolist() == [0 if a == b else baseline_tier(d) for b, d in zip(cities, expected)]
+    assert (core.CITY_DIST_KM[core.UNKNOWN_CITY_ID] == core.NO_COORDS_KM).all()
+
+# ---------- geo ring prefilter ----------
+def synthetic_roster(n, rng):
+    seed = list(core.PANDITS)
+    out = []
+    for pid in range(1, n+1):
+        v = list(rng.choice(seed)._values())
+        lat, lon = core.CITY_COORDS[v[4]]
+        v[0], v[12], v[13] = pid, lat + rng.uniform(-0.4, 0.4), lon + rng.uniform(-0.4, 0.4)
+        if pid % 7 == 0: v[12] = v[13] = None  # ranked from the city centre
+        out.append(core.Pandit(*v))
+    return out
+
+def test_geo_prefilter_matches_full_ranking(tmp_path, monkeypatch):
+    import roster
+    rng = random.Random(3)
+    pandits = synthetic_roster(3000, rng)
+    src = tmp_path / "pandits.csv"
+    roster.write_roster_file(pandits, str(src))
+    rosters = [core.Roster(pandits), roster.open_roster(str(src), str(tmp_path / "pandits.snap"))]
+    cities = list(core.CITY_COORDS)
+    for _ in range(300):
+        lat, lon = core.CITY_COORDS[rng.choice(cities)]
+        req = core.PujaRequest(puja_type=rng.choice(core.SPEC_BOOK.names), time_window=rng.choice(core.WINDOW_LABELS),
+                               when_date=rng.choice([None, date(2025, 1, 6) + timedelta(days=rng.randrange(7))]),
+                               lat=lat + rng.uniform(-0.1, 0.1), lon=lon + rng.uniform(-0.1, 0.1),
+                               budget_inr=rng.choice([None, 600, 900]), time_specific_mins=rng.choice([None, 600, 1080]))
+        k = rng.choice([1, 5, 12])
+        booked = np.flatnonzero(np.random.default_rng(rng.randrange(1 << 30)).random(len(pandits) + 1) < rng.choice([0.0, 0.5, 0.9]))
+        for r in rosters:
+            monkeypatch.setattr(core, "GEO_PREFILTER_MIN", 10**9)
+            full = core.rank_candidates(req, k=k, booked=booked, roster=r)
+            monkeypatch.setattr(core, "GEO_PREFILTER_MIN", 100)
+            assert core.rank_candidates(req, k=k, booked=booked, roster=r) == full
+
+# ---------- date-range ranking ----------
+def pandit(pid, days, windows, off_dates=()):
+    hours = {"morning": ("08:00", "10:00"), "evening": ("18:00", "20:00")}
+    return core.Pandit(pid, f"Pandit {pid}", ["Satyanarayan Katha"], 900, "Kolkata", ["Bengali"], 4.5, 10, "onsite",
+                       f"+91{pid:010d}", [(w, *hours[w]) for w in windows], days, off_dates=off_dates)
+
+def brute_force_slots(p, req, booked):
+    # every (date, window) in the range the pandit works, isn't off and isn't booked, in time order
+    out = []
+    for d, w in core.range_slots(req):
+        if core.WEEKDAY_TOKEN[d.weekday()] in p.days and any(t[0] == w for t in p.time_windows) \
+                and d not in p.off_dates and p.id not in booked.get((d, w), ()):
+            out.append((d, w))
+    return out
+
+def booked_by(booked):
+    return lambda d, w: np.array(sorted(booked[(d, w)]), dtype=np.int64) if booked.get((d, w)) else None
+
+MON = date(2025, 11, 17)
+
+def test_range_returns_earliest_free_slots():
+    roster = core.Roster([
+        pandit(1, ["Mon", "Wed", "Fri"], ["morning"], off_dates=(MON,)),
+        pandit(2, ["Sat", "Sun"], ["morning", "evening"]),
+        pandit(3, ["Tue"], ["morning"], off_dates=(MON + timedelta(days=1),)),  # off on its only day
+        pandit(4, ["Mon"], ["evening"]),  # no morning window
+    ])
+    req = core.PujaRequest(puja_type="Satyanarayan Katha", time_window="morning", city="Kolkata",
+                           date_from=MON, date_to=MON + timedelta(days=6))
+    booked = {(MON + timedelta(days=5), "morning"): {2}, (MON + timedelta(days=2), "morning"): {7}}
+    ranked, slots = core.rank_date_range(req, k=None, booked=booked_by(booked), roster=roster)
+    assert sorted(p.id for p, *_ in ranked) == [1, 2]
+    assert slots == {1: [(MON + timedelta(days=2), "morning"), (MON + timedelta(days=4), "morning")],
+                     2: [(MON + timedelta(days=6), "morning")]}
+    req.weekdays = ["Sat", "Sun"]
+    ranked, slots = core.rank_date_range(req, k=None, booked=booked_by(booked), roster=roster)
+    assert slots == {2: [(MON + timedelta(days=6), "morning")]}
+
+def test_range_ranking_matches_brute_force():
+    rng = random.Random(4)
+    days = [MON + timedelta(days=i) for i in range(21)]
+    pandits = []
+    for p in core.PANDITS:
+        v = list(p._values()); v[14] = tuple(rng.sample(days, rng.randrange(4)))
+        pandits.append(core.Pandit(*v))
+    roster = core.Roster(pandits)
+    for _ in range(100):
+        start = rng.choice(days[:14])
+        req = core.PujaRequest(puja_type=rng.choice(core.SPEC_BOOK.names), city=rng.choice(list(core.CITY_COORDS)),
+                               time_window=rng.choice([None, *core.WINDOW_LABELS]), date_from=start,
+                               date_to=start + timedelta(days=rng.randrange(7)),
+                               weekdays=rng.choice([None, ["Sat", "Sun"], core.WEEKDAY_TOKEN[:5]]))
+        booked = {slot: {p.id for p in pandits if rng.random() < 0.3} for slot in core.range_slots(req)}
+        max_slots = rng.choice([1, 3])
+        ranked, slots = core.rank_date_range(req, k=None, booked=booked_by(booked), max_slots=max_slots, roster=roster)
+        matched = {p.id for p in scan(pandits, req.puja_type, req.time_window)}
+        free = {p.id: brute_force_slots(p, req, booked)[:max_slots] for p in pandits if p.id in matched}
+        expected = {pid: s for pid, s in free.items() if s}
+        assert slots == expected
+        assert sorted(p.id for p, *_ in ranked) == sorted(expected)
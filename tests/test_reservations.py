@@ -0,0 +1,51 @@
+import os, threading
+from datetime import date
+
+import pytest
+
+import core, reservations
+
+DAY = date(2025, 11, 20)
+
+def test_concurrent_reserves_of_one_slot_have_one_winner(tmp_path):
+    path = str(tmp_path / "bookings.db")
+    ledgers = [reservations.ReservationLedger(path, refresh_s=0) for _ in range(2)]  # two workers
+    start, results = threading.Barrier(16), []
+    def book(ledger):
+        start.wait()
+        results.append(ledger.reserve(7, DAY, "evening"))
+    threads = [threading.Thread(target=book, args=(ledgers[i % 2],)) for i in range(16)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sorted(results) == [False] * 15 + [True]
+    assert all(ledger.is_booked(7, DAY, "evening") for ledger in ledgers)
+
+def test_sparse_ids_keep_bitmaps_small(tmp_path):
+    ledger = reservations.ReservationLedger(str(tmp_path / "bookings.db"), refresh_s=0)
+    for pid in (10**9, 7, 2**40): assert ledger.reserve(pid, DAY, "morning")
+    assert ledger.booked_ids(DAY, "morning").tolist() == [7, 10**9, 2**40]
+    assert len(ledger._occ[(DAY.isoformat(), "morning")]) == 1
+    assert ledger.release(10**9, DAY, "morning") and not ledger.is_booked(10**9, DAY, "morning")
+    assert ledger.booked_ids(DAY, "morning").tolist() == [7, 2**40]
+    assert ledger.booked_ids(DAY, "evening") is None
+
+@pytest.mark.skipif("BOOKINGS_DB" in os.environ, reason="BOOKINGS_DB overrides the default")
+def test_default_db_sits_next_to_data():
+    assert os.path.isabs(reservations.BOOKINGS_DB)
+    assert os.path.isdir(os.path.join(os.path.dirname(reservations.BOOKINGS_DB), "data"))
+
+def test_failed_booking_releases_the_slot(tmp_path, monkeypatch):
+    import app
+    ledger = reservations.ReservationLedger(str(tmp_path / "bookings.db"), refresh_s=0)
+    monkeypatch.setattr(app, "get_ledger", lambda: ledger)
+    pandit = core.PANDITS[0]
+    req = core.PujaRequest(puja_type=pandit.specializations[0], when_date=DAY, time_window="morning")
+    token = app.SESSIONS.create(req, [pandit])
+    def declined(method): raise RuntimeError("payment declined")
+    monkeypatch.setattr(app, "_take_payment", declined)
+    with pytest.raises(RuntimeError): app.confirm_booking(str(pandit.id), "UPI", token)
+    assert not ledger.is_booked(pandit.id, DAY, "morning")
+    monkeypatch.undo()
+    monkeypatch.setattr(app, "get_ledger", lambda: ledger)
+    assert app.confirm_booking(str(pandit.id), "UPI", token)[0] == "✅ Booking Confirmed!"
+    assert ledger.is_booked(pandit.id, DAY, "morning")
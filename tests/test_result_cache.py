@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+
+import app, core, reservations
+
+MONDAY = date(2025, 11, 17)
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = reservations.ReservationLedger(str(tmp_path / "bookings.db"), refresh_s=0)
+    monkeypatch.setattr(app, "get_ledger", lambda: ledger)
+    core.RESULT_CACHE.clear()
+    return ledger
+
+def search(req):
+    # -> (offered pandit ids, session), counting whether the ranked-result cache answered
+    before = core.RESULT_CACHE.stats()["hits"]
+    out = app._search_response(req.model_copy(deep=True))
+    session = app.SESSIONS.get(out[5])
+    return [int(o) for o in out[4]["choices"]], session, core.RESULT_CACHE.stats()["hits"] > before
+
+def test_booking_drops_the_cached_result(ledger):
+    req = core.PujaRequest(puja_type="Satyanarayan Katha", when_date=MONDAY, time_window="morning", city="Kolkata")
+    ids, _, hit = search(req)
+    assert ids and not hit
+    assert search(req)[2]
+    assert ledger.reserve(ids[0], MONDAY, "morning")
+    after, _, hit = search(req)
+    assert not hit and after[:len(ids) - 1] == ids[1:]
+    assert search(req)[2]
+    ledger.reserve(ids[0], MONDAY, "evening")  # another window of the same day doesn't touch this entry
+    assert search(req)[2]
+
+def test_booking_inside_a_range_drops_the_cached_result(ledger):
+    req = core.PujaRequest(puja_type="Satyanarayan Katha", time_window="morning", city="Kolkata",
+                           date_from=MONDAY, date_to=MONDAY + timedelta(days=6))
+    ids, session, hit = search(req)
+    assert ids and not hit and search(req)[2]
+    first = session.slots[ids[0]]
+    assert ledger.reserve(ids[0], *first)
+    ids2, session2, hit = search(req)
+    assert not hit and session2.slots[ids[0]] > first
+    ledger.reserve(ids[0], MONDAY + timedelta(days=7), "morning")  # outside the range
+    assert search(req)[2]
+
+def test_roster_reload_drops_the_cached_result(ledger):
+    req = core.PujaRequest(puja_type="Satyanarayan Katha", when_date=MONDAY, time_window="morning", city="Kolkata")
+    ids, _, _ = search(req)
+    assert search(req)[2]
+    live = core.ROSTER
+    try:
+        core.load_roster([p for p in live.pandits if p.id != ids[0]])
+        after, _, hit = search(req)
+        assert not hit and after[:len(ids) - 1] == ids[1:]
+    finally:
+        core.install_roster(live)
+    assert not search(req)[2]  # reinstalling is a new roster version too
@@ -0,0 +1,37 @@
+import core, roster
+
+def test_bundled_csv_is_the_roster():
+    assert isinstance(core.ROSTER, roster.SnapshotRoster)
+    assert [p.id for p in core.PANDITS] == [p.id for p in roster.read_roster_file(roster.ROSTER_FILE)]
+
+def test_reload_ranks_off_the_snapshot(tmp_path, monkeypatch):
+    src = tmp_path / "pandits.csv"
+    roster.write_roster_file(roster.read_roster_file(roster.ROSTER_FILE)[:40], str(src))
+    live = core.ROSTER
+    try:
+        assert roster.RosterReloader(str(src), poll_s=0).check()  # compiles the snapshot
+        def parse(path): raise AssertionError("records parsed again")
+        monkeypatch.setattr(roster, "read_roster_file", parse)
+        assert roster.RosterReloader(str(src), poll_s=0).check()  # a restart maps it as is
+        assert isinstance(core.ROSTER, roster.SnapshotRoster) and len(core.PANDITS) == 40
+        req, _ = core.rule_based_extract("Satyanarayan Katha in Kolkata tomorrow morning")
+        assert all(p.id <= 40 for p, *_ in core.rank_candidates(req))
+    finally:
+        core.install_roster(live)
+
+def _run(code, **env):
+    import os, subprocess, sys
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         env={**os.environ, **env}, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    return out.stdout.split()
+
+def test_import_loads_and_writes_nothing(tmp_path):
+    snap = tmp_path / "x.snap"
+    assert _run("import core, roster, shared_roster; print(core.ROSTER_VERSION, len(core.PANDITS))",
+                ROSTER_SNAPSHOT=str(snap)) == ["0", "0"]
+    assert not snap.exists()
+
+def test_unwritable_snapshot_falls_back_to_parsing():
+    code = "import core, roster; r = roster.load_default_roster(); print(type(r).__name__, len(core.PANDITS))"
+    assert _run(code, ROSTER_SNAPSHOT="/proc/nope/x.snap") == ["Roster", "100"]
@@ -0,0 +1,27 @@
+import pytest
+
+import core, llm
+
+@pytest.mark.parametrize("text", ["Durga Puja in Howrah may 6 kal evening", "Ganesh Puja Kolkata 15 march kal morning"])
+def test_disagreeing_dates_go_to_llm(text):
+    req, conf = llm.rule_based_extract(text)
+    assert "when_date" in llm.extraction_conflicts(text, req)
+    assert llm._tiered_gate(text)[2]
+
+@pytest.mark.parametrize("text", ["Satyanarayan Katha in Howrah tomorrow evening budget 900",
+                                  "Satyanarayan Katha Howrah mai 6 baje kal"])
+def test_single_date_is_no_conflict(text):
+    req, conf = llm.rule_based_extract(text)
+    assert "when_date" not in llm.extraction_conflicts(text, req)
+
+def test_confident_rules_skip_llm():
+    assert not llm._tiered_gate("Satyanarayan Katha in Howrah tomorrow evening budget 900")[2]
+
+@pytest.mark.parametrize("text, use_llm", [("Durga Puja in Howrah may 6 kal evening", True),
+                                           ("Satyanarayan Katha in Howrah tomorrow evening budget 900", False)])
+def test_gate_scans_the_message_once(monkeypatch, text, use_llm):
+    scans, scan = [], core.scan_entities
+    monkeypatch.setattr(core, "scan_entities", lambda t: scans.append(t) or scan(t))
+    req, conf, gate = llm._tiered_gate(text)
+    assert scans == [text] and gate == use_llm
+    assert (req, conf) == llm.rule_based_extract(text)
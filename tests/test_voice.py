@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+
+def test_missing_recording_is_an_empty_transcript():
+    assert llm.transcribe_audio("/nonexistent.wav") == ""
+    assert asyncio.run(llm.transcribe_audio_async("/nonexistent.wav")) == ""
+
+def test_missing_recording_asks_to_rerecord():
+    import app
+    assert app.voice_find("/nonexistent.wav")[0].startswith("🎙️")
+
+# ---------- STT model routing ----------
+class FakeClock:
+    def __init__(self, t=1000.0): self.t = t
+    def __call__(self): return self.t
+
+class FlakyTranscriber:
+    # transcription stub: models in `failing` raise, the rest answer; records the model of every call
+    def __init__(self, failing=()):
+        self.failing, self.models = set(failing), []
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def create(self, model, file, **kw):
+        self.models.append(model)
+        if model in self.failing: raise ConnectionError(f"{model} is down")
+        return f"Satyanarayan Katha via {model}"
+
+UPLOAD = ("speech.wav", b"RIFF", "audio/wav")
+
+def test_breaker_opens_probes_half_open_and_closes():
+    clock = FakeClock()
+    router = llm.ModelRouter(["fast", "slow"], clock=clock)
+    for _ in range(llm.BREAKER_FAILS - 1): router.record("fast", 0.1, False)
+    assert router.stats()["fast"]["breaker"] == "closed" and "fast" in router.order()
+    router.record("fast", 0.1, False)
+    assert router.stats()["fast"]["breaker"] == "open" and router.order() == ["slow"]
+    assert not router.acquire("fast")
+    clock.t += llm.BREAKER_COOLDOWN_S
+    assert router.stats()["fast"]["breaker"] == "half-open" and "fast" in router.order()
+    assert router.acquire("fast") and not router.acquire("fast")  # one probe at a time
+    router.record("fast", 0.1, False)  # a failed probe reopens it for another cooldown
+    assert router.stats()["fast"]["breaker"] == "open" and not router.acquire("fast")
+    clock.t += llm.BREAKER_COOLDOWN_S
+    assert router.acquire("fast")
+    router.release("fast")  # an abandoned probe gives the next caller the chance
+    assert router.acquire("fast")
+    router.record("fast", 0.1, True)
+    assert router.stats()["fast"]["breaker"] == "closed" and router.acquire("fast") and router.acquire("fast")
+
+def test_transcription_falls_back_in_health_order(monkeypatch):
+    clock = FakeClock()
+    router = llm.ModelRouter(llm.TRANSCRIBE_MODELS, clock=clock)
+    monkeypatch.setattr(llm, "TRANSCRIBE_ROUTER", router)
+    primary, backup = llm.TRANSCRIBE_MODELS
+    stub = FlakyTranscriber(failing={primary})
+    llm.set_openai_clients(stub)
+    try:
+        assert llm._transcribe_routed(UPLOAD) == f"Satyanarayan Katha via {backup}"
+        assert stub.models == [primary, backup]  # untried models go in preference order
+        assert router.order() == [backup, primary]  # the failure now ranks the primary last
+        stub.models.clear(); stub.failing = {primary, backup}
+        for _ in range(llm.BREAKER_FAILS):
+            with pytest.raises(RuntimeError): llm._transcribe_routed(UPLOAD)
+        assert router.order() == []
+        stub.models.clear()
+        with pytest.raises(RuntimeError): llm._transcribe_routed(UPLOAD)
+        assert stub.models == []  # both breakers open: nothing is called
+        clock.t += llm.BREAKER_COOLDOWN_S; stub.failing = {primary}
+        assert llm._transcribe_routed(UPLOAD) == f"Satyanarayan Katha via {backup}"
+        assert stub.models == [backup]  # the healthier half-open model probes first and closes
+        assert router.stats()[backup]["breaker"] == "closed" and router.stats()[primary]["breaker"] == "half-open"
+    finally:
+        llm.set_openai_clients(None)
+
+def test_async_transcription_falls_back(monkeypatch):
+    monkeypatch.setattr(llm, "TRANSCRIBE_ROUTER", llm.ModelRouter(llm.TRANSCRIBE_MODELS, clock=FakeClock()))
+    primary, backup = llm.TRANSCRIBE_MODELS
+    stub = FlakyTranscriber(failing={primary})
+    async def create(model, file, **kw): return stub.create(model, file, **kw)
+    llm.set_openai_clients(None, SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create))))
+    try:
+        assert asyncio.run(llm._transcribe_routed_async(UPLOAD)) == f"Satyanarayan Katha via {backup}"
+    finally:
+        llm.set_openai_clients(None)
+    assert stub.models == [primary, backup]